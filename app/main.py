@@ -1,78 +1,406 @@
-from fastapi import FastAPI, Depends, HTTPException, Query
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
+from typing import Dict, List, Literal, Optional, Set
+import asyncio
+import logging
 import subprocess
+import json
 import os
 
-import aiohttp
 from .database import get_db, engine, Base
 from . import models, schemas
 from .models import ScrapeInitiator
 from backend.vendor_registeration import TraklinConfig
+from backend.http_session import get_shared_session, close_shared_session
+from backend.rate_limiter import rate_limiters
+from backend.search_cache import search_cache, normalize_query
+from backend.page_cache import page_validators
+from backend.parse_executor import parse_executor
+from backend import metrics
+from backend.single_flight import SingleFlight
+from backend.scrape_jobs import ScrapeJob, ScrapeJobQueue, QueueFullException
+from backend.db_utils import Database, scrape_status, encode_cursor, decode_cursor
+from backend.vendor_exceptions import VendorNotFoundInDatabaseException
 
 # Base.metadata.create_all(bind=engine) # Not needed as we use init.sql
 
-app = FastAPI(title="Price Comparison API")
+
+MAX_PRODUCTS_PAGE = 500
+
+# Seconds a stored scrape is served as-is by /scrape when the caller doesn't pass max_age
+SCRAPE_FRESH_SECONDS = float(os.getenv("SCRAPE_FRESH_SECONDS", "0"))
+
+# End-to-end budget of one scrape; vendors still running when it passes are
+# cancelled and the scrape returns what it has. 0 disables it.
+SCRAPE_DEADLINE_SECONDS = float(os.getenv("SCRAPE_DEADLINE_SECONDS", "20"))
+
+# Resolve the Traklin match before calling other vendors (see scrape_all_vendors)
+SCRAPE_ANCHORED = os.getenv("SCRAPE_ANCHORED", "0") == "1"
+SCRAPE_PREFETCH_SEARCH = os.getenv("SCRAPE_PREFETCH_SEARCH", "0") == "1"
+
+# How often the API creates upcoming product_snapshots partitions. 0 disables it
+# (then schedule snapshot_retention.py instead).
+PARTITION_MAINTENANCE_SECONDS = float(os.getenv("PARTITION_MAINTENANCE_SECONDS", "86400"))
+
+logger = logging.getLogger(__name__)
+
+# asyncpg pool used by the async endpoints, connected on first use
+api_db = Database()
+scrape_flight = SingleFlight()
+
+async def get_api_db() -> Database:
+    await api_db.connect()
+    return api_db
+
+
+async def run_scrape_job(job: ScrapeJob):
+    from multi_vendor_scrape import run_multi_vendor_scrape
+
+    db = await get_api_db()
+    return await run_multi_vendor_scrape(
+        job.query, initiator=ScrapeInitiator.API.value, db=db, scrape_id=job.scrape_id,
+        deadline=SCRAPE_DEADLINE_SECONDS, anchored=SCRAPE_ANCHORED, prefetch_search=SCRAPE_PREFETCH_SEARCH
+    )
+
+async def maintain_snapshot_partitions():
+    """
+    Keep the monthly snapshot partitions ahead of the calendar for as long as
+    the API runs; otherwise a long-lived process spills snapshots into the
+    DEFAULT partition once the months created at startup run out.
+    """
+    while True:
+        try:
+            db = await get_api_db()
+            await db.ensure_snapshot_partitions()
+        except Exception as e:
+            logger.error(f"Snapshot partition maintenance failed: {e}")
+        await asyncio.sleep(PARTITION_MAINTENANCE_SECONDS)
+
+# Scrapes behind /scrape/stream; they outlive their response so a client
+# disconnect doesn't stop them from finishing and being persisted
+stream_scrapes: Set[asyncio.Task] = set()
+
+
+def _forget_stream_scrape(task: asyncio.Task):
+    stream_scrapes.discard(task)
+    # Retrieve the outcome so a failure nobody awaited isn't logged as unhandled
+    if not task.cancelled():
+        task.exception()
+
+scrape_jobs = ScrapeJobQueue(
+    run_scrape_job,
+    workers=int(os.getenv("SCRAPE_JOB_WORKERS", "4")),
+    max_queued=int(os.getenv("SCRAPE_JOB_QUEUE_SIZE", "10000")),
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Open the shared vendor HTTP pool up front and drain it on shutdown
+    await get_shared_session()
+    scrape_jobs.start()
+    partition_maintenance = (
+        asyncio.create_task(maintain_snapshot_partitions()) if PARTITION_MAINTENANCE_SECONDS > 0 else None
+    )
+    yield
+    if partition_maintenance:
+        partition_maintenance.cancel()
+        await asyncio.gather(partition_maintenance, return_exceptions=True)
+    await scrape_jobs.stop()
+    # Streamed scrapes still running mark their sessions cancelled
+    for task in stream_scrapes:
+        task.cancel()
+    await asyncio.gather(*stream_scrapes, return_exceptions=True)
+    await close_shared_session()
+    parse_executor.shutdown()
+    await api_db.close()
+
+
+app = FastAPI(title="Price Comparison API", lifespan=lifespan)
+app.add_middleware(metrics.MetricsMiddleware)
+
+# The stats endpoints below, exported as gauges on /metrics as well
+metrics.registry.register_stats("rate_limiter", rate_limiters.stats, label="vendor")
+metrics.registry.register_stats("search_cache", search_cache.stats)
+metrics.registry.register_stats("page_cache", page_validators.stats)
+metrics.registry.register_stats("parse_executor", parse_executor.stats)
+metrics.registry.register_stats("scrape_jobs", scrape_jobs.stats)
 
 @app.get("/health")
 def health_check():
     return {"status": "ok"}
 
+@app.get("/rate-limits")
+def get_rate_limits():
+    """Per-vendor limiter state: current rate, throughput and throttle events."""
+    return rate_limiters.stats()
+
+@app.get("/search-cache")
+def get_search_cache_stats():
+    """Hit/miss/eviction counters of the vendor search cache, for tuning TTLs."""
+    return search_cache.stats()
+
+@app.get("/page-cache")
+def get_page_cache_stats():
+    """How often product page refetches came back unchanged (304 or same body hash)."""
+    return page_validators.stats()
+
+@app.get("/parse-executor")
+def get_parse_executor_stats():
+    """Parse executor settings and how many responses were parsed inline vs offloaded."""
+    return parse_executor.stats()
+
+@app.get("/metrics")
+def get_metrics():
+    """Prometheus metrics: per-vendor stage latencies, HTTP statuses, bytes, DB and API latency, cache/limiter gauges."""
+    return Response(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
 @app.get("/vendors", response_model=List[schemas.VendorResponse])
 def get_vendors(db: Session = Depends(get_db)):
     vendors = db.query(models.Vendor).order_by(models.Vendor.name).all()
     return vendors
 
 @app.get("/products", response_model=List[schemas.ProductResponse])
-def get_products(db: Session = Depends(get_db)):
-    products = db.query(models.Product).order_by(models.Product.updated_at.desc()).all()
-    return products
+async def get_products(
+    response: Response,
+    limit: int = Query(100, ge=1, le=MAX_PRODUCTS_PAGE),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+    vendor: Optional[str] = Query(None, description="Vendor name"),
+    traklin_sku: Optional[int] = None,
+    vendor_sku: Optional[str] = None,
+):
+    """
+    Products, most recently updated first, one page at a time.
+    When more rows exist the X-Next-Cursor response header carries the
+    cursor for the next page.
+    """
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    db = await get_api_db()
+    vendor_id = None
+    if vendor:
+        try:
+            vendor_id = await db.get_vendor_id(vendor)
+        except VendorNotFoundInDatabaseException:
+            raise HTTPException(status_code=404, detail=f"Unknown vendor '{vendor}'")
+
+    # Fetch one extra row to learn whether another page exists
+    rows = await db.list_products(
+        limit=limit + 1, after=after, vendor_id=vendor_id, traklin_sku=traklin_sku, vendor_sku=vendor_sku
+    )
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor(last["updated_at"], last["traklin_sku"], last["vendor_sku"])
+    return rows
+
+def build_scrape_response(query: str, status: str, results, vendor_statuses: Optional[Dict[str, str]] = None) -> dict:
+    return {
+        "query": query,
+        "status": status,
+        "results": [
+            {"vendor": vendor_name, "product": product.to_dict()}
+            for vendor_name, product in results
+        ],
+        "vendor_statuses": vendor_statuses or {},
+    }
 
 @app.get("/scrape", response_model=schemas.ScrapeResponse)
-async def scrape(query: str, db: Session = Depends(get_db)):
+async def scrape(
+    query: str,
+    max_age: Optional[float] = Query(
+        None, ge=0, description="Serve stored snapshots if a successful scrape is at most this many seconds old"
+    ),
+):
     """
     Scrape product data for the given query.
-    Runs multi_vendor_scrape synchronously, saves to DB, and returns structured response.
+    Runs multi_vendor_scrape, saves to DB, and returns structured response.
+    Identical concurrent queries share a single scrape; with max_age (or
+    SCRAPE_FRESH_SECONDS) a recent enough stored scrape is served instead.
+    Vendors that don't finish within SCRAPE_DEADLINE_SECONDS are cancelled and
+    reported as "timeout" in vendor_statuses.
     """
     from multi_vendor_scrape import run_multi_vendor_scrape
     from multi_vendor_scrape import VENDORS
 
-    results = await run_multi_vendor_scrape(query, initiator=ScrapeInitiator.API.value)
-    
-    vendors_called = len(VENDORS)
-    valid_count = len(results)
-    
-    status = "failure"
-    if valid_count == vendors_called:
-        status = "success"
-    elif valid_count > 0:
-        status = "partial_success"
+    if max_age is None:
+        max_age = SCRAPE_FRESH_SECONDS
+
+    db = await get_api_db()
+
+    async def do_scrape():
+        if max_age > 0:
+            recent = await db.get_recent_scrape(query, max_age)
+            if recent:
+                return build_scrape_response(query, recent["status"], recent["results"], recent["vendor_statuses"])
+
+        vendor_statuses = {}
+        results = await run_multi_vendor_scrape(
+            query, initiator=ScrapeInitiator.API.value, db=db,
+            deadline=SCRAPE_DEADLINE_SECONDS, vendor_statuses=vendor_statuses,
+            anchored=SCRAPE_ANCHORED, prefetch_search=SCRAPE_PREFETCH_SEARCH
+        )
+        
+        return build_scrape_response(query, scrape_status(len(results), len(VENDORS)), results, vendor_statuses)
+
+    return await scrape_flight.do(normalize_query(query), do_scrape)
+
+def stream_frame(payload: dict, fmt: str) -> str:
+    data = json.dumps(payload, ensure_ascii=False, default=str)
+    if fmt == "sse":
+        return f"event: {payload['type']}\ndata: {data}\n\n"
+    return data + "\n"
+
+@app.get("/scrape/stream")
+async def scrape_stream(
+    query: str,
+    format: Literal["ndjson", "sse"] = Query("ndjson", description="ndjson or sse (Server-Sent Events)"),
+):
+    """
+    Like /scrape, but emits each vendor's ScrapedResult the moment that vendor
+    finishes, followed by a final status frame once the results are stored.
+    The scrape runs in its own task and is persisted when it completes,
+    whether or not the client is still reading; a scrape that raises ends its
+    session 'failed'.
+
+    Frames: {"type": "result", "vendor", "product"}, {"type": "no_result", "vendor"},
+    {"type": "timeout", "vendor"} for vendors cut off by SCRAPE_DEADLINE_SECONDS,
+    and finally {"type": "status", "query", "scrape_id", "status", "vendors_called",
+    "valid_results", "vendor_statuses"}.
+    """
+    from multi_vendor_scrape import iter_vendor_results, persist_scrape_results, end_failed_session
+    from multi_vendor_scrape import VENDORS, VENDOR_TIMEOUT
+
+    db = await get_api_db()
+    scrape_id = await db.create_scraping_session(query, ScrapeInitiator.API.value)
+    results = []
+    vendor_statuses = {}
+    finished = asyncio.Queue()
+
+    # Queue items: (vendor_name, result) per vendor, then None once stored
+    # or the exception that ended the scrape
+    async def scrape():
+        try:
+            async for vendor_name, result in iter_vendor_results(query, deadline=SCRAPE_DEADLINE_SECONDS, statuses=vendor_statuses):
+                results.append(result)
+                finished.put_nowait((vendor_name, result))
+            await persist_scrape_results(db, scrape_id, results, vendor_statuses=vendor_statuses)
+        except asyncio.CancelledError:
+            finished.put_nowait(RuntimeError("Scrape cancelled"))
+            await end_failed_session(db, scrape_id, "cancelled", "cancelled", vendor_statuses)
+            raise
+        except Exception as e:
+            finished.put_nowait(e)
+            await end_failed_session(db, scrape_id, "failed", str(e) or type(e).__name__, vendor_statuses)
+            raise
+        finished.put_nowait(None)
+
+    task = asyncio.create_task(scrape())
+    stream_scrapes.add(task)
+    task.add_done_callback(_forget_stream_scrape)
 
+    async def frames():
+        while (item := await finished.get()) is not None:
+            if isinstance(item, BaseException):
+                raise item
+            vendor_name, result = item
+            if result:
+                _, product = result
+                frame = schemas.ScrapedResult(vendor=vendor_name, product=product.to_dict()).model_dump()
+                yield stream_frame({"type": "result", **frame}, format)
+            elif vendor_statuses.get(vendor_name) == VENDOR_TIMEOUT:
+                yield stream_frame({"type": "timeout", "vendor": vendor_name}, format)
+            else:
+                yield stream_frame({"type": "no_result", "vendor": vendor_name}, format)
+
+        valid_count = sum(1 for r in results if r)
+        yield stream_frame({
+            "type": "status",
+            "query": query,
+            "scrape_id": scrape_id,
+            "status": scrape_status(valid_count, len(VENDORS)),
+            "vendors_called": len(VENDORS),
+            "valid_results": valid_count,
+            "vendor_statuses": vendor_statuses,
+        }, format)
+
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    return StreamingResponse(frames(), media_type=media_type)
+
+@app.post("/scrape-jobs", status_code=202, response_model=schemas.ScrapeJobResponse)
+async def create_scrape_job(request: schemas.ScrapeJobRequest, response: Response):
+    """
+    Queue a scrape and return its scrape_id immediately.
+    Poll GET /scrape-jobs/{scrape_id} for status and results.
+    """
+    # Refuse before touching the database when there is no room
+    if not scrape_jobs.has_capacity():
+        raise HTTPException(status_code=503, detail="Scrape queue is full, retry later")
+
+    db = await get_api_db()
+    scrape_id = await db.create_scraping_session(request.query, ScrapeInitiator.API.value, status="queued")
+    try:
+        job = scrape_jobs.submit(scrape_id, request.query)
+    except QueueFullException:
+        await db.update_session_status(scrape_id, "rejected_queue_full")
+        raise HTTPException(status_code=503, detail="Scrape queue is full, retry later")
+
+    response.headers["Location"] = f"/scrape-jobs/{scrape_id}"
+    return {"scrape_id": job.scrape_id, "query": job.query, "status": job.status}
+
+@app.get("/scrape-jobs/{scrape_id}", response_model=schemas.ScrapeJobResponse)
+async def get_scrape_job(scrape_id: int):
+    """
+    Status of a queued scrape: queued, running, failed, or once finished the
+    scraping session status (success, partial_success, ...) with its results.
+    """
+    job = scrape_jobs.get(scrape_id)
+    if job and job.status in ("queued", "running", "failed"):
+        return {"scrape_id": scrape_id, "query": job.query, "status": job.status, "error": job.error}
+
+    # Finished (or no longer tracked in memory): the database is the source of truth
+    db = await get_api_db()
+    scrape = await db.get_scrape(scrape_id)
+    if not scrape:
+        raise HTTPException(status_code=404, detail=f"Scrape job {scrape_id} not found")
     return {
-        "query": query,
-        "status": status,
-        "results": [
-            {"vendor": vendor_name, "product": product.__dict__}
-            for vendor_name, product in results
-        ]
+        **build_scrape_response(scrape["query"], scrape["status"], scrape["results"], scrape["vendor_statuses"]),
+        "scrape_id": scrape_id,
+        "error": scrape["error"],
     }
 
 @app.get("/autosuggest")
 async def autosuggest(query: str):
     """
     Proxy request to Traklin's autosuggest endpoint.
+    Responses go through the search cache (same TTL and query normalization
+    as vendor searches), so repeated keystrokes don't all reach Traklin.
     """
     url = TraklinConfig.autocomplete_endpoint
     param = TraklinConfig.search_param
-    
-    async with aiohttp.ClientSession() as session:
-        try:
-            # Traklin expects 'prefix' as the query parameter
-            async with session.get(url, params={param: query}) as response:
-                if response.status != 200:
-                   raise HTTPException(status_code=502, detail="Upstream vendor error")
-                
-                # We return whatever the vendor returns directly
-                return await response.json(content_type=None)
-        except Exception as e:
-             raise HTTPException(status_code=500, detail=f"Autosuggest failed: {str(e)}")
+
+    async def fetch():
+        session = await get_shared_session()
+        # Traklin expects 'prefix' as the query parameter
+        async with session.get(url, params={param: query}) as response:
+            if response.status != 200:
+                raise HTTPException(status_code=502, detail="Upstream vendor error")
+            suggestions = await response.json(content_type=None)
+        if not isinstance(suggestions, list):
+            raise HTTPException(status_code=502, detail="Unexpected upstream response")
+        return suggestions
+
+    try:
+        # Kept apart from Traklin's parsed search results, which share the cache
+        return await search_cache.get_or_fetch(
+            f"{TraklinConfig.name}:autosuggest", query, TraklinConfig.search_cache_ttl, fetch
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Autosuggest failed: {str(e)}")
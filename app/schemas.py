@@ -38,6 +38,7 @@ class ScrapedProductSchema(BaseModel):
     brand: Optional[str]
     metadata: Optional[Dict[str, Any]]
     additional_info: Optional[Dict[str, Any]]
+    unchanged: bool = False
 
 class ScrapedResult(BaseModel):
     vendor: str
@@ -47,3 +48,17 @@ class ScrapeResponse(BaseModel):
     query: str
     status: str 
     results: List[ScrapedResult]
+    # vendor -> ok / no_result / error / timeout
+    vendor_statuses: Dict[str, str] = {}
+
+
+class ScrapeJobRequest(BaseModel):
+    query: str
+
+class ScrapeJobResponse(BaseModel):
+    scrape_id: int
+    query: str
+    status: str
+    error: Optional[str] = None
+    results: List[ScrapedResult] = []
+    vendor_statuses: Dict[str, str] = {}
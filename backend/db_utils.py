@@ -1,14 +1,27 @@
+import asyncio
 import asyncpg
+import base64
+import binascii
+import functools
 import logging
 import os
-from datetime import datetime
-from typing import Optional, Dict, List, Any
+import re
+import time
+from contextlib import asynccontextmanager
+from datetime import date, datetime
+from dataclasses import dataclass
+from typing import Optional, Dict, List, Any, Tuple
+from backend.metrics import db_pool_wait_seconds, db_query_seconds
+from backend.search_cache import normalize_query
 from backend.vendor_models import ProductSchema
 
 from backend.vendor_exceptions import VendorNotFoundInDatabaseException
 
 logger = logging.getLogger(__name__)
 
+# Monthly partitions created by ensure_snapshot_partition() in init.sql
+PARTITION_NAME_RE = re.compile(r"product_snapshots_p(\d{4})_(\d{2})")
+
 def safe_int(val):
     if val is None:
         return None
@@ -19,9 +32,53 @@ def safe_int(val):
     except ValueError:
         return None
 
+def scrape_status(valid_count: int, vendors_called: int) -> str:
+    """Overall scraping_sessions.status for a scrape"""
+    if valid_count == vendors_called:
+        return "success"
+    if valid_count > 0:
+        return "partial_success"
+    return "failure"
+
+
+SNAPSHOT_COLUMNS = [
+    "traklin_sku", "vendor_sku", "scrape_id",
+    "name", "url",
+    "offers_price", "orig_price", "disc_price", "currency",
+    "images", "description", "availability", "item_condition", "brand", "metadata",
+]
+
+
+@dataclass
+class ScrapeWrite:
+    """Everything one scrape persists: its products, snapshots and final session status"""
+    scrape_id: int
+    traklin_sku: int
+    results: List[Tuple[str, ProductSchema]]
+    vendors_called: int
+    # Don't snapshot products whose page was unchanged since the last fetch
+    skip_unchanged: bool = False
+    # vendor -> ok/no_result/error/timeout, stored on the session
+    vendor_statuses: Optional[Dict[str, str]] = None
+
+
+def timed_query(method):
+    """Record the method's latency (pool wait included) in db_query_seconds"""
+    name = method.__name__
+
+    @functools.wraps(method)
+    async def wrapper(*args, **kwargs):
+        with db_query_seconds.time(name):
+            return await method(*args, **kwargs)
+    return wrapper
+
+
 class Database:
     def __init__(self):
         self.pool = None
+        self._connect_lock = asyncio.Lock()
+        # vendors.name -> vendors.id, loaded at connect() and refreshed on a miss
+        self._vendor_ids: Dict[str, int] = {}
         # Default fallback + Env vars
         self.user = os.getenv("POSTGRES_USER", "testuser")
         self.password = os.getenv("POSTGRES_PASSWORD", "testpassword")
@@ -30,52 +87,111 @@ class Database:
         self.port = os.getenv("POSTGRES_PORT", "5433") # Defaulting to mapped port for local execution
 
     async def connect(self):
-        if not self.pool:
-            try:
-                self.pool = await asyncpg.create_pool(
-                    user=self.user,
-                    password=self.password,
-                    database=self.database,
-                    host=self.host,
-                    port=self.port
-                )
-                logger.info("Database connection pool established")
-            except Exception as e:
-                logger.error(f"Failed to connect to database: {e}")
-                raise
+        # Shared instances (e.g. the API's) may be connected by concurrent requests
+        async with self._connect_lock:
+            if not self.pool:
+                try:
+                    self.pool = await asyncpg.create_pool(
+                        user=self.user,
+                        password=self.password,
+                        database=self.database,
+                        host=self.host,
+                        port=self.port
+                    )
+                    logger.info("Database connection pool established")
+                    await self.refresh_vendor_ids()
+                    await self._ensure_partitions_on_connect()
+                except Exception as e:
+                    logger.error(f"Failed to connect to database: {e}")
+                    raise
 
     async def close(self):
         if self.pool:
             await self.pool.close()
+            self.pool = None
             logger.info("Database connection pool closed")
 
-    async def create_scraping_session(self, query: str, initiator: str = "user") -> int:
+    @asynccontextmanager
+    async def _acquire(self):
+        """Pooled connection, recording how long the pool made us wait for it"""
+        started = time.perf_counter()
         async with self.pool.acquire() as conn:
+            db_pool_wait_seconds.observe(time.perf_counter() - started)
+            yield conn
+
+    async def _ensure_partitions_on_connect(self):
+        try:
+            await self.ensure_snapshot_partitions()
+        except asyncpg.UndefinedFunctionError as e:
+            # Databases that haven't run migrations/001 yet have no partition functions
+            logger.warning(f"Could not create upcoming snapshot partitions: {e}")
+        except Exception as e:
+            # Don't refuse to serve over it, but snapshots now spill into the DEFAULT partition
+            logger.error(f"Could not create upcoming snapshot partitions: {e}")
+
+    async def refresh_vendor_ids(self, conn=None):
+        """Reload the vendor name -> id map from the vendors table"""
+        if conn is None:
+            async with self._acquire() as conn:
+                return await self.refresh_vendor_ids(conn)
+        rows = await conn.fetch("SELECT name, id FROM vendors")
+        self._vendor_ids = {row["name"]: row["id"] for row in rows}
+        logger.info(f"Loaded {len(self._vendor_ids)} vendor ids")
+
+    def invalidate_vendor_ids(self):
+        """Forget cached vendor ids; the next lookup reloads them"""
+        self._vendor_ids = {}
+
+    async def get_vendor_id(self, vendor_name: str, conn=None) -> int:
+        """
+        Vendor id from the in-memory map. A miss triggers one refresh before
+        giving up with VendorNotFoundInDatabaseException.
+        """
+        vendor_id = self._vendor_ids.get(vendor_name)
+        if vendor_id is None:
+            await self.refresh_vendor_ids(conn)
+            vendor_id = self._vendor_ids.get(vendor_name)
+            if vendor_id is None:
+                raise VendorNotFoundInDatabaseException(f"Vendor '{vendor_name}' not found in database")
+        return vendor_id
+
+    @timed_query
+    async def create_scraping_session(self, query: str, initiator: str = "user", status: str = "running") -> int:
+        async with self._acquire() as conn:
             row = await conn.fetchrow("""
-                INSERT INTO scraping_sessions (query, initiator, status, scraped_at)
-                VALUES ($1, $2, 'running', NOW())
+                INSERT INTO scraping_sessions (query, query_key, initiator, status, scraped_at)
+                VALUES ($1, $2, $3, $4, NOW())
                 RETURNING scrape_id
-            """, query, initiator)
+            """, query, normalize_query(query), initiator, status)
             return row['scrape_id']
 
-    async def update_session_status(self, scrape_id: int, status: str, vendors_called: int = 0, valid_results: int = 0):
-        async with self.pool.acquire() as conn:
+    @timed_query
+    async def update_session_status(
+        self,
+        scrape_id: int,
+        status: str,
+        vendors_called: int = 0,
+        valid_results: int = 0,
+        vendor_statuses: Optional[Dict[str, str]] = None,
+        error: Optional[str] = None
+    ):
+        async with self._acquire() as conn:
             await conn.execute("""
                 UPDATE scraping_sessions
-                SET status = $1, vendors_called = $2, valid_results = $3
+                SET status = $1, vendors_called = $2, valid_results = $3,
+                    vendor_statuses = COALESCE($5::jsonb, vendor_statuses),
+                    error = $6
                 WHERE scrape_id = $4
-            """, status, vendors_called, valid_results, scrape_id)
+            """, status, vendors_called, valid_results, scrape_id, session_statuses(vendor_statuses), error)
 
+    @timed_query
     async def upsert_product(self, traklin_sku: int, product: ProductSchema, vendor_name: str):
         """
         Upsert a product record into the products table.
         Note: The products table uses (traklin_sku, vendor_sku) as composite PK.
         """
-        async with self.pool.acquire() as conn:
-            # Get vendor_id
-            vendor_id = await conn.fetchval("SELECT id FROM vendors WHERE name = $1", vendor_name)
-            if not vendor_id:
-                raise VendorNotFoundInDatabaseException(f"Vendor '{vendor_name}' not found in database")
+        async with self._acquire() as conn:
+            vendor_id = await self.get_vendor_id(vendor_name, conn)
             
             await conn.execute("""
                 INSERT INTO products (traklin_sku, vendor_sku, vendor_id, name, description, updated_at)
@@ -88,20 +204,79 @@ class Database:
                     updated_at = NOW()
             """, traklin_sku, str(product.SKU), vendor_id, product.name, product.description)
 
+    @timed_query
+    async def save_scrapes(self, writes: List[ScrapeWrite]) -> List[List[Tuple[str, ProductSchema]]]:
+        """
+        Persist the results of one or more scrapes in a single transaction:
+        products are upserted with executemany, snapshots are streamed with COPY
+        and every session's status is updated alongside.
+        Rows for vendors missing from the vendors table are skipped.
+        Returns the saved (vendor_name, product) pairs for each write, in order.
+        """
+        vendor_names = {vendor_name for write in writes for vendor_name, _ in write.results}
+
+        async with self._acquire() as conn:
+            if not vendor_names.issubset(self._vendor_ids):
+                await self.refresh_vendor_ids(conn)
+            vendor_ids = self._vendor_ids
+
+            product_rows = []
+            snapshot_rows = []
+            session_rows = []
+            saved = []
+            for write in writes:
+                saved_results = []
+                for vendor_name, product in write.results:
+                    vendor_id = vendor_ids.get(vendor_name)
+                    if not vendor_id:
+                        logger.error(f"Failed to save result for {vendor_name}: Vendor '{vendor_name}' not found in database")
+                        continue
+                    product_rows.append((write.traklin_sku, str(product.SKU), vendor_id, product.name, product.description))
+                    if not (write.skip_unchanged and product.unchanged):
+                        snapshot_rows.append(snapshot_record(write.scrape_id, write.traklin_sku, product))
+                    saved_results.append((vendor_name, product))
+
+                valid_count = len(saved_results)
+                session_rows.append((
+                    scrape_status(valid_count, write.vendors_called), write.vendors_called, valid_count,
+                    write.scrape_id, session_statuses(write.vendor_statuses)
+                ))
+                saved.append(saved_results)
+
+            async with conn.transaction():
+                if product_rows:
+                    await conn.executemany("""
+                        INSERT INTO products (traklin_sku, vendor_sku, vendor_id, name, description, updated_at)
+                        VALUES ($1, $2, $3, $4, $5, NOW())
+                        ON CONFLICT (traklin_sku, vendor_sku) 
+                        DO UPDATE SET 
+                            name = EXCLUDED.name,
+                            description = EXCLUDED.description,
+                            vendor_id = EXCLUDED.vendor_id,
+                            updated_at = NOW()
+                    """, product_rows)
+                if snapshot_rows:
+                    await conn.copy_records_to_table(
+                        "product_snapshots", records=snapshot_rows, columns=SNAPSHOT_COLUMNS
+                    )
+                await conn.executemany("""
+                    UPDATE scraping_sessions
+                    SET status = $1, vendors_called = $2, valid_results = $3,
+                        vendor_statuses = COALESCE($5::jsonb, vendor_statuses)
+                    WHERE scrape_id = $4
+                """, session_rows)
+
+        return saved
+
+    @timed_query
     async def insert_snapshot(self, scrape_id: int, traklin_sku: int, product: ProductSchema):
-        async with self.pool.acquire() as conn:
+        async with self._acquire() as conn:
             # We encode images/metadata to json if they differ from None, 
             # but asyncpg handles dict/list -> jsonb automagically if configured or casted? 
             # Usually we need to dump it if passing to text, but for jsonb param asyncpg might need help or a codec.
             # safe fallback: cast simple python types. list/dict maps to JSONB in newer asyncpg but explicit json.dumps is safer often.
             # However asyncpg automatically converts python types to postgres types.
             
-            # Using query parameters
-            # Merge additional_info into metadata for storage
-            final_metadata = (product.metadata or {}).copy()
-            if product.additional_info:
-                final_metadata.update(product.additional_info)
-
             await conn.execute("""
                 INSERT INTO product_snapshots (
                     traklin_sku, vendor_sku, scrape_id,
@@ -114,15 +289,349 @@ class Database:
                     $6, $7, $8, $9,
                     $10::jsonb, $11, $12, $13, $14, $15::jsonb
                 )
-            """, 
-            traklin_sku, str(product.SKU), scrape_id,
-            product.name, product.url,
-            safe_int(product.offers__price), safe_int(product.orig_price), safe_int(product.disc_price), product.currency,
-            import_json(product.images), product.description, product.availability, product.item_condition, product.brand, import_json(final_metadata)
+            """, *snapshot_record(scrape_id, traklin_sku, product))
+
+    @timed_query
+    async def get_recent_scrape(self, query: str, max_age_seconds: float) -> Optional[Dict[str, Any]]:
+        """
+        Latest successful API scrape of `query` (any spelling with the same
+        normalize_query form) that is at most `max_age_seconds` old, with its
+        stored snapshots, or None if there is none.
+        Only API sessions qualify: cron refreshes skip snapshots of unchanged
+        products, so their sessions don't hold the full result.
+        """
+        async with self._acquire() as conn:
+            session = await conn.fetchrow("""
+                SELECT scrape_id, status, scraped_at, vendor_statuses
+                FROM scraping_sessions
+                WHERE query_key = $1
+                  AND initiator = 'API'
+                  AND status IN ('success', 'partial_success')
+                  AND scraped_at >= NOW() - make_interval(secs => $2)
+                ORDER BY scraped_at DESC
+                LIMIT 1
+            """, normalize_query(query), float(max_age_seconds))
+            if not session:
+                return None
+            return await self._scrape_with_snapshots(conn, session)
+
+    @timed_query
+    async def get_scrape(self, scrape_id: int) -> Optional[Dict[str, Any]]:
+        """A scraping session by id with its stored snapshots, or None if it doesn't exist"""
+        async with self._acquire() as conn:
+            session = await conn.fetchrow("""
+                SELECT scrape_id, query, status, scraped_at, vendor_statuses, error
+                FROM scraping_sessions
+                WHERE scrape_id = $1
+            """, scrape_id)
+            if not session:
+                return None
+            return await self._scrape_with_snapshots(conn, session)
+
+    async def _scrape_with_snapshots(self, conn, session) -> Dict[str, Any]:
+        # Snapshots are written after their session row, so scraped_at bounds
+        # the partitions that need scanning
+        rows = await conn.fetch("""
+            SELECT v.name AS vendor, s.*
+            FROM product_snapshots s
+            JOIN products p ON p.traklin_sku = s.traklin_sku AND p.vendor_sku = s.vendor_sku
+            JOIN vendors v ON v.id = p.vendor_id
+            WHERE s.scrape_id = $1 AND s.scraped_at >= $2
+            ORDER BY s.id
+        """, session["scrape_id"], session["scraped_at"])
+
+        return {
+            **dict(session),
+            "vendor_statuses": export_json(session["vendor_statuses"]) or {},
+            "results": [(row["vendor"], snapshot_to_product(row)) for row in rows],
+        }
+
+    @timed_query
+    async def get_stored_matches(self, traklin_sku: int) -> Dict[str, Dict[str, Any]]:
+        """
+        Vendor products already matched to `traklin_sku`, keyed by vendor name,
+        with the URL of each one's latest snapshot and the fields a refresh
+        reuses in place of a search result (see `refresh_vendor`):
+        {vendor: {"vendor_sku", "url", "name", "orig_price", "disc_price", "images", "metadata"}}.
+        """
+        async with self._acquire() as conn:
+            rows = await conn.fetch("""
+                SELECT v.name AS vendor, p.vendor_sku, latest.url, latest.name,
+                       latest.orig_price, latest.disc_price, latest.images, latest.metadata
+                FROM products p
+                JOIN vendors v ON v.id = p.vendor_id
+                JOIN LATERAL (
+                    SELECT s.url, s.name, s.orig_price, s.disc_price, s.images, s.metadata
+                    FROM product_snapshots s
+                    WHERE s.traklin_sku = p.traklin_sku AND s.vendor_sku = p.vendor_sku
+                    ORDER BY s.scraped_at DESC
+                    LIMIT 1
+                ) latest ON TRUE
+                WHERE p.traklin_sku = $1
+                ORDER BY p.updated_at DESC
+            """, traklin_sku)
+
+        matches = {}
+        for row in rows:
+            # A vendor can hold several rows for one traklin_sku; keep the most recent
+            matches.setdefault(row["vendor"], {
+                "vendor_sku": row["vendor_sku"],
+                "url": row["url"],
+                "name": row["name"],
+                "orig_price": row["orig_price"],
+                "disc_price": row["disc_price"],
+                "images": export_json(row["images"]) or [],
+                "metadata": export_json(row["metadata"]) or {},
+            })
+        return matches
+
+    @timed_query
+    async def get_price_history(
+        self,
+        traklin_sku: int,
+        vendor_sku: Optional[str] = None,
+        since: Optional[datetime] = None,
+        limit: int = 500
+    ) -> List[Dict[str, Any]]:
+        """Snapshots of a product (optionally one vendor's listing), newest first"""
+        async with self._acquire() as conn:
+            rows = await conn.fetch("""
+                SELECT v.name AS vendor, s.vendor_sku, s.scraped_at, s.scrape_id,
+                       s.offers_price, s.orig_price, s.disc_price, s.currency, s.availability
+                FROM product_snapshots s
+                JOIN products p ON p.traklin_sku = s.traklin_sku AND p.vendor_sku = s.vendor_sku
+                JOIN vendors v ON v.id = p.vendor_id
+                WHERE s.traklin_sku = $1
+                  AND ($2::text IS NULL OR s.vendor_sku = $2)
+                  AND ($3::timestamp IS NULL OR s.scraped_at >= $3)
+                ORDER BY s.scraped_at DESC
+                LIMIT $4
+            """, traklin_sku, vendor_sku, since, limit)
+        return [dict(row) for row in rows]
+
+    @timed_query
+    async def list_products(
+        self,
+        limit: int,
+        after: Optional[Tuple[datetime, int, str]] = None,
+        vendor_id: Optional[int] = None,
+        traklin_sku: Optional[int] = None,
+        vendor_sku: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Products ordered by (updated_at, traklin_sku, vendor_sku) descending.
+        `after` is the key of the last row of the previous page (keyset pagination).
+        """
+        conditions = []
+        args = []
+
+        def arg(value) -> str:
+            args.append(value)
+            return f"${len(args)}"
+
+        # Only the active filters go into the SQL so each shape gets its own plan
+        if vendor_id is not None:
+            conditions.append(f"vendor_id = {arg(vendor_id)}")
+        if traklin_sku is not None:
+            conditions.append(f"traklin_sku = {arg(traklin_sku)}")
+        if vendor_sku is not None:
+            conditions.append(f"vendor_sku = {arg(vendor_sku)}")
+        if after is not None:
+            updated_at, after_traklin_sku, after_vendor_sku = after
+            conditions.append(
+                f"(updated_at, traklin_sku, vendor_sku) < ({arg(updated_at)}, {arg(after_traklin_sku)}, {arg(after_vendor_sku)})"
             )
 
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        async with self._acquire() as conn:
+            rows = await conn.fetch(f"""
+                SELECT traklin_sku, vendor_sku, vendor_id, name, description, created_at, updated_at
+                FROM products
+                {where}
+                ORDER BY updated_at DESC, traklin_sku DESC, vendor_sku DESC
+                LIMIT {arg(limit)}
+            """, *args)
+        return [dict(row) for row in rows]
+
+    @timed_query
+    async def get_refresh_candidates(self, popularity_days: int = 30) -> List[Dict[str, Any]]:
+        """
+        One row per tracked traklin_sku: when it was last refreshed and how many
+        seconds ago that was (by the database clock, which set updated_at), the
+        query that last found it and how many user (API) scrapes hit it recently.
+        """
+        async with self._acquire() as conn:
+            rows = await conn.fetch("""
+                WITH popularity AS (
+                    SELECT s.traklin_sku, COUNT(DISTINCT s.scrape_id) AS hits
+                    FROM product_snapshots s
+                    JOIN scraping_sessions ss ON ss.scrape_id = s.scrape_id
+                    WHERE s.scraped_at >= NOW() - make_interval(days => $1)
+                      AND ss.initiator = 'API'
+                    GROUP BY s.traklin_sku
+                )
+                SELECT p.traklin_sku,
+                       p.updated_at AS last_refreshed,
+                       EXTRACT(EPOCH FROM NOW() - p.updated_at)::float8 AS staleness_seconds,
+                       last_scrape.query,
+                       COALESCE(pop.hits, 0) AS popularity
+                FROM products p
+                JOIN vendors v ON v.id = p.vendor_id AND v.name = 'Traklin'
+                LEFT JOIN LATERAL (
+                    SELECT ss.query
+                    FROM product_snapshots s
+                    JOIN scraping_sessions ss ON ss.scrape_id = s.scrape_id
+                    WHERE s.traklin_sku = p.traklin_sku AND s.vendor_sku = p.vendor_sku
+                    ORDER BY s.scraped_at DESC
+                    LIMIT 1
+                ) last_scrape ON TRUE
+                LEFT JOIN popularity pop ON pop.traklin_sku = p.traklin_sku
+            """, popularity_days)
+        return [dict(row) for row in rows]
+
+    @timed_query
+    async def get_freshness_percentiles(self, percentiles=(0.5, 0.9, 0.99)) -> Dict[float, Optional[float]]:
+        """Age in seconds of tracked products' last refresh, at the given percentiles"""
+        async with self._acquire() as conn:
+            values = await conn.fetchval("""
+                SELECT percentile_cont($1::float8[]) WITHIN GROUP (
+                    ORDER BY EXTRACT(EPOCH FROM NOW() - p.updated_at)
+                )
+                FROM products p
+                JOIN vendors v ON v.id = p.vendor_id AND v.name = 'Traklin'
+            """, list(percentiles))
+        return dict(zip(percentiles, values or [None] * len(percentiles)))
+
+    # --- product_snapshots partition maintenance ---
+
+    async def ensure_snapshot_partitions(self, months_ahead: int = 3):
+        """
+        Create monthly snapshot partitions from the current month up to
+        months_ahead, moving any rows of those months out of the DEFAULT
+        partition. Every month is attempted; raises RuntimeError naming the
+        ones that failed.
+        """
+        async with self._acquire() as conn:
+            failures = await conn.fetchval("SELECT ensure_snapshot_partitions($1)", months_ahead)
+        if failures:
+            raise RuntimeError(f"Could not create snapshot partitions: {'; '.join(failures)}")
+
+    async def list_snapshot_partitions(self) -> List[Dict[str, Any]]:
+        """Monthly snapshot partitions (the DEFAULT partition excluded), oldest first"""
+        async with self._acquire() as conn:
+            rows = await conn.fetch("""
+                SELECT c.relname AS name,
+                       COALESCE(obj_description(c.oid, 'pg_class'), '') LIKE 'downsampled%' AS downsampled
+                FROM pg_inherits i
+                JOIN pg_class c ON c.oid = i.inhrelid
+                WHERE i.inhparent = 'product_snapshots'::regclass
+            """)
+
+        partitions = []
+        for row in rows:
+            match = PARTITION_NAME_RE.fullmatch(row["name"])
+            if not match:
+                continue
+            partitions.append({
+                "name": row["name"],
+                "month": date(int(match.group(1)), int(match.group(2)), 1),
+                "downsampled": row["downsampled"],
+            })
+        return sorted(partitions, key=lambda p: p["month"])
+
+    async def downsample_snapshot_partition(self, name: str) -> int:
+        """
+        Keep only the latest snapshot per product listing per day in a partition.
+        Returns the number of rows removed.
+        """
+        table = quote_ident(name)
+        async with self._acquire() as conn:
+            async with conn.transaction():
+                result = await conn.execute(f"""
+                    DELETE FROM {table} t
+                    USING (
+                        SELECT id, row_number() OVER (
+                            PARTITION BY traklin_sku, vendor_sku, date_trunc('day', scraped_at)
+                            ORDER BY scraped_at DESC, id DESC
+                        ) AS rn
+                        FROM {table}
+                    ) ranked
+                    WHERE t.id = ranked.id AND ranked.rn > 1
+                """)
+                await conn.execute(f"COMMENT ON TABLE {table} IS 'downsampled:day'")
+        return int(result.split()[-1])
+
+    async def drop_snapshot_partition(self, name: str):
+        async with self._acquire() as conn:
+            await conn.execute(f"DROP TABLE IF EXISTS {quote_ident(name)}")
+
 import json
 def import_json(val):
     if val is None:
         return 'null'
     return json.dumps(val)
+
+
+def session_statuses(vendor_statuses: Optional[Dict[str, str]]) -> Optional[str]:
+    """vendor_statuses as a JSONB parameter; None leaves the stored value untouched"""
+    return import_json(vendor_statuses) if vendor_statuses is not None else None
+
+
+def export_json(val):
+    """Decode a JSONB column; asyncpg returns them as text without a codec"""
+    if isinstance(val, str):
+        return json.loads(val)
+    return val
+
+
+def snapshot_to_product(row) -> ProductSchema:
+    """Rebuild a ProductSchema from a product_snapshots row"""
+    return ProductSchema(
+        SKU=row["vendor_sku"],
+        name=row["name"],
+        offers__price=row["offers_price"],
+        orig_price=row["orig_price"],
+        disc_price=row["disc_price"],
+        currency=row["currency"],
+        url=row["url"],
+        images=export_json(row["images"]) or [],
+        description=row["description"],
+        availability=row["availability"],
+        item_condition=row["item_condition"],
+        brand=row["brand"],
+        metadata=export_json(row["metadata"]),
+    )
+
+
+def snapshot_record(scrape_id: int, traklin_sku: int, product: ProductSchema) -> tuple:
+    """product_snapshots row in SNAPSHOT_COLUMNS order"""
+    # Merge additional_info into metadata for storage
+    final_metadata = (product.metadata or {}).copy()
+    if product.additional_info:
+        final_metadata.update(product.additional_info)
+
+    return (
+        traklin_sku, str(product.SKU), scrape_id,
+        product.name, product.url,
+        safe_int(product.offers__price), safe_int(product.orig_price), safe_int(product.disc_price), product.currency,
+        import_json(product.images), product.description, product.availability, product.item_condition, product.brand, import_json(final_metadata),
+    )
+
+
+def quote_ident(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def encode_cursor(updated_at: datetime, traklin_sku: int, vendor_sku: str) -> str:
+    """Opaque /products page cursor"""
+    raw = json.dumps([updated_at.isoformat(), traklin_sku, vendor_sku])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int, str]:
+    """Inverse of encode_cursor; raises ValueError on anything malformed"""
+    try:
+        updated_at, traklin_sku, vendor_sku = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(updated_at), int(traklin_sku), str(vendor_sku)
+    except (TypeError, binascii.Error, json.JSONDecodeError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
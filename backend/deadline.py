@@ -0,0 +1,33 @@
+import time
+from typing import Optional
+
+
+class Deadline:
+    """
+    A fixed point in time a whole scrape must finish by. Passed down from
+    the caller through run -> search/product fetch -> _fetch, so every HTTP
+    attempt only gets the time that is actually left.
+    """
+
+    def __init__(self, seconds: float):
+        self.budget = seconds
+        self.at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.at
+
+    def cap(self, seconds: float) -> float:
+        """`seconds`, shortened to what is left of the deadline"""
+        return min(seconds, self.remaining())
+
+    def __repr__(self):
+        return f"Deadline(budget={self.budget}s, remaining={self.remaining():.2f}s)"
+
+
+def deadline_after(seconds: Optional[float]) -> Optional[Deadline]:
+    """A Deadline `seconds` from now, or None for no overall limit"""
+    return Deadline(seconds) if seconds else None
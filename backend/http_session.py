@@ -0,0 +1,73 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Optional
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class HTTPPoolConfig:
+    """Connection pool settings shared by every vendor scraper"""
+    limit: int = 100                # total open connections
+    limit_per_host: int = 10        # open connections per vendor host
+    keepalive_timeout: float = 30   # seconds an idle connection is kept around
+    ttl_dns_cache: int = 300        # seconds a DNS answer is cached
+    total_timeout: float = 30       # default ClientTimeout(total=...) for the session
+
+
+class SessionManager:
+    """
+    Owns a single long-lived aiohttp.ClientSession for the whole process.
+    Scrapers and API handlers borrow the session instead of opening their own,
+    so DNS, TCP and TLS handshakes to vendor hosts are paid once and reused.
+    """
+
+    def __init__(self, config: Optional[HTTPPoolConfig] = None):
+        self.config = config or HTTPPoolConfig()
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _create_session(self) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(
+            limit=self.config.limit,
+            limit_per_host=self.config.limit_per_host,
+            keepalive_timeout=self.config.keepalive_timeout,
+            ttl_dns_cache=self.config.ttl_dns_cache,
+            use_dns_cache=True,
+        )
+        return aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.config.total_timeout),
+        )
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        # A session is bound to the loop it was created on; CLI scripts that call
+        # asyncio.run() more than once need a fresh one per loop.
+        if self._session is None or self._session.closed or self._loop is not loop:
+            self._session = self._create_session()
+            self._loop = loop
+            logger.info("Shared HTTP session created")
+        return self._session
+
+    async def close(self):
+        if self._session and not self._session.closed:
+            await self._session.close()
+            logger.info("Shared HTTP session closed")
+        self._session = None
+        self._loop = None
+
+
+session_manager = SessionManager()
+
+
+async def get_shared_session() -> aiohttp.ClientSession:
+    """Borrow the process-wide session. Callers must not close it."""
+    return await session_manager.get_session()
+
+
+async def close_shared_session():
+    await session_manager.close()
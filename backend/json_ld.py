@@ -0,0 +1,69 @@
+"""
+Pull the schema.org Product object out of a product page's ld+json blocks
+without building a DOM: the raw page is scanned for
+<script type="application/ld+json"> blocks, which are decoded one at a time
+until a Product (or an ItemPage wrapping one) turns up.
+"""
+import json
+import re
+from typing import Any, Dict, Iterator, Optional, Union
+
+from backend.vendor_exceptions import ParseException
+
+try:
+    import orjson
+    loads = orjson.loads
+    _DECODE_ERRORS = (orjson.JSONDecodeError, UnicodeDecodeError)
+except ImportError:  # orjson is optional, the stdlib decoder is just slower
+    loads = json.loads
+    _DECODE_ERRORS = (json.JSONDecodeError, UnicodeDecodeError)
+
+_MARKER = "application/ld+json"
+_SCRIPT_RE = re.compile(
+    r"<script\b[^>]*?type\s*=\s*[\"']?application/ld\+json[\"']?[^>]*>(.*?)</script\s*>",
+    re.IGNORECASE | re.DOTALL,
+)
+_SCRIPT_RE_BYTES = re.compile(_SCRIPT_RE.pattern.encode(), re.IGNORECASE | re.DOTALL)
+
+
+def iter_ld_json_blocks(page: Union[str, bytes]) -> Iterator[Union[str, bytes]]:
+    """Raw text of each ld+json script block, in document order"""
+    pattern = _SCRIPT_RE_BYTES if isinstance(page, bytes) else _SCRIPT_RE
+    for match in pattern.finditer(page):
+        yield match.group(1)
+
+
+def _as_product(obj: Any) -> Optional[Dict[str, Any]]:
+    # Handle itemPage case - for Netoneto
+    if isinstance(obj, dict) and obj.get("@type") == "ItemPage" and "mainEntity" in obj:
+        obj = obj["mainEntity"]
+    if isinstance(obj, dict) and obj.get("@type") == "Product":
+        return obj
+    return None
+
+
+def find_product_json_ld(page: Union[str, bytes]) -> Optional[Dict[str, Any]]:
+    """
+    First ld+json Product object on the page, or None if the page has none.
+    Raises ParseException when the page mentions ld+json but a block can't be
+    located or decoded, so the caller can fall back to a full HTML parse.
+    """
+    marker = _MARKER.encode() if isinstance(page, bytes) else _MARKER
+    if marker not in page:
+        return None
+
+    found_block = False
+    for block in iter_ld_json_blocks(page):
+        found_block = True
+        try:
+            obj = loads(block)
+        except _DECODE_ERRORS as e:
+            raise ParseException(f"Malformed ld+json block: {e}") from e
+
+        product = _as_product(obj)
+        if product is not None:
+            return product
+
+    if not found_block:
+        raise ParseException("ld+json marker found but no script block could be extracted")
+    return None
@@ -0,0 +1,253 @@
+"""
+In-process counters and histograms rendered in the Prometheus text format.
+Dependency-free and cheap enough to stay on in production: recording is a
+dict lookup plus a bisect (see benchmarks/bench_metrics_overhead.py).
+METRICS_ENABLED=0 turns recording into a no-op.
+"""
+import os
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; wide enough for sub-millisecond parses and multi-second vendor fetches
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[Any]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, registry: "MetricsRegistry", name: str, help: str, labelnames: Sequence[str] = ()):
+        self.registry = registry
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1):
+        if self.registry.enabled:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in self._values.items()
+        ]
+
+    def reset(self):
+        self._values.clear()
+
+
+class Timer:
+    """Context manager observing the time spent inside it, exceptions included"""
+    __slots__ = ("histogram", "labels", "started")
+
+    def __init__(self, histogram: "Histogram", labels: Tuple):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.started, *self.labels)
+        return False
+
+
+class _NoopTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NOOP_TIMER = _NoopTimer()
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(
+        self,
+        registry: "MetricsRegistry",
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        self.registry = registry
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (last one is +Inf), sum]
+        self._series: Dict[Tuple, list] = {}
+
+    def observe(self, value: float, *labels):
+        if not self.registry.enabled:
+            return
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def time(self, *labels) -> Timer:
+        return Timer(self, labels) if self.registry.enabled else _NOOP_TIMER
+
+    def render(self) -> List[str]:
+        lines = []
+        bucket_names = self.labelnames + ("le",)
+        for labels, (counts, total) in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(bucket_names, labels + (_format_value(bound),))} {cumulative}")
+            label_str = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_str} {_format_value(total)}")
+            lines.append(f"{self.name}_count{label_str} {cumulative}")
+        return lines
+
+    def reset(self):
+        self._series.clear()
+
+
+class MetricsRegistry:
+    """
+    Owns every metric plus `stats()` sources that are exported as gauges at
+    scrape time (rate limiters, caches, parse executor), so those modules
+    don't need to know about metrics at all.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._metrics: List[Any] = []
+        self._stats_sources: List[Tuple[str, Callable[[], Dict[str, Any]], Optional[str]]] = []
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        metric = Counter(self, name, help, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(
+        self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> Histogram:
+        metric = Histogram(self, name, help, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def register_stats(self, prefix: str, stats: Callable[[], Dict[str, Any]], label: Optional[str] = None):
+        """
+        Export the numeric values of `stats()` as `{prefix}_{key}` gauges.
+        With `label`, stats() returns {label_value: {key: value}} (e.g. per vendor).
+        """
+        self._stats_sources.append((prefix, stats, label))
+
+    def _render_stats(self) -> List[str]:
+        families: Dict[str, List[str]] = {}
+        for prefix, stats, label in self._stats_sources:
+            groups = stats().items() if label else [(None, stats())]
+            for label_value, values in groups:
+                for key, value in values.items():
+                    if isinstance(value, bool) or not isinstance(value, (int, float)):
+                        continue
+                    name = f"{prefix}_{key}"
+                    labels = _format_labels((label,), (label_value,)) if label else ""
+                    families.setdefault(name, []).append(f"{name}{labels} {_format_value(value)}")
+
+        lines = []
+        for name, samples in families.items():
+            lines.append(f"# TYPE {name} gauge")
+            lines.extend(samples)
+        return lines
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        lines.extend(self._render_stats())
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        for metric in self._metrics:
+            metric.reset()
+
+
+registry = MetricsRegistry(enabled=os.getenv("METRICS_ENABLED", "1") != "0")
+
+# Scraper hot path
+stage_seconds = registry.histogram(
+    "scraper_stage_seconds",
+    "Time per scrape stage: search, select, product, fetch (one HTTP attempt), parse_search, parse_product",
+    ("vendor", "stage"),
+)
+response_bytes = registry.counter("scraper_response_bytes_total", "Vendor response body bytes downloaded", ("vendor",))
+http_responses = registry.counter(
+    "scraper_http_responses_total", "Vendor HTTP responses by status code (error/timeout when none arrived)", ("vendor", "status")
+)
+limiter_wait_seconds = registry.histogram(
+    "scraper_limiter_wait_seconds", "Time a vendor request waited for its rate limiter and concurrency slot", ("vendor",)
+)
+
+# Database
+db_query_seconds = registry.histogram("db_query_seconds", "Database method latency, pool wait included", ("method",))
+db_pool_wait_seconds = registry.histogram("db_pool_wait_seconds", "Time spent waiting for a pooled connection")
+
+# API
+http_request_seconds = registry.histogram(
+    "http_request_seconds", "API request latency until the last body chunk is sent", ("method", "route", "status")
+)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware timing every HTTP request into http_request_seconds,
+    labeled by route template (not raw path) to keep label cardinality bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not registry.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                # Stop the clock at the last chunk; background tasks run after it
+                route = scope.get("route")
+                http_request_seconds.observe(
+                    time.perf_counter() - started, scope["method"], getattr(route, "path", "unmatched"), status[0]
+                )
+
+        await self.app(scope, receive, send_wrapper)
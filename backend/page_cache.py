@@ -0,0 +1,131 @@
+import hashlib
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class NotModified:
+    """Returned by BaseVendorScraper._fetch when a conditional fetch found the page unchanged"""
+
+    def __repr__(self):
+        return "NOT_MODIFIED"
+
+
+NOT_MODIFIED = NotModified()
+
+
+def content_hash(body: bytes) -> str:
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+@dataclass
+class PageValidators:
+    """
+    What we last saw at a URL, and what the page parsed into (its JSON-LD
+    Product object or API item) before any search result was applied
+    """
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    content_hash: Optional[str] = None
+    page: Any = None
+
+
+class PageValidatorCache:
+    """
+    LRU map of product page URL -> validators (ETag, Last-Modified, body hash)
+    and the page data parsed from that body.
+    Only what came from the page is kept: prices and names taken from the
+    search result differ between calls, so on a hit the scraper rebuilds the
+    product from the cached page data and the current search result.
+    A page only counts as unchanged once its data has been remembered, so a
+    fetch whose parse failed is always retried in full.
+    Entries live in this process only: a fresh process (a one-shot cron run,
+    an API restart) starts empty and fetches and stores every page in full.
+    """
+
+    def __init__(self, max_entries: int = 50_000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, PageValidators]" = OrderedDict()
+
+        # Counters
+        self.not_modified = 0    # 304 from the vendor
+        self.hash_matches = 0    # 200 with a body identical to the last one
+        self.changed = 0
+
+    def _get(self, url: str) -> Optional[PageValidators]:
+        entry = self._entries.get(url)
+        if entry is not None:
+            self._entries.move_to_end(url)
+        return entry
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """If-None-Match / If-Modified-Since for `url`, empty when nothing reusable is cached"""
+        entry = self._get(url)
+        if entry is None or entry.page is None:
+            return {}
+        headers = {}
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def record_not_modified(self, url: str) -> bool:
+        """Note a 304 for `url`; False if there is no page data to reuse"""
+        entry = self._get(url)
+        if entry is None or entry.page is None:
+            return False
+        self.not_modified += 1
+        return True
+
+    def record_response(self, url: str, etag: Optional[str], last_modified: Optional[str], body: bytes) -> bool:
+        """
+        Store the validators of a 200 response. Returns True when the body is
+        identical to the one the cached page data was parsed from.
+        """
+        digest = content_hash(body)
+        entry = self._get(url)
+        if entry is not None and entry.page is not None and entry.content_hash == digest:
+            entry.etag = etag or entry.etag
+            entry.last_modified = last_modified or entry.last_modified
+            self.hash_matches += 1
+            return True
+
+        self.changed += 1
+        self._entries[url] = PageValidators(etag=etag, last_modified=last_modified, content_hash=digest)
+        self._entries.move_to_end(url)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return False
+
+    def remember_page(self, url: str, page: Any):
+        """Keep what the last 200 body of `url` parsed into; it must not be mutated afterwards"""
+        entry = self._entries.get(url)
+        if entry is not None:
+            entry.page = page
+
+    def unchanged_page(self, url: str) -> Optional[Any]:
+        """Page data last parsed from `url`, for a page found unchanged"""
+        entry = self._get(url)
+        return entry.page if entry is not None else None
+
+    def clear(self):
+        """Forget every page and reset the counters"""
+        self._entries.clear()
+        self.not_modified = self.hash_matches = self.changed = 0
+
+    def stats(self) -> Dict[str, int]:
+        checks = self.not_modified + self.hash_matches + self.changed
+        return {
+            "entries": len(self._entries),
+            "not_modified": self.not_modified,
+            "hash_matches": self.hash_matches,
+            "changed": self.changed,
+            "unchanged_ratio": round((self.not_modified + self.hash_matches) / checks, 4) if checks else 0.0,
+        }
+
+
+page_validators = PageValidatorCache()
@@ -0,0 +1,92 @@
+import asyncio
+import logging
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+EXECUTOR_KINDS = ("none", "thread", "process")
+
+
+@dataclass
+class ParseExecutorConfig:
+    """Where vendor responses are parsed"""
+    kind: str = "none"              # "none" (on the event loop), "thread" or "process"
+    max_workers: int = 4
+    min_bytes: int = 64 * 1024      # smaller payloads are parsed inline, offloading costs more than it saves
+
+    @classmethod
+    def from_env(cls) -> "ParseExecutorConfig":
+        return cls(
+            kind=os.getenv("PARSE_EXECUTOR", "none"),
+            max_workers=int(os.getenv("PARSE_WORKERS", 4)),
+            min_bytes=int(os.getenv("PARSE_MIN_BYTES", 64 * 1024)),
+        )
+
+
+class ParseExecutor:
+    """
+    Runs CPU-bound parse steps (selectors, HTML/JSON-LD extraction, big JSON
+    decodes) off the event loop once the raw payload is large enough to stall
+    other in-flight requests.
+    Parse functions take the raw response bytes and return plain dataclasses,
+    so they pickle cleanly into a process pool.
+    """
+
+    def __init__(self, config: Optional[ParseExecutorConfig] = None):
+        self.config = self._validate(config or ParseExecutorConfig())
+        self._pool: Optional[Executor] = None
+
+        # Counters
+        self.inline = 0
+        self.offloaded = 0
+
+    @staticmethod
+    def _validate(config: ParseExecutorConfig) -> ParseExecutorConfig:
+        if config.kind not in EXECUTOR_KINDS:
+            raise ValueError(f"Unknown parse executor '{config.kind}', expected one of {EXECUTOR_KINDS}")
+        return config
+
+    def _get_pool(self) -> Executor:
+        if self._pool is None:
+            if self.config.kind == "process":
+                self._pool = ProcessPoolExecutor(max_workers=self.config.max_workers)
+            else:
+                self._pool = ThreadPoolExecutor(max_workers=self.config.max_workers, thread_name_prefix="parse")
+            logger.info(f"Parse executor started ({self.config.kind}, {self.config.max_workers} workers)")
+        return self._pool
+
+    def configure(self, config: ParseExecutorConfig):
+        """Swap in new settings; an existing pool is shut down and rebuilt lazily"""
+        self.config = self._validate(config)
+        self.shutdown()
+
+    async def run(self, fn: Callable[..., Any], payload: bytes, *args) -> Any:
+        """fn(payload, *args), offloaded when the payload is at least min_bytes"""
+        if self.config.kind == "none" or len(payload) < self.config.min_bytes:
+            self.inline += 1
+            return fn(payload, *args)
+
+        self.offloaded += 1
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_pool(), fn, payload, *args)
+
+    def shutdown(self, wait: bool = True):
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait)
+            self._pool = None
+            logger.info("Parse executor shut down")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "kind": self.config.kind,
+            "max_workers": self.config.max_workers,
+            "min_bytes": self.config.min_bytes,
+            "inline": self.inline,
+            "offloaded": self.offloaded,
+        }
+
+
+parse_executor = ParseExecutor(ParseExecutorConfig.from_env())
@@ -0,0 +1,153 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+
+from backend.vendor_models import RateLimitPolicy, VendorConfig
+
+logger = logging.getLogger(__name__)
+
+# Statuses that mean "slow down" rather than "this request is broken"
+THROTTLE_STATUSES = {429, 503}
+# Non-200 statuses that say nothing about vendor load
+NEUTRAL_STATUSES = {404}
+
+THROUGHPUT_WINDOW = 60.0  # seconds
+
+
+class AdaptiveRateLimiter:
+    """
+    Token bucket plus concurrency cap for one vendor, adapted AIMD-style:
+    every success adds `increase_step` req/s up to the ceiling, every throttle
+    signal multiplies the rate by `decrease_factor` down to `min_rate`.
+    """
+
+    def __init__(self, name: str, policy: RateLimitPolicy):
+        self.name = name
+        self.policy = policy
+        self.max_rate = policy.max_rate or policy.requests_per_second
+        self.rate = policy.requests_per_second
+        self.tokens = float(policy.burst)
+        self._refilled_at = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+        self._concurrency = asyncio.Semaphore(policy.max_concurrent)
+
+        # Metrics
+        self.in_flight = 0
+        self.requests = 0
+        self.successes = 0
+        self.throttle_events = 0
+        self.throttled_wait_seconds = 0.0
+        self._completed = deque()
+
+    def _refill(self, now: float):
+        elapsed = now - self._refilled_at
+        self._refilled_at = now
+        self.tokens = min(float(self.policy.burst), self.tokens + elapsed * self.rate)
+
+    async def acquire(self):
+        """Wait until a token is available. Waiters are served in FIFO order."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                else:
+                    self._refill(now)
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+                self.throttled_wait_seconds += wait
+                await asyncio.sleep(wait)
+
+    @asynccontextmanager
+    async def limit(self):
+        await self.acquire()
+        async with self._concurrency:
+            self.in_flight += 1
+            self.requests += 1
+            try:
+                yield self
+            finally:
+                self.in_flight -= 1
+                self._record_completion()
+
+    def _record_completion(self):
+        now = time.monotonic()
+        self._completed.append(now)
+        while self._completed and self._completed[0] < now - THROUGHPUT_WINDOW:
+            self._completed.popleft()
+
+    def record_success(self):
+        self.successes += 1
+        self.rate = min(self.max_rate, self.rate + self.policy.increase_step)
+
+    def record_failure(self, status: Optional[int], retry_after: Optional[float] = None):
+        """Feed a non-200 response back into the limiter"""
+        if status in NEUTRAL_STATUSES:
+            return
+        self.throttle_events += 1
+        previous = self.rate
+        self.rate = max(self.policy.min_rate, self.rate * self.policy.decrease_factor)
+        # Drop any banked burst so the lower rate takes effect immediately
+        self.tokens = min(self.tokens, 0.0)
+        if status in THROTTLE_STATUSES and retry_after:
+            self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+        logger.warning(f"[{self.name}] throttled (status {status}): rate {previous:.2f} -> {self.rate:.2f} req/s")
+
+    @property
+    def throughput(self) -> float:
+        """Completed requests per second over the last THROUGHPUT_WINDOW seconds"""
+        cutoff = time.monotonic() - THROUGHPUT_WINDOW
+        recent = sum(1 for t in self._completed if t >= cutoff)
+        return recent / THROUGHPUT_WINDOW
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "rate": round(self.rate, 3),
+            "max_rate": self.max_rate,
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "successes": self.successes,
+            "throttle_events": self.throttle_events,
+            "throttled_wait_seconds": round(self.throttled_wait_seconds, 3),
+            "throughput": round(self.throughput, 3),
+        }
+
+
+class RateLimiterRegistry:
+    """One AdaptiveRateLimiter per VendorConfig.name, shared process-wide"""
+
+    def __init__(self):
+        self._limiters: Dict[str, AdaptiveRateLimiter] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def get(self, config: VendorConfig) -> AdaptiveRateLimiter:
+        # asyncio primitives are bound to one loop; start over if the loop changed
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if loop is not None and loop is not self._loop:
+            self._limiters.clear()
+            self._loop = loop
+
+        limiter = self._limiters.get(config.name)
+        if limiter is None:
+            limiter = AdaptiveRateLimiter(config.name, config.rate_limit)
+            self._limiters[config.name] = limiter
+        return limiter
+
+    def reset(self):
+        """Drop every limiter; the next request per vendor starts again from its policy"""
+        self._limiters.clear()
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        return {name: limiter.stats() for name, limiter in self._limiters.items()}
+
+
+rate_limiters = RateLimiterRegistry()
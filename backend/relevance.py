@@ -0,0 +1,162 @@
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import FrozenSet, List, Optional, Sequence, Set, Tuple
+
+from backend.vendor_models import SearchResultProduct
+
+_SPLIT_RE = re.compile(r"[\s,;/|()\[\]]+")
+_PUNCT_RE = re.compile(r"[\W_]+")
+_DIGIT_RE = re.compile(r"\d")
+
+# Words that mark a search result as an add-on for the product rather than the product
+ACCESSORY_TERMS = frozenset({
+    "מסנן", "פילטר", "כיסוי", "מעמד", "זרנוק", "מתאם", "אביזר", "ידית", "מדף", "מגירה", "שלט",
+    "filter", "cover", "stand", "hose", "adapter", "accessory", "handle", "shelf", "remote",
+})
+
+
+def compact(text: str) -> str:
+    """Lowercased text with whitespace and punctuation removed: "GR-730 BINS" -> "gr730bins" """
+    return _PUNCT_RE.sub("", text).lower()
+
+
+def tokenize(text: Optional[str]) -> Set[str]:
+    """Normalized word tokens; punctuation inside a word is dropped so "GR-730BINS" stays one token"""
+    tokens = set()
+    if not text:
+        return tokens
+    for word in _SPLIT_RE.split(text.lower()):
+        if not word.isalnum():
+            word = _PUNCT_RE.sub("", word)
+        if word:
+            tokens.add(word)
+    return tokens
+
+
+def is_model_number(token: str) -> bool:
+    return len(token) >= 4 and _DIGIT_RE.search(token) is not None
+
+
+def model_number(text: Optional[str]) -> Optional[str]:
+    """
+    The model number in `text` as written, uppercased: "מקרר LG GR-730BINS" -> "GR-730BINS".
+    Mixed letters-and-digits words win over plain numbers (years, capacities).
+    """
+    best = None
+    for word in _SPLIT_RE.split(text or ""):
+        word = word.strip("-_.:'\"")
+        token = compact(word)
+        if not is_model_number(token):
+            continue
+        rank = (not token.isdigit(), len(token))
+        if best is None or rank > best[0]:
+            best = (rank, word.upper())
+    return best[1] if best else None
+
+
+def to_price(value) -> Optional[float]:
+    if isinstance(value, str):
+        value = value.replace(",", "")
+    try:
+        price = float(value)
+    except (TypeError, ValueError):
+        return None
+    # Vendors without prices in their autocomplete report 0
+    return price if price > 0 else None
+
+
+@dataclass(frozen=True)
+class QueryProfile:
+    """Everything about a query the ranker needs, computed once per query"""
+    tokens: FrozenSet[str]
+    model_numbers: Tuple[str, ...]
+
+
+@lru_cache(maxsize=4096)
+def profile_query(query: str) -> QueryProfile:
+    tokens = frozenset(tokenize(query))
+    return QueryProfile(tokens=tokens, model_numbers=tuple(t for t in tokens if is_model_number(t)))
+
+
+@dataclass
+class RelevanceRanker:
+    """
+    Scores search results against the query and picks the best one, or none
+    when nothing clears `threshold`.
+
+    score = model * (1.0 exact model-number token, 0.7 model number inside the name)
+          + overlap * share of query tokens found in the result
+          + price plausibility vs the anchor price (bonus inside the band, penalty outside)
+          - accessory penalty when the result looks like an add-on the query didn't ask for
+    Ties keep the vendor's own order.
+    """
+    model_weight: float = 1.0
+    overlap_weight: float = 0.5
+    plausible_price_bonus: float = 0.25
+    implausible_price_penalty: float = 1.0
+    price_band: Tuple[float, float] = (0.5, 2.0)   # allowed price / anchor ratio
+    accessory_penalty: float = 0.5
+    accessory_terms: FrozenSet[str] = field(default=ACCESSORY_TERMS)
+    threshold: float = 0.4
+
+    def score(self, profile: QueryProfile, item: SearchResultProduct, anchor_price: Optional[float] = None) -> float:
+        name = item.name or ""
+        item_tokens = tokenize(f"{name} {item.SKU}" if item.SKU else name)
+
+        score = 0.0
+        if profile.model_numbers:
+            compact_name = None
+            best = 0.0
+            for model in profile.model_numbers:
+                if model in item_tokens:
+                    best = 1.0
+                    break
+                if compact_name is None:
+                    compact_name = compact(name) + compact(item.SKU or "")
+                if model in compact_name:
+                    best = 0.7
+            score += self.model_weight * best
+
+        if profile.tokens:
+            score += self.overlap_weight * len(profile.tokens & item_tokens) / len(profile.tokens)
+
+        if anchor_price:
+            price = to_price(item.disc_price) or to_price(item.orig_price)
+            if price is not None:
+                low, high = self.price_band
+                if low <= price / anchor_price <= high:
+                    score += self.plausible_price_bonus
+                else:
+                    score -= self.implausible_price_penalty
+
+        if (item_tokens & self.accessory_terms) - profile.tokens:
+            score -= self.accessory_penalty
+
+        return score
+
+    def rank(
+        self, query: str, items: Sequence[SearchResultProduct], anchor_price: Optional[float] = None
+    ) -> List[Tuple[float, SearchResultProduct]]:
+        """(score, item) pairs, best first"""
+        profile = profile_query(query)
+        anchor_price = to_price(anchor_price)
+        scored = [(self.score(profile, item, anchor_price), item) for item in items]
+        # sorted() is stable, so equal scores keep the vendor's order
+        return sorted(scored, key=lambda pair: pair[0], reverse=True)
+
+    def select(
+        self, query: str, items: Sequence[SearchResultProduct], anchor_price: Optional[float] = None
+    ) -> Optional[SearchResultProduct]:
+        profile = profile_query(query)
+        anchor_price = to_price(anchor_price)
+        best_item, best_score = None, self.threshold
+        for item in items:
+            score = self.score(profile, item, anchor_price)
+            # Strictly greater, so the earliest of equally good results wins
+            if score > best_score or (best_item is None and score == best_score):
+                best_item, best_score = item, score
+        return best_item
+
+
+default_ranker = RelevanceRanker()
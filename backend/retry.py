@@ -0,0 +1,95 @@
+import asyncio
+import random
+from collections import deque
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+
+from backend.vendor_exceptions import ProductFetchException, SearchFailedException
+from backend.vendor_models import RetryPolicy
+
+T = TypeVar("T")
+
+LATENCY_SAMPLES = 200  # recent successful fetches kept per vendor
+
+
+def backoff_delay(attempt: int, policy: RetryPolicy) -> float:
+    """Full-jitter exponential backoff for the given (1-based) failed attempt"""
+    ceiling = min(policy.backoff_cap, policy.backoff_base * (2 ** (attempt - 1)))
+    return random.uniform(0, ceiling)
+
+
+def is_retryable(error: Exception, policy: RetryPolicy) -> bool:
+    if isinstance(error, SearchFailedException):
+        return error.status in policy.retryable_statuses
+    # Connection errors and timeouts surface as ProductFetchException
+    return isinstance(error, ProductFetchException)
+
+
+class LatencyTracker:
+    """Rolling window of fetch latencies used to derive the hedge delay"""
+
+    def __init__(self, size: int = LATENCY_SAMPLES):
+        self._samples = deque(maxlen=size)
+
+    def record(self, seconds: float):
+        self._samples.append(seconds)
+
+    def __len__(self):
+        return len(self._samples)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        idx = min(len(ordered) - 1, int(len(ordered) * pct / 100))
+        return ordered[idx]
+
+
+_latency_trackers: Dict[str, LatencyTracker] = {}
+
+
+def latency_tracker(vendor_name: str) -> LatencyTracker:
+    tracker = _latency_trackers.get(vendor_name)
+    if tracker is None:
+        tracker = _latency_trackers[vendor_name] = LatencyTracker()
+    return tracker
+
+
+def hedge_delay(tracker: LatencyTracker, policy: RetryPolicy) -> Optional[float]:
+    """Delay before firing a hedge, or None while there is too little history"""
+    if not policy.hedge or len(tracker) < policy.hedge_min_samples:
+        return None
+    return max(policy.hedge_min_delay, tracker.percentile(policy.hedge_percentile))
+
+
+async def hedged(call: Callable[[], Awaitable[T]], delay: Optional[float]) -> T:
+    """
+    Run `call`; if it has not finished after `delay` seconds start a second copy
+    and return whichever succeeds first. The loser is cancelled. If the first
+    attempt fails before the delay, its error propagates without hedging.
+    """
+    if delay is None:
+        return await call()
+
+    first = asyncio.ensure_future(call())
+    tasks = [first]
+    try:
+        done, _ = await asyncio.wait({first}, timeout=delay)
+        if done:
+            return first.result()
+
+        tasks.append(asyncio.ensure_future(call()))
+        pending = set(tasks)
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        # Also covers the caller being cancelled (e.g. by a scrape deadline) mid-wait:
+        # no attempt may keep its limiter slot and connection after we return
+        for task in tasks:
+            if not task.done():
+                task.cancel()
@@ -0,0 +1,114 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from backend.vendor_models import ProductSchema
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullException(Exception):
+    """Raised when the job queue is at capacity"""
+    pass
+
+
+@dataclass
+class ScrapeJob:
+    scrape_id: int
+    query: str
+    status: str = "queued"    # queued -> running -> done | failed
+    results: List[Tuple[str, ProductSchema]] = field(default_factory=list)
+    error: Optional[str] = None
+    enqueued_at: float = field(default_factory=time.monotonic)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+
+JobRunner = Callable[[ScrapeJob], Awaitable[List[Tuple[str, ProductSchema]]]]
+
+
+class ScrapeJobQueue:
+    """
+    In-process scrape queue drained by a fixed pool of async workers.
+
+    The queue is bounded so a burst of enqueues costs memory, not latency:
+    `submit` never waits, it raises QueueFullException when at capacity.
+    Finished jobs are remembered up to `max_finished`; older ones are only
+    available from the database. Jobs still queued when the process stops
+    are lost (their scraping_sessions rows stay 'queued'); the runner is
+    expected to move the row of a job that raises or is cancelled mid-run
+    to 'failed' / 'cancelled' itself (run_multi_vendor_scrape does).
+    """
+
+    def __init__(self, runner: JobRunner, workers: int = 4, max_queued: int = 10_000, max_finished: int = 10_000):
+        self.runner = runner
+        self.worker_count = workers
+        self.max_queued = max_queued
+        self.max_finished = max_finished
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._jobs: Dict[int, ScrapeJob] = {}
+        self._finished = deque()
+
+    def start(self):
+        if self._workers:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queued)
+        self._workers = [asyncio.create_task(self._work(i)) for i in range(self.worker_count)]
+        logger.info(f"Started {self.worker_count} scrape job workers")
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def has_capacity(self) -> bool:
+        return self._queue is not None and not self._queue.full()
+
+    def submit(self, scrape_id: int, query: str) -> ScrapeJob:
+        if self._queue is None:
+            raise RuntimeError("ScrapeJobQueue.start() must be called before submitting jobs")
+        job = ScrapeJob(scrape_id=scrape_id, query=query)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise QueueFullException(f"Scrape job queue is full ({self.max_queued} jobs)")
+        self._jobs[scrape_id] = job
+        return job
+
+    def get(self, scrape_id: int) -> Optional[ScrapeJob]:
+        return self._jobs.get(scrape_id)
+
+    async def _work(self, worker_id: int):
+        while True:
+            job = await self._queue.get()
+            job.status = "running"
+            job.started_at = time.monotonic()
+            try:
+                job.results = await self.runner(job)
+                job.status = "done"
+            except asyncio.CancelledError:
+                job.status = "failed"
+                job.error = "cancelled"
+                raise
+            except Exception as e:
+                logger.error(f"Scrape job {job.scrape_id} ('{job.query}') failed: {e}")
+                job.status = "failed"
+                job.error = str(e)
+            finally:
+                job.finished_at = time.monotonic()
+                self._queue.task_done()
+                self._finished.append(job.scrape_id)
+                while len(self._finished) > self.max_finished:
+                    self._jobs.pop(self._finished.popleft(), None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": len(self._workers),
+            "queued": self._queue.qsize() if self._queue else 0,
+            "tracked_jobs": len(self._jobs),
+        }
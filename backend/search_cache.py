@@ -0,0 +1,124 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from backend.single_flight import SingleFlight
+from backend.vendor_exceptions import DeadlineExceededException
+from backend.vendor_models import SearchResultProduct
+
+logger = logging.getLogger(__name__)
+
+CacheKey = Tuple[str, str]
+
+
+def normalize_query(query: str) -> str:
+    """Case- and whitespace-insensitive form of a search query"""
+    return " ".join(query.lower().split())
+
+
+class SearchCache:
+    """
+    TTL + LRU cache of parsed autocomplete results keyed by (vendor, normalized query).
+    Concurrent misses for the same key share a single in-flight fetch.
+    Failed fetches are never cached.
+    The shared fetch runs on the first caller's deadline; a caller that joined
+    it and sees it run out of time (or get cancelled) fetches again on its own
+    budget rather than failing with the first caller's error.
+    """
+
+    def __init__(self, max_entries: int = 10_000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[CacheKey, Tuple[float, List[SearchResultProduct]]]" = OrderedDict()
+        self._flight = SingleFlight()
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+        self.retried = 0    # joined a shared fetch that failed on its owner's deadline
+
+    def _lookup(self, key: CacheKey) -> Optional[List[SearchResultProduct]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def _store(self, key: CacheKey, value: List[SearchResultProduct], ttl: float):
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def get_or_fetch(
+        self,
+        vendor_name: str,
+        query: str,
+        ttl: float,
+        fetch: Callable[[], Awaitable[List[SearchResultProduct]]],
+    ) -> List[SearchResultProduct]:
+        if ttl <= 0:
+            return await fetch()
+
+        key = (vendor_name, normalize_query(query))
+
+        cached = self._lookup(key)
+        if cached is not None:
+            self.hits += 1
+            return list(cached)
+
+        own_fetch = False
+
+        async def fetch_and_store():
+            nonlocal own_fetch
+            own_fetch = True
+            self.misses += 1
+            value = await fetch()
+            self._store(key, value, ttl)
+            return value
+
+        try:
+            return list(await self._flight.do(key, fetch_and_store))
+        except (DeadlineExceededException, asyncio.CancelledError):
+            if own_fetch or asyncio.current_task().cancelling():
+                raise
+        # Another caller's deadline or cancellation ended the shared fetch, not ours
+        self.retried += 1
+        return list(await fetch_and_store())
+
+    def invalidate(self, vendor_name: Optional[str] = None):
+        if vendor_name is None:
+            self._entries.clear()
+            return
+        for key in [k for k in self._entries if k[0] == vendor_name]:
+            del self._entries[key]
+
+    @property
+    def coalesced(self) -> int:
+        return self._flight.shared
+
+    def stats(self) -> Dict[str, int]:
+        # A retried caller counts once as coalesced and once as a miss
+        lookups = self.hits + self.misses + self.coalesced - self.retried
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "expirations": self.expirations,
+            "evictions": self.evictions,
+            "retried": self.retried,
+            "hit_ratio": round((self.hits + self.coalesced - self.retried) / lookups, 4) if lookups else 0.0,
+        }
+
+
+search_cache = SearchCache()
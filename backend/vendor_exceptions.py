@@ -7,7 +7,9 @@ class MissingFieldException(VendorScraperException):
 
 class SearchFailedException(VendorScraperException):
     """Raised when search endpoint fails"""
-    pass
+    def __init__(self, message: str = "", status: int = None):
+        super().__init__(message)
+        self.status = status
 
 
 class ProductFetchException(VendorScraperException):
@@ -32,4 +34,8 @@ class NoProductsFoundException(VendorScraperException):
 
 class VendorNotFoundInDatabaseException(VendorScraperException):
     """Raised when a vendor is not found in the database"""
-    pass
\ No newline at end of file
+    pass
+
+class DeadlineExceededException(VendorScraperException):
+    """Raised when a scrape runs out of its overall time budget"""
+    pass
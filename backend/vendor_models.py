@@ -1,6 +1,6 @@
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional, Callable
-from dataclasses import dataclass, field, asdict
+from typing import List, Dict, Any, Optional, Callable, Tuple
+from dataclasses import dataclass, field, fields
 from enum import Enum
 
 class FetchMethod(Enum):
@@ -15,7 +15,7 @@ class RequestMethod(Enum):
     POST = "POST"
 
 
-@dataclass
+@dataclass(slots=True)
 class ProductSchema:
     """Normalized product schema"""
     SKU: str
@@ -31,9 +31,17 @@ class ProductSchema:
     item_condition: Optional[str] = None
     brand: Optional[str] = None
     metadata: Optional[Dict[str, Any]] = None
-    additional_info: Dict[str, Any] = field(default_factory=dict)
+    additional_info: Optional[Dict[str, Any]] = None  # None until a vendor has something to put in it
+    unchanged: bool = False  # page identical to the last fetch (304 / same content hash)
 
-@dataclass
+    def to_dict(self) -> Dict[str, Any]:
+        """Shallow field dict for JSON responses (no deep copy, unlike dataclasses.asdict)"""
+        d = {name: getattr(self, name) for name in _PRODUCT_FIELDS}
+        if d["additional_info"] is None:
+            d["additional_info"] = {}
+        return d
+
+@dataclass(slots=True)
 class SearchResultProduct:
     name: str = None
     description: Optional[str] = None
@@ -42,13 +50,46 @@ class SearchResultProduct:
     img_src: Optional[str] = None
     orig_price: Optional[int] = None
     disc_price: Optional[int] = None
-    additional_info: Dict[str, Any] = field(default_factory=dict)
+    additional_info: Optional[Dict[str, Any]] = None  # None until a vendor has something to put in it
 
     def to_dict(self) -> Dict[str, Any]:
-        return asdict(self)
+        d = {name: getattr(self, name) for name in _SEARCH_RESULT_FIELDS}
+        if d["additional_info"] is None:
+            d["additional_info"] = {}
+        return d
     
     def __bool__(self):
-        return any([self.name, self.description, self.SKU, self.url, self.img_src, self.orig_price, self.disc_price])
+        return bool(self.name or self.description or self.SKU or self.url or self.img_src or self.orig_price or self.disc_price)
+
+
+_PRODUCT_FIELDS = tuple(f.name for f in fields(ProductSchema))
+_SEARCH_RESULT_FIELDS = tuple(f.name for f in fields(SearchResultProduct))
+
+
+@dataclass
+class RateLimitPolicy:
+    """Token-bucket limits shared by every scraper of a vendor"""
+    requests_per_second: float = 5.0
+    burst: int = 5
+    max_concurrent: int = 5
+    min_rate: float = 0.2                # floor the rate never backs off below
+    max_rate: Optional[float] = None     # ramp-up ceiling, defaults to requests_per_second
+    increase_step: float = 0.1           # additive increase (req/s) per successful request
+    decrease_factor: float = 0.5         # multiplicative decrease on a throttle signal
+
+
+@dataclass
+class RetryPolicy:
+    """Retry and hedging behaviour for a vendor's HTTP fetches"""
+    max_attempts: int = 3
+    backoff_base: float = 0.25           # seconds, doubled per attempt
+    backoff_cap: float = 4.0             # upper bound for a single backoff sleep
+    retryable_statuses: Tuple[int, ...] = (429, 500, 502, 503, 504)
+    deadline: float = 25.0               # total seconds across all attempts of one fetch
+    hedge: bool = False                  # fire a second request when the first is slow
+    hedge_percentile: float = 95         # latency percentile used as the hedge delay
+    hedge_min_delay: float = 0.05
+    hedge_min_samples: int = 20          # history needed before hedging kicks in
 
 
 @dataclass
@@ -63,3 +104,6 @@ class VendorConfig:
     search_param: Optional[str] = None
     fetch_method: FetchMethod = FetchMethod.HTML_JSON_LD
     product_data_endpoint: Optional[str] = None
+    rate_limit: RateLimitPolicy = field(default_factory=RateLimitPolicy)
+    retry: RetryPolicy = field(default_factory=RetryPolicy)
+    search_cache_ttl: float = 300        # seconds autocomplete results are reused, 0 disables
@@ -3,20 +3,56 @@ from backend.vendor_exceptions import SearchFailedException
 import asyncio
 import json
 import logging
+import time
 from abc import ABC, abstractmethod
 from typing import List, Dict, Any, Optional, Callable
-from dataclasses import dataclass, field, asdict
+from dataclasses import dataclass, field, asdict, replace
 from enum import Enum
 import aiohttp
 # from bs4 import BeautifulSouptouc
 
 from backend.vendor_models import FetchMethod, RequestMethod, ProductSchema, SearchResultProduct, VendorConfig 
 from backend.vendor_exceptions import * 
+from backend.http_session import get_shared_session
+from backend.rate_limiter import AdaptiveRateLimiter, rate_limiters
+from backend.search_cache import search_cache
+from backend.page_cache import NOT_MODIFIED, page_validators
+from backend.json_ld import find_product_json_ld, loads
+from backend.parse_executor import parse_executor
+from backend.relevance import RelevanceRanker, default_ranker
+from backend.deadline import Deadline
+from backend.metrics import http_responses, limiter_wait_seconds, response_bytes, stage_seconds
+from backend.retry import LatencyTracker, backoff_delay, hedge_delay, hedged, is_retryable, latency_tracker
 
 from selectolax.lexbor import LexborHTMLParser
 
     
 
+def _retry_after(response: aiohttp.ClientResponse) -> Optional[float]:
+    """Retry-After header in seconds, if the vendor sent a numeric one"""
+    value = response.headers.get("Retry-After")
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+def _utf8(raw: bytes, charset: Optional[str]) -> bytes:
+    """Response body as UTF-8 bytes, transcoding the rare non-UTF-8 vendor page"""
+    if charset and charset.lower().replace("-", "") not in ("utf8", "ascii"):
+        return raw.decode(charset, errors="replace").encode()
+    return raw
+
+
+def _decode_json(body: bytes):
+    return loads(body) if body else None
+
+
+def _parse_json(body: bytes, parse: Callable, *args):
+    """Decode a raw JSON response and hand it to a parse callable (runs in the parse executor)"""
+    return parse(_decode_json(body), *args)
+
+
 class BaseVendorScraper(ABC):
     """Base class for vendor scrapers"""
     
@@ -24,16 +60,15 @@ class BaseVendorScraper(ABC):
         self,
         vendor_name: str,
         config: VendorConfig,
-        max_concurrent_requests: int = 5,
         timeout: int = 30,
-        logger: Optional[logging.Logger] = None
+        logger: Optional[logging.Logger] = None,
+        ranker: Optional[RelevanceRanker] = None
     ):
         self.vendor_name = vendor_name
         self.config = config
-        self.max_concurrent_requests = max_concurrent_requests
         self.timeout = aiohttp.ClientTimeout(total=timeout)
-        self.semaphore = asyncio.Semaphore(max_concurrent_requests)
         self.logger = logger or logging.getLogger(f"{__name__}.{vendor_name}")
+        self.ranker = ranker or default_ranker
         
         
         if self.config.fetch_method == FetchMethod.API:
@@ -54,16 +89,82 @@ class BaseVendorScraper(ABC):
         data: Optional[Dict[str, Any]] = None,
         cookies: Optional[Dict[str, Any]] = None,
         timeout: int = 20,
-        is_return_json: bool = False
+        is_return_json: bool = False,
+        conditional: bool = False,
+        raw: bool = False,
+        deadline: Optional[Deadline] = None
     ):
-        """Fetch URL content with semaphore control"""
+        """
+        Fetch URL content under the vendor's shared rate limiter, retrying
+        transient failures with jittered backoff according to config.retry.
+        Attempts and backoff sleeps never run past the scrape's `deadline`;
+        DeadlineExceededException is raised once it is spent.
+        With `conditional`, the URL's stored validators are sent and NOT_MODIFIED
+        is returned when the vendor answers 304 or the body hash is unchanged.
+        With `raw`, the body is returned as UTF-8 bytes for the parse executor.
+        """
         
         # h = {"User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/138.0.0.0 Safari/537.36"}
         
         if not url:
             raise ValueError("No URL was provided to the _fetch method, check caller")
 
-        async with self.semaphore:
+        if conditional:
+            headers = {**(headers or {}), **page_validators.conditional_headers(url)}
+
+        policy = self.config.retry
+        tracker = latency_tracker(self.vendor_name)
+        loop = asyncio.get_running_loop()
+        fetch_budget = deadline.cap(policy.deadline) if deadline else policy.deadline
+        fetch_deadline = loop.time() + fetch_budget
+
+        attempt = 0
+        while True:
+            attempt += 1
+            remaining = fetch_deadline - loop.time()
+            if deadline and deadline.expired:
+                raise DeadlineExceededException(f"[{self.vendor_name}] Scrape deadline reached before fetching {url}")
+            # ClientTimeout(total=0) would mean no timeout at all
+            attempt_timeout = aiohttp.ClientTimeout(total=max(0.001, min(timeout, remaining)))
+
+            async def fetch_once():
+                return await self._fetch_once(
+                    session, url, headers, params, data, cookies, attempt_timeout, is_return_json, tracker, conditional, raw
+                )
+
+            try:
+                return await hedged(fetch_once, hedge_delay(tracker, policy))
+            except (SearchFailedException, ProductFetchException) as e:
+                if deadline and deadline.expired:
+                    raise DeadlineExceededException(f"[{self.vendor_name}] Scrape deadline reached fetching {url}: {e}") from e
+                if attempt >= policy.max_attempts or not is_retryable(e, policy):
+                    raise
+                delay = backoff_delay(attempt, policy)
+                if loop.time() + delay >= fetch_deadline:
+                    raise
+                self.logger.warning(f"[{self.vendor_name}] attempt {attempt} failed ({e}), retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+
+    async def _fetch_once(
+        self,
+        session: aiohttp.ClientSession,
+        url: str,
+        headers: Optional[Dict[str, str]],
+        params: Optional[Dict[str, Any]],
+        data: Optional[Dict[str, Any]],
+        cookies: Optional[Dict[str, Any]],
+        timeout: aiohttp.ClientTimeout,
+        is_return_json: bool,
+        tracker: LatencyTracker,
+        conditional: bool = False,
+        raw: bool = False
+    ):
+        """Single HTTP attempt; records latency and metrics and feeds the rate limiter"""
+        limiter = self.rate_limiter
+        queued = time.perf_counter()
+        async with limiter.limit():
+            started = time.perf_counter()
+            limiter_wait_seconds.observe(started - queued, self.vendor_name)
             try:
                 async with session.get(
                     url,
@@ -73,66 +174,169 @@ class BaseVendorScraper(ABC):
                     cookies=cookies,
                     timeout=timeout
                 ) as response:
+                    http_responses.inc(self.vendor_name, response.status)
+
+                    if conditional and response.status == 304 and page_validators.record_not_modified(url):
+                        limiter.record_success()
+                        tracker.record(time.perf_counter() - started)
+                        return NOT_MODIFIED
 
                     if response.status != 200:
-                        raise SearchFailedException(f"Error fetching {url}: Status {response.status}")
+                        limiter.record_failure(response.status, _retry_after(response))
+                        raise SearchFailedException(f"Error fetching {url}: Status {response.status}", status=response.status)
                     
-                    if is_return_json:
-                        return await response.json(content_type=None)
-                    return await response.text()
+                    limiter.record_success()
+                    # Buffers the body; the json()/text() decoders below reuse it
+                    content = await response.read()
+                    response_bytes.inc(self.vendor_name, amount=len(content))
+                    if conditional and page_validators.record_response(
+                        url, response.headers.get("ETag"), response.headers.get("Last-Modified"), content
+                    ):
+                        tracker.record(time.perf_counter() - started)
+                        return NOT_MODIFIED
+                    if raw:
+                        body = _utf8(content, response.charset)
+                    elif is_return_json:
+                        body = await response.json(content_type=None)
+                    else:
+                        body = await response.text()
+                    tracker.record(time.perf_counter() - started)
+                    return body
                 
             except aiohttp.ClientError as e:
+                http_responses.inc(self.vendor_name, "error")
                 raise ProductFetchException(f"Error fetching {url}: {str(e)}") from e
             except asyncio.TimeoutError as e:
+                http_responses.inc(self.vendor_name, "timeout")
                 raise ProductFetchException(f"Timeout fetching {url}") from e
+            finally:
+                stage_seconds.observe(time.perf_counter() - started, self.vendor_name, "fetch")
     
+    @property
+    def rate_limiter(self) -> AdaptiveRateLimiter:
+        """Limiter shared by every scraper instance of this vendor"""
+        return rate_limiters.get(self.config)
+
     async def run(
         self,
-        session: aiohttp.ClientSession,
-        query: str
+        session: Optional[aiohttp.ClientSession],
+        query: str,
+        anchor_price: Optional[float] = None,
+        deadline: Optional[Deadline] = None,
+        search_results: Optional[List[SearchResultProduct]] = None
     ) -> ProductSchema:
+        """
+        Search `query`, pick the most relevant result and scrape its product page.
+        `anchor_price` (the Traklin price, when known) lets the ranker reject
+        results priced nothing like the product, e.g. accessories.
+        Search and product fetch share one `deadline`, by default the
+        scraper's `timeout` from now.
+        `search_results` already fetched for this vendor (e.g. by a speculative
+        search) skip the search; `query` is then only used to rank them.
+        """
         
+        # Borrow the process-wide pooled session unless the caller brings its own
+        session = session or await get_shared_session()
+        deadline = deadline or Deadline(self.timeout.total)
 
-        search_results: List[SearchResultProduct] = await self.search_product(session, query)
+        if search_results is None:
+            search_results = await self.search_product(session, query, deadline)
 
         if not search_results:
             logger.warning(f"No search result found for query: {query}")
             return None
 
-        # TODO 
-        # choose most relevant product later
-        most_relevant_product = self.select_product(search_results) # return first product for now
+        most_relevant_product = self.select_product(search_results, query, anchor_price)
+        if most_relevant_product is None:
+            logger.warning(f"[{self.vendor_name}] None of {len(search_results)} search results is relevant to query: {query}")
+            return None
         
-        return await self.get_product_data(session, most_relevant_product)
+        return await self.get_product_data(session, most_relevant_product, deadline)
     
     async def fetch_product(
         self,
         session: aiohttp.ClientSession,
         url: str,
-        known_sku: Optional[str] = None
+        known_sku: Optional[str] = None,
+        deadline: Optional[Deadline] = None,
+        last_result: Optional[SearchResultProduct] = None
     ) -> Optional[ProductSchema]:
         """
         Fetch product data directly from a known URL.
         Used when a manual/automatic match exists.
         Bypasses the search step entirely.
         known_sku: If provided, will be used as fallback SKU if page doesn't contain one.
+        last_result: What the search last returned for this product; supplies the
+        fields the page doesn't carry (search prices, additional_info).
+        """
+        if last_result is None:
+            last_result = SearchResultProduct(name="", orig_price=None, disc_price=None)
+        search_result_prod = replace(last_result, url=url, SKU=known_sku)  # known SKU as fallback
+        return await self.get_product_data(session, search_result_prod, deadline)
+
+    async def refresh(
+        self,
+        session: Optional[aiohttp.ClientSession],
+        query: str,
+        url: str,
+        known_sku: Optional[str] = None,
+        deadline: Optional[Deadline] = None,
+        last_result: Optional[SearchResultProduct] = None
+    ) -> Optional[ProductSchema]:
         """
-        # TODO: 
-        # This function may be redundant 
-        search_result_prod = SearchResultProduct(
-            name="",
-            url=url,
-            SKU=known_sku,  # Pass known SKU as fallback
-            orig_price=None,
-            disc_price=None
-        )
-        return await self.get_product_data(session, search_result_prod)
+        Re-scrape an already-matched product straight from its stored URL,
+        one request instead of search + product page.
+        Falls back to `run` (full search) when the page is gone (404) or now
+        carries a different SKU than the one we matched.
+        `last_result` (see `fetch_product`) keeps the search-derived fields of
+        the previous scrape; its additional_info may hold the old snapshot's
+        whole metadata, so keys the page supplies again are dropped from it.
+        """
+        session = session or await get_shared_session()
+        deadline = deadline or Deadline(self.timeout.total)
+
+        try:
+            product = await self.fetch_product(session, url, known_sku, deadline, last_result)
+        except SearchFailedException as e:
+            if e.status != 404:
+                raise
+            logger.info(f"[{self.vendor_name}] Stored URL {url} returned 404, falling back to search")
+            return await self.run(session, query, deadline=deadline)
+
+        if product is None:
+            logger.info(f"[{self.vendor_name}] No product at stored URL {url}, falling back to search")
+            return await self.run(session, query, deadline=deadline)
+
+        if known_sku is not None and str(product.SKU) != str(known_sku):
+            logger.info(f"[{self.vendor_name}] SKU changed at {url} ({known_sku} -> {product.SKU}), falling back to search")
+            return await self.run(session, query, deadline=deadline)
+
+        if product.additional_info:
+            extras = {k: v for k, v in product.additional_info.items() if k not in (product.metadata or {})}
+            product = replace(product, additional_info=extras or None)
+        return product
 
     
     async def search_product(
         self,
         session: aiohttp.ClientSession,
         query: str,
+        deadline: Optional[Deadline] = None,
+    ) -> List[SearchResultProduct]:
+        """Search results for query, served from the shared search cache when fresh"""
+        with stage_seconds.time(self.vendor_name, "search"):
+            return await search_cache.get_or_fetch(
+                self.vendor_name,
+                query,
+                self.config.search_cache_ttl,
+                lambda: self._search_product_uncached(session, query, deadline),
+            )
+
+    async def _search_product_uncached(
+        self,
+        session: aiohttp.ClientSession,
+        query: str,
+        deadline: Optional[Deadline] = None,
     ) -> List[SearchResultProduct]:
         
         config = self.config
@@ -162,12 +366,14 @@ class BaseVendorScraper(ABC):
         # # the first product!
         # search_result = self.parse_search_result(raw_products)
 
-        response = await self._fetch(session, search_endpoint, headers=headers, params=params, data=data, cookies=cookies, is_return_json=True)
+        response = await self._fetch(session, search_endpoint, headers=headers, params=params, data=data, cookies=cookies, raw=True, deadline=deadline)
 
-        search_results: List[SearchResultProduct] = self.parse_search_result(response)
+        with stage_seconds.time(self.vendor_name, "parse_search"):
+            search_results: List[SearchResultProduct] = await parse_executor.run(_parse_json, response, self.parse_search_result)
 
 
-        logger.info(f"Found {len(search_results)} results for [{self.vendor_name}]:\n{"\n".join(str(i+1) + ": " + prod.name for i, prod in enumerate(search_results))}")
+        listing = "\n".join(str(i+1) + ": " + str(prod.name) for i, prod in enumerate(search_results))
+        logger.info(f"Found {len(search_results)} results for [{self.vendor_name}]:\n{listing}")
         
         return search_results
 
@@ -177,44 +383,98 @@ class BaseVendorScraper(ABC):
     def parse_search_result(self, item: Dict[str, Any]) -> List[SearchResultProduct]:
         pass
     
-    def select_product(self, items):
-        """Heuristic for picking an item from search results"""
-        return items[0]
+    def select_product(
+        self,
+        items: List[SearchResultProduct],
+        query: str,
+        anchor_price: Optional[float] = None
+    ) -> Optional[SearchResultProduct]:
+        """Most relevant search result for the query, or None if nothing clears the ranker's threshold"""
+        with stage_seconds.time(self.vendor_name, "select"):
+            return self.ranker.select(query, items, anchor_price)
     
     async def get_product_data(
         self,
         session: aiohttp.ClientSession,
-        search_result_product: SearchResultProduct
+        search_result_product: SearchResultProduct,
+        deadline: Optional[Deadline] = None
     ) -> ProductSchema:
         
         fetch_method = self.config.fetch_method
         
-        if fetch_method == FetchMethod.HTML_JSON_LD:
-            return await self._get_prod_data_html_json_ld(session, search_result_product)
-        elif fetch_method == FetchMethod.API:
-            return await self._get_prod_data_api(session, search_result_product)
+        with stage_seconds.time(self.vendor_name, "product"):
+            if fetch_method == FetchMethod.HTML_JSON_LD:
+                return await self._get_prod_data_html_json_ld(session, search_result_product, deadline)
+            elif fetch_method == FetchMethod.API:
+                return await self._get_prod_data_api(session, search_result_product, deadline)
     
     async def _get_prod_data_api(
         self,
         session: aiohttp.ClientSession,
-        search_result_product: SearchResultProduct
+        search_result_product: SearchResultProduct,
+        deadline: Optional[Deadline] = None
     ):
         
         prod_sku = search_result_product.SKU or search_result_product.url.split("/")[-1]
         prod_url = f"{self.config.product_data_endpoint.strip('/')}/{prod_sku}"
         
-        prod_obj = await self._fetch(session, prod_url, is_return_json=True)
+        body = await self._fetch(session, prod_url, conditional=True, raw=True, deadline=deadline)
+        if body is NOT_MODIFIED:
+            return self._unchanged_product(prod_url, self.parse_product_data, search_result_product)
         
-        return self.parse_product_data(prod_obj, search_result_product)
+        with stage_seconds.time(self.vendor_name, "parse_product"):
+            item = await parse_executor.run(_decode_json, body)
+            product = self.parse_product_data(item, search_result_product)
+        page_validators.remember_page(prod_url, item)
+        return product
     
     async def _get_prod_data_html_json_ld(
         self,
         session: aiohttp.ClientSession,
-        search_result_product: SearchResultProduct
+        search_result_product: SearchResultProduct,
+        deadline: Optional[Deadline] = None
     ) -> ProductSchema:
         
         # logger.info(search_result_product)
-        html = LexborHTMLParser(await self._fetch(session, url=search_result_product.url, headers=self.config.headers, params=self.config.params, data=self.config.data, cookies=self.config.cookies, is_return_json=False))
+        url = search_result_product.url
+        page = await self._fetch(session, url=url, headers=self.config.headers, params=self.config.params, data=self.config.data, cookies=self.config.cookies, conditional=True, raw=True, deadline=deadline)
+        if page is NOT_MODIFIED:
+            # Same page as last time: skip parsing, only the search result's fields are new
+            return self._unchanged_product(url, self._product_from_json_ld, search_result_product)
+
+        with stage_seconds.time(self.vendor_name, "parse_product"):
+            prod_obj = await parse_executor.run(self._find_product_json_ld, page)
+            if prod_obj is None:
+                return None
+            product = self._product_from_json_ld(prod_obj, search_result_product)
+        page_validators.remember_page(url, prod_obj)
+        return product
+
+    def _unchanged_product(
+        self, url: str, build: Callable[[Any, SearchResultProduct], ProductSchema], search_result_product: SearchResultProduct
+    ) -> Optional[ProductSchema]:
+        """Product from the page data cached for `url` and the current search result, flagged unchanged"""
+        page = page_validators.unchanged_page(url)
+        if page is None:
+            return None
+        return replace(build(page, search_result_product), unchanged=True)
+
+    def _parse_html_json_ld(self, page: bytes, search_result_product: SearchResultProduct) -> Optional[ProductSchema]:
+        prod_obj = self._find_product_json_ld(page)
+        if prod_obj is None:
+            return None
+        return self._product_from_json_ld(prod_obj, search_result_product)
+
+    def _find_product_json_ld(self, page: bytes) -> Optional[Dict[str, Any]]:
+        try:
+            return find_product_json_ld(page)
+        except ParseException as e:
+            # Scanner couldn't make sense of the page, let the HTML parser have a go
+            self.logger.debug(f"[{self.vendor_name}] Fast ld+json scan failed ({e}), falling back to full parse")
+            return self._find_product_json_ld_dom(page)
+
+    def _find_product_json_ld_dom(self, page: bytes) -> Optional[Dict[str, Any]]:
+        html = LexborHTMLParser(page)
         
         for node in html.css('script[type="application/ld+json"]'):
             prod_obj = json.loads(node.text())
@@ -224,31 +484,34 @@ class BaseVendorScraper(ABC):
                 prod_obj = prod_obj["mainEntity"]
 
             if prod_obj.get("@type") == "Product":
-                
-                prod_sku = prod_obj.get("SKU") or prod_obj["offers"].get("sku") or search_result_product.SKU
-                prod_brand = prod_obj.get("brand") if isinstance(prod_obj.get("brand"), str) else prod_obj.get("brand", {"name": ""}).get("name")
-                
-                if not prod_sku:
-                    raise ParseException("No valid SKU found")
+                return prod_obj
+        return None
 
-                
-                return ProductSchema(
-                    availability=prod_obj["offers"].get("availability"),
-                    item_condition=prod_obj["offers"].get("itemCondition", ""),
-                    
-                    offers__price=prod_obj["offers"]["price"],
-                    currency=prod_obj["offers"].get("priceCurrency"),
-                    description=prod_obj["description"],
-                    
-                    name=prod_obj.get("name", search_result_product.name),
-                    url=search_result_product.url,
-                    orig_price=search_result_product.orig_price,
-                    disc_price=search_result_product.disc_price,
-                    
-                    SKU=prod_sku,
-                    brand=prod_brand,
-                    images=[prod_obj.get("image") or search_result_product.img_src],
-                    
-                    metadata={"aggregateRating": prod_obj.get("aggregateRating")},
-                    additional_info=search_result_product.additional_info
-                    )
+    def _product_from_json_ld(self, prod_obj: Dict[str, Any], search_result_product: SearchResultProduct) -> ProductSchema:
+        prod_sku = prod_obj.get("SKU") or prod_obj["offers"].get("sku") or search_result_product.SKU
+        prod_brand = prod_obj.get("brand") if isinstance(prod_obj.get("brand"), str) else prod_obj.get("brand", {"name": ""}).get("name")
+        
+        if not prod_sku:
+            raise ParseException("No valid SKU found")
+
+        
+        return ProductSchema(
+            availability=prod_obj["offers"].get("availability"),
+            item_condition=prod_obj["offers"].get("itemCondition", ""),
+            
+            offers__price=prod_obj["offers"]["price"],
+            currency=prod_obj["offers"].get("priceCurrency"),
+            description=prod_obj["description"],
+            
+            name=prod_obj.get("name", search_result_product.name),
+            url=search_result_product.url,
+            orig_price=search_result_product.orig_price,
+            disc_price=search_result_product.disc_price,
+            
+            SKU=prod_sku,
+            brand=prod_brand,
+            images=[prod_obj.get("image") or search_result_product.img_src],
+            
+            metadata={"aggregateRating": prod_obj.get("aggregateRating")},
+            additional_info=search_result_product.additional_info
+            )
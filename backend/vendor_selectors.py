@@ -1,4 +1,5 @@
-from bs4 import BeautifulSoup
+from typing import Any, Dict
+from selectolax.lexbor import LexborHTMLParser
 from backend.vendor_models import SearchResultProduct
 import logging
 
@@ -144,75 +145,13 @@ def ksp_selector(results):
     return parsed_results
 
 
-def neto_selector(results):
-    try:
-        html = results['10']['html']
-
-        if not html:
-            raise InvalidAPIResponseError("Neto API response 'html' is empty")
-        
-    except KeyError:
-        raise InvalidAPIResponseError("Neto API response missing 'html' key")
-    
-    soup = BeautifulSoup(html, "html.parser")
+def _attr(node, name):
+    """Attribute value like BeautifulSoup's node[name]: None if absent, "" if valueless"""
+    if node is None or name not in node.attributes:
+        return None
+    return node.attributes[name] or ""
 
-    # Each product is in <li class="amsearch-item product-item">
-    for li in soup.select("ul.amsearch-product-list li.amsearch-item.product-item"):
-        # URL: prefer data-click-url, fallback to the product link
-        url = li.get("data-click-url")
-        if not url:
-            link_el = li.select_one("a.amsearch-link")
-            url = link_el["href"] if link_el and link_el.has_attr("href") else None
-
-        # Name: text of the product link
-        name_el = li.select_one("a.amsearch-link")
-        name = name_el.get_text(strip=True) if name_el else None
 
-
-        # Image URL
-        img_el = li.select_one("img.product-image-photo")
-        img_src = img_el["src"] if img_el and img_el.has_attr("src") else None
-
-        # Price: data-price-amount attribute
-        price_el = li.select_one("[data-price-type='basePrice']")
-        disc_price = None
-        if price_el and price_el.has_attr("data-price-amount"):
-            try:
-                disc_price = int(float(price_el["data-price-amount"]))
-            except ValueError:
-                pass
-
-        # Optional brand and internal product id for additional_info
-        # brand_img = li.select_one(".amshopby-option-link img")
-        # brand = brand_img["alt"] if brand_img and brand_img.has_attr("alt") else None
-
-        price_box = li.select_one(".price-box")
-
-        # SKU: highlighted part (e.g. AG653)
-        # sku_el = li.select_one("a.amsearch-link span.amsearch-highlight")
-        # sku = sku_el.get_text(strip=True) if sku_el else None
-        sku = (
-            price_box["data-product-id"]
-            if price_box and price_box.has_attr("data-product-id")
-            else "MISSING"
-        )
-
-        additional_info: Dict[str, Any] = {}
-        # if brand:
-        #     additional_info["brand"] = brand
-        # if sku is not None:
-        #     additional_info["internal_id"] = sku
-
-        return {
-            "name": name,
-            "SKU": sku,
-            "url": url,
-            "img_src": img_src,
-            "orig_price": disc_price,
-            "disc_price": None,
-            "additional_info": additional_info,
-        }
-        
 def neto_selector(results):
     try:
         html = results['10']['html']
@@ -223,50 +162,44 @@ def neto_selector(results):
     except KeyError:
         raise InvalidAPIResponseError("Neto API response missing 'html' key")
     
-    soup = BeautifulSoup(html, "html.parser")
+    tree = LexborHTMLParser(html)
 
     parsed_results = []
 
     # Each product is in <li class="amsearch-item product-item">
-    for li in soup.select("ul.amsearch-product-list li.amsearch-item.product-item"):
+    for li in tree.css("ul.amsearch-product-list li.amsearch-item.product-item"):
+        link_el = li.css_first("a.amsearch-link")
+
         # URL: prefer data-click-url, fallback to the product link
-        url = li.get("data-click-url")
+        url = _attr(li, "data-click-url")
         if not url:
-            link_el = li.select_one("a.amsearch-link")
-            url = link_el["href"] if link_el and link_el.has_attr("href") else None
+            url = _attr(link_el, "href")
 
         # Name: text of the product link
-        name_el = li.select_one("a.amsearch-link")
-        name = name_el.get_text(strip=True) if name_el else None
-
+        name = link_el.text(deep=True, separator="", strip=True) if link_el is not None else None
 
         # Image URL
-        img_el = li.select_one("img.product-image-photo")
-        img_src = img_el["src"] if img_el and img_el.has_attr("src") else None
+        img_src = _attr(li.css_first("img.product-image-photo"), "src")
 
         # Price: data-price-amount attribute
-        price_el = li.select_one("[data-price-type='basePrice']")
+        price_amount = _attr(li.css_first("[data-price-type='basePrice']"), "data-price-amount")
         disc_price = None
-        if price_el and price_el.has_attr("data-price-amount"):
+        if price_amount is not None:
             try:
-                disc_price = int(float(price_el["data-price-amount"]))
+                disc_price = int(float(price_amount))
             except ValueError:
                 pass
 
         # Optional brand and internal product id for additional_info
-        # brand_img = li.select_one(".amshopby-option-link img")
-        # brand = brand_img["alt"] if brand_img and brand_img.has_attr("alt") else None
-
-        price_box = li.select_one(".price-box")
+        # brand_img = li.css_first(".amshopby-option-link img")
+        # brand = _attr(brand_img, "alt")
 
         # SKU: highlighted part (e.g. AG653)
-        # sku_el = li.select_one("a.amsearch-link span.amsearch-highlight")
-        # sku = sku_el.get_text(strip=True) if sku_el else None
-        sku = (
-            price_box["data-product-id"]
-            if price_box and price_box.has_attr("data-product-id")
-            else "MISSING"
-        )
+        # sku_el = li.css_first("a.amsearch-link span.amsearch-highlight")
+        # sku = sku_el.text(strip=True) if sku_el else None
+        sku = _attr(li.css_first(".price-box"), "data-product-id")
+        if sku is None:
+            sku = "MISSING"
 
         additional_info: Dict[str, Any] = {}
         # if brand:
@@ -281,7 +214,7 @@ def neto_selector(results):
             img_src=img_src,
             orig_price=disc_price,
             disc_price=None,
-            additional_info=additional_info,
+            additional_info=additional_info or None,
         ))
     
     return parsed_results
@@ -0,0 +1,204 @@
+import argparse
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from backend.db_utils import Database
+from backend.http_session import get_shared_session, close_shared_session
+from backend.parse_executor import EXECUTOR_KINDS, ParseExecutorConfig, parse_executor
+from backend.rate_limiter import rate_limiters
+from backend.vendor_models import ProductSchema
+from multi_vendor_scrape import VENDORS, run_multi_vendor_scrape, scrape_vendor, search_vendor
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BatchResult:
+    """Outcome of one query within a batch"""
+    query: str
+    results: List[Tuple[str, ProductSchema]]
+    error: Optional[str] = None
+
+
+@dataclass
+class BatchStats:
+    """Throughput counters for a batch run"""
+    queries: int = 0
+    failed_queries: int = 0
+    vendor_calls: int = 0
+    started_at: float = 0.0
+    finished_at: float = 0.0
+
+    @property
+    def elapsed(self) -> float:
+        return max((self.finished_at or time.perf_counter()) - self.started_at, 1e-9)
+
+    @property
+    def queries_per_sec(self) -> float:
+        return self.queries / self.elapsed
+
+    @property
+    def vendor_calls_per_sec(self) -> float:
+        return self.vendor_calls / self.elapsed
+
+    def summary(self) -> str:
+        return (
+            f"{self.queries} queries ({self.failed_queries} failed), {self.vendor_calls} vendor calls "
+            f"in {self.elapsed:.1f}s: {self.queries_per_sec:.2f} queries/s, "
+            f"{self.vendor_calls_per_sec:.2f} vendor calls/s"
+        )
+
+
+def read_queries(path: str) -> Iterator[str]:
+    """Yield one query per non-empty line, skipping '#' comments"""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            query = line.strip()
+            if query and not query.startswith("#"):
+                yield query
+
+
+async def run_batch_scrape(
+    queries: Iterable[str],
+    initiator: str = "user",
+    max_concurrency: int = 20,
+    per_vendor_concurrency: int = 5,
+    stats: Optional[BatchStats] = None,
+    anchored: bool = False,
+    prefetch_search: bool = False,
+) -> AsyncIterator[BatchResult]:
+    """
+    Scrape many queries against every registered vendor, yielding each query's
+    result as soon as it has been persisted.
+
+    max_concurrency caps in-flight vendor calls across the whole batch and
+    per_vendor_concurrency caps them per vendor. All queries share one Database
+    pool and the process-wide HTTP session. Pass a BatchStats to read the
+    throughput figures once the iterator is exhausted.
+    anchored / prefetch_search select the Traklin-anchored pipeline
+    (see multi_vendor_scrape.scrape_all_vendors).
+    """
+    stats = stats or BatchStats()
+    stats.started_at = time.perf_counter()
+
+    global_limit = asyncio.Semaphore(max_concurrency)
+    vendor_limits: Dict[str, asyncio.Semaphore] = {
+        cfg.name: asyncio.Semaphore(per_vendor_concurrency) for _, cfg in VENDORS
+    }
+
+    db = Database()
+    await db.connect()
+    session = await get_shared_session()
+
+    async def bounded_scrape_vendor(scraper_cls, config, query, **kwargs):
+        async with vendor_limits[config.name], global_limit:
+            stats.vendor_calls += 1
+            return await scrape_vendor(scraper_cls, config, query, session, **kwargs)
+
+    # Anchored mode's speculative searches are upstream calls too
+    async def bounded_search_vendor(scraper_cls, config, query, **kwargs):
+        async with vendor_limits[config.name], global_limit:
+            stats.vendor_calls += 1
+            return await search_vendor(scraper_cls, config, query, session, **kwargs)
+
+    async def scrape_one(query: str) -> BatchResult:
+        try:
+            results = await run_multi_vendor_scrape(
+                query, initiator, db=db, vendor_runner=bounded_scrape_vendor,
+                anchored=anchored, prefetch_search=prefetch_search, search_runner=bounded_search_vendor
+            )
+            return BatchResult(query=query, results=results)
+        except Exception as e:
+            logger.error(f"Batch query '{query}' failed: {e}")
+            return BatchResult(query=query, results=[], error=str(e))
+
+    # Keep only a window of queries in flight so huge input files are consumed lazily;
+    # the semaphores above are what actually bound upstream traffic.
+    max_pending = max(max_concurrency, 1)
+    query_iter = iter(queries)
+    pending = set()
+
+    try:
+        while True:
+            while len(pending) < max_pending:
+                query = next(query_iter, None)
+                if query is None:
+                    break
+                pending.add(asyncio.create_task(scrape_one(query)))
+
+            if not pending:
+                break
+
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                result = task.result()
+                stats.queries += 1
+                if result.error:
+                    stats.failed_queries += 1
+                yield result
+    finally:
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        await db.close()
+        stats.finished_at = time.perf_counter()
+        logger.info(f"Batch finished: {stats.summary()}")
+        for vendor, vendor_stats in rate_limiters.stats().items():
+            logger.info(f"[{vendor}] rate limiter: {vendor_stats}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    parser = argparse.ArgumentParser(description="Scrape many queries across all registered vendors")
+    parser.add_argument("queries", nargs="*", help="Queries to scrape")
+    parser.add_argument("-f", "--file", help="File with one query per line")
+    parser.add_argument("--concurrency", type=int, default=20, help="Max in-flight vendor calls overall")
+    parser.add_argument("--per-vendor", type=int, default=5, help="Max in-flight calls per vendor")
+    parser.add_argument("--initiator", default="user")
+    parser.add_argument("--parse-executor", choices=EXECUTOR_KINDS, default=parse_executor.config.kind,
+                        help="Parse large vendor responses off the event loop")
+    parser.add_argument("--parse-workers", type=int, default=parse_executor.config.max_workers)
+    parser.add_argument("--anchored", action="store_true",
+                        help="Resolve the Traklin match first and skip other vendors when there is none")
+    parser.add_argument("--prefetch-search", action="store_true",
+                        help="With --anchored, search other vendors while Traklin resolves")
+    args = parser.parse_args()
+
+    parse_executor.configure(ParseExecutorConfig(
+        kind=args.parse_executor,
+        max_workers=args.parse_workers,
+        min_bytes=parse_executor.config.min_bytes,
+    ))
+
+    def all_queries():
+        yield from args.queries
+        if args.file:
+            yield from read_queries(args.file)
+
+    async def main():
+        stats = BatchStats()
+        try:
+            async for result in run_batch_scrape(
+                all_queries(),
+                initiator=args.initiator,
+                max_concurrency=args.concurrency,
+                per_vendor_concurrency=args.per_vendor,
+                stats=stats,
+                anchored=args.anchored,
+                prefetch_search=args.prefetch_search,
+            ):
+                vendors = ", ".join(vendor for vendor, _ in result.results) or "-"
+                print(f"{result.query}\t{len(result.results)}\t{vendors}")
+        finally:
+            await close_shared_session()
+            parse_executor.shutdown()
+        print(stats.summary())
+
+    asyncio.run(main())
@@ -0,0 +1,120 @@
+"""
+Upstream requests spent per scrape mode when a query log is replayed against
+local vendor stubs: every vendor at once (the default), Traklin-anchored, and
+Traklin-anchored with speculative searches.
+
+Each vendor gets its own in-process stub so requests are counted per vendor.
+The Traklin stub finds nothing for --traklin-miss-rate of the queries; those
+scrapes are thrown away (failed_no_traklin_match), so every request the other
+vendors spend on them is wasted.
+
+    python -m benchmarks.bench_anchored_pipeline --vendors 3 --traklin-miss-rate 0.3
+    python -m benchmarks.bench_anchored_pipeline -f queries.txt
+"""
+import argparse
+import asyncio
+import dataclasses
+import logging
+import statistics
+import time
+from pathlib import Path
+
+import multi_vendor_scrape
+from backend.http_session import close_shared_session
+from backend.search_cache import search_cache
+from backend.vendor_models import RateLimitPolicy
+from backend.vendor_registeration import TraklinScraper, TraklinConfig
+from batch_scrape import read_queries
+from benchmarks.stub_server import VendorStub
+
+QUERY_LOG = Path(__file__).parent / "fixtures" / "query_log.txt"
+
+MODES = {
+    "gather": {},
+    "anchored": {"anchored": True},
+    "anchored+prefetch": {"anchored": True, "prefetch_search": True},
+}
+
+
+def stub_config(name: str, stub: VendorStub):
+    return dataclasses.replace(
+        TraklinConfig,
+        name=name,
+        autocomplete_endpoint=f"{stub.base_url}/ajax/content_auto_suggest.ashx",
+        rate_limit=RateLimitPolicy(requests_per_second=1e6, burst=10**6, max_concurrent=10**6),
+        search_cache_ttl=0,
+    )
+
+
+async def replay(queries, stubs, mode_kwargs) -> dict:
+    for stub in stubs.values():
+        stub.requests_served = 0
+    search_cache.invalidate()
+
+    wasted = stored = traklin_misses = 0
+    latencies = []
+    for query in queries:
+        served_before = sum(stub.requests_served for name, stub in stubs.items() if name != "Traklin")
+        start = time.perf_counter()
+        results = await multi_vendor_scrape.scrape_all_vendors(query, **mode_kwargs)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        found = [r for r in results if r]
+        if any(vendor == "Traklin" for vendor, _ in found):
+            stored += len(found)
+        else:
+            traklin_misses += 1
+            wasted += sum(stub.requests_served for name, stub in stubs.items() if name != "Traklin") - served_before
+
+    return {
+        "requests": sum(stub.requests_served for stub in stubs.values()),
+        "wasted": wasted,
+        "traklin_misses": traklin_misses,
+        "stored_results": stored,
+        "p50_ms": statistics.median(latencies),
+    }
+
+
+async def run(args):
+    stubs = {"Traklin": VendorStub(latency=args.latency, etags=False, miss_rate=args.traklin_miss_rate)}
+    for i in range(args.vendors):
+        stubs[f"Vendor{i + 1}"] = VendorStub(
+            latency=args.latency, etags=False, miss_rate=args.vendor_miss_rate, seed=i + 1
+        )
+    runners = [await stub.start() for stub in stubs.values()]
+    multi_vendor_scrape.VENDORS = [(TraklinScraper, stub_config(name, stub)) for name, stub in stubs.items()]
+
+    queries = list(read_queries(args.file))
+    print(f"{len(queries)} queries, {args.vendors} vendors besides Traklin, "
+          f"Traklin miss rate {args.traklin_miss_rate:.0%}, stub latency {args.latency * 1000:.0f} ms\n")
+    print(f"{'mode':<20}{'requests':>10}{'saved':>8}{'wasted':>8}{'stored':>8}{'p50 ms':>9}")
+    try:
+        baseline = None
+        for mode, kwargs in MODES.items():
+            result = await replay(queries, stubs, kwargs)
+            baseline = baseline if baseline is not None else result["requests"]
+            saved = baseline - result["requests"]
+            print(f"{mode:<20}{result['requests']:>10}{saved:>8}{result['wasted']:>8}"
+                  f"{result['stored_results']:>8}{result['p50_ms']:>9.1f}")
+        print(f"\nTraklin found nothing for {result['traklin_misses']} of {len(queries)} queries")
+    finally:
+        await close_shared_session()
+        for runner in runners:
+            await runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-f", "--file", default=str(QUERY_LOG), help="Query log, one query per line")
+    parser.add_argument("--vendors", type=int, default=3, help="Stub vendors besides Traklin")
+    parser.add_argument("--traklin-miss-rate", type=float, default=0.3)
+    parser.add_argument("--vendor-miss-rate", type=float, default=0.1)
+    parser.add_argument("--latency", type=float, default=0.02, help="Stub response latency in seconds")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    # multi_vendor_scrape already configured logging at INFO on import
+    logging.getLogger().setLevel(logging.ERROR)
+    main()
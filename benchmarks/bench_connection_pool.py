@@ -0,0 +1,86 @@
+"""
+Latency of back-to-back Traklin scrapes against the local stub, with a fresh
+ClientSession per scrape (old behaviour) versus the shared pooled session.
+
+    python -m benchmarks.bench_connection_pool --iterations 200
+
+The stub speaks plain HTTP, so the gap here only covers TCP setup; against the
+real vendors TLS handshakes make the difference considerably larger.
+"""
+import argparse
+import asyncio
+import dataclasses
+import logging
+import statistics
+import time
+
+import aiohttp
+
+from backend.http_session import SessionManager
+from backend.page_cache import page_validators
+from backend.vendor_models import RateLimitPolicy
+from backend.vendor_registeration import TraklinScraper, TraklinConfig
+from benchmarks.stub_server import VendorStub
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[idx]
+
+
+async def _timed_scrapes(scraper, query, iterations, session_factory):
+    samples = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        async with session_factory() as session:
+            await scraper.run(session, f"{query}-{i}")
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+async def main(iterations: int, latency: float):
+    # No ETags: the second mode would otherwise get 304s for every product page
+    stub = VendorStub(latency=latency, etags=False)
+    runner = await stub.start()
+
+    config = dataclasses.replace(
+        TraklinConfig,
+        autocomplete_endpoint=f"{stub.base_url}/ajax/content_auto_suggest.ashx",
+        # Measure the transport, not the vendor politeness limits
+        rate_limit=RateLimitPolicy(requests_per_second=1e6, burst=10**6),
+        # Both modes replay the same queries; a cached search would skip the request being measured
+        search_cache_ttl=0,
+    )
+    scraper = TraklinScraper(vendor_name="Traklin", config=config)
+
+    manager = SessionManager()
+
+    class _Borrowed:
+        async def __aenter__(self):
+            return await manager.get_session()
+
+        async def __aexit__(self, *exc):
+            return False
+
+    try:
+        unpooled = await _timed_scrapes(scraper, "GR", iterations, aiohttp.ClientSession)
+        # Nor may it skip parsing pages whose body hash the first mode remembered
+        page_validators.clear()
+        pooled = await _timed_scrapes(scraper, "GR", iterations, _Borrowed)
+    finally:
+        await manager.close()
+        await runner.cleanup()
+
+    print(f"{'mode':<10}{'p50 ms':>10}{'p95 ms':>10}{'mean ms':>10}")
+    for label, samples in (("unpooled", unpooled), ("pooled", pooled)):
+        print(f"{label:<10}{percentile(samples, 50):>10.2f}{percentile(samples, 95):>10.2f}{statistics.mean(samples):>10.2f}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.0, help="Stub response latency in seconds")
+    args = parser.parse_args()
+    asyncio.run(main(args.iterations, args.latency))
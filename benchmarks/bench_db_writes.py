@@ -0,0 +1,107 @@
+"""
+Rows/sec of scrape persistence: the per-row path (upsert_product +
+insert_snapshot per result) versus Database.save_scrapes.
+
+Needs a local Postgres initialised with init.sql; connection settings come
+from the usual POSTGRES_* environment variables.
+
+    python -m benchmarks.bench_db_writes --scrapes 200 --vendors 6
+
+Rows are written under traklin_sku values from --sku-base upward and are
+deleted again when the run finishes.
+"""
+import argparse
+import asyncio
+import logging
+import time
+
+from backend.db_utils import Database, ScrapeWrite
+from backend.vendor_models import ProductSchema
+
+
+def make_product(traklin_sku: int, vendor_idx: int) -> ProductSchema:
+    return ProductSchema(
+        SKU=f"{traklin_sku}-{vendor_idx}",
+        name=f"Benchmark product {traklin_sku}",
+        offers__price=1990,
+        orig_price=2190,
+        disc_price=1990,
+        currency="ILS",
+        url=f"https://example.invalid/{traklin_sku}/{vendor_idx}",
+        images=[f"https://example.invalid/{traklin_sku}.jpg"],
+        description="benchmark",
+        availability="InStock",
+        brand="Bench",
+        metadata={"aggregateRating": None},
+    )
+
+
+async def per_row(db: Database, vendor_name: str, scrapes: int, vendors: int, sku_base: int) -> float:
+    start = time.perf_counter()
+    for i in range(scrapes):
+        traklin_sku = sku_base + i
+        scrape_id = await db.create_scraping_session(f"bench-{traklin_sku}", "bench")
+        for v in range(vendors):
+            product = make_product(traklin_sku, v)
+            await db.upsert_product(traklin_sku, product, vendor_name)
+            await db.insert_snapshot(scrape_id, traklin_sku, product)
+        await db.update_session_status(scrape_id, "success", vendors, vendors)
+    return time.perf_counter() - start
+
+
+async def bulk(db: Database, vendor_name: str, scrapes: int, vendors: int, sku_base: int, batch: int) -> float:
+    start = time.perf_counter()
+    writes = []
+    for i in range(scrapes):
+        traklin_sku = sku_base + i
+        scrape_id = await db.create_scraping_session(f"bench-{traklin_sku}", "bench")
+        results = [(vendor_name, make_product(traklin_sku, v)) for v in range(vendors)]
+        writes.append(ScrapeWrite(scrape_id, traklin_sku, results, vendors))
+        if len(writes) >= batch:
+            await db.save_scrapes(writes)
+            writes = []
+    if writes:
+        await db.save_scrapes(writes)
+    return time.perf_counter() - start
+
+
+async def cleanup(db: Database, sku_base: int, scrapes: int):
+    async with db.pool.acquire() as conn:
+        await conn.execute(
+            "DELETE FROM products WHERE traklin_sku >= $1 AND traklin_sku < $2", sku_base, sku_base + 3 * scrapes
+        )
+        await conn.execute("DELETE FROM scraping_sessions WHERE initiator = 'bench'")
+
+
+async def main(args):
+    db = Database()
+    await db.connect()
+    rows = args.scrapes * args.vendors
+    try:
+        results = {
+            "per-row": await per_row(db, args.vendor, args.scrapes, args.vendors, args.sku_base),
+            "bulk (1 scrape/txn)": await bulk(db, args.vendor, args.scrapes, args.vendors, args.sku_base + args.scrapes, 1),
+            f"bulk ({args.batch} scrapes/txn)": await bulk(
+                db, args.vendor, args.scrapes, args.vendors, args.sku_base + 2 * args.scrapes, args.batch
+            ),
+        }
+    finally:
+        await cleanup(db, args.sku_base, args.scrapes)
+        await db.close()
+
+    print(f"{rows} snapshot rows per mode")
+    print(f"{'mode':<24}{'seconds':>10}{'rows/s':>12}")
+    for label, elapsed in results.items():
+        print(f"{label:<24}{elapsed:>10.2f}{rows / elapsed:>12.0f}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scrapes", type=int, default=200)
+    parser.add_argument("--vendors", type=int, default=6, help="Results written per scrape")
+    parser.add_argument("--batch", type=int, default=50, help="Scrapes per transaction for the batched bulk run")
+    parser.add_argument("--vendor", default="Traklin", help="Existing vendors.name to attach rows to")
+    parser.add_argument("--sku-base", type=int, default=900_000_000)
+    args = parser.parse_args()
+    asyncio.run(main(args))
@@ -0,0 +1,412 @@
+"""
+End-to-end throughput and latency of the scrape paths, with every vendor
+served by the local stub (benchmarks/stub_server.py) so runs are repeatable:
+
+    fanout        scrape_all_vendors, no database
+    multi_vendor  run_multi_vendor_scrape, persisted through one shared pool
+    batch         run_batch_scrape over the whole query log
+    api           GET /scrape against the FastAPI app served by uvicorn
+
+Each scenario replays the query log with --concurrency queries in flight.
+The stub runs in its own process so its work doesn't share the event loop
+being measured; per-vendor latency, error rate, miss rate and result counts
+come from the stub flags or a --profiles file. The scenarios that persist
+(multi_vendor, batch, api) connect through backend.db_utils.Database, which
+reads POSTGRES_USER, POSTGRES_PASSWORD, POSTGRES_DB, POSTGRES_HOST and
+POSTGRES_PORT (default testuser@localhost:5433/testdb), and need the vendors'
+rows in it. The API runs in this process, next to its load generator.
+
+Results go to --output (stdout by default) as JSON, with a readable summary
+on stderr. --compare prints the change against an earlier run's JSON.
+
+    python -m benchmarks.bench_e2e --scenarios fanout,batch --concurrency 8 --output base.json
+    python -m benchmarks.bench_e2e --latency 0.1 --distribution lognormal --spread 0.6 --error-rate 0.05
+    python -m benchmarks.bench_e2e --vendors all --profiles profiles.json --compare base.json --output new.json
+"""
+import argparse
+import asyncio
+import dataclasses
+import json
+import logging
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, deque
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import aiohttp
+
+import multi_vendor_scrape
+from backend.db_utils import Database
+from backend.http_session import close_shared_session
+from backend.page_cache import page_validators
+from backend.rate_limiter import rate_limiters
+from backend.search_cache import search_cache
+from batch_scrape import read_queries, run_batch_scrape
+from benchmarks.stub_server import STUB_VENDORS, add_profile_arguments, profiles_from_args, stub_vendor_configs
+
+QUERY_LOG = Path(__file__).parent / "fixtures" / "query_log.txt"
+REPO_ROOT = Path(__file__).parent.parent
+
+SCENARIOS = ("fanout", "multi_vendor", "batch", "api")  # api last: the app's shutdown closes shared resources
+INITIATOR = "BENCH"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def latency_summary(samples: List[float]) -> Dict[str, float]:
+    """Nearest-rank percentiles of `samples` (seconds), in ms"""
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+
+    def pct(p: float) -> float:
+        return round(ordered[max(0, min(len(ordered) - 1, int(len(ordered) * p + 0.5) - 1))] * 1000, 3)
+
+    return {
+        "p50": pct(0.50),
+        "p90": pct(0.90),
+        "p99": pct(0.99),
+        "max": round(ordered[-1] * 1000, 3),
+        "mean": round(statistics.fmean(ordered) * 1000, 3),
+    }
+
+
+class StubProcess:
+    """benchmarks.stub_server in a child process, configured through a profiles file"""
+
+    def __init__(self, profiles, seed: int):
+        self.profiles = profiles
+        self.seed = seed
+        self.base_url = None
+        self._proc = None
+        self._profiles_file = None
+
+    def start(self):
+        self._profiles_file = tempfile.NamedTemporaryFile("w", suffix=".json", delete=False)
+        json.dump({name: dataclasses.asdict(p) for name, p in self.profiles.items()}, self._profiles_file)
+        self._profiles_file.close()
+
+        port = free_port()
+        self._proc = subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.stub_server", "--port", str(port), "--seed", str(self.seed),
+             "--profiles", self._profiles_file.name],
+            cwd=REPO_ROOT, stdout=subprocess.PIPE, text=True,
+        )
+        line = self._proc.stdout.readline()
+        if "listening" not in line:
+            self.stop()
+            raise RuntimeError(f"Vendor stub failed to start: {line!r}")
+        self.base_url = f"http://127.0.0.1:{port}"
+
+    def stop(self):
+        if self._proc is not None:
+            self._proc.terminate()
+            self._proc.wait()
+        if self._profiles_file is not None:
+            os.unlink(self._profiles_file.name)
+
+
+async def stub_stats(base_url: str) -> Dict[str, Dict[str, int]]:
+    async with aiohttp.ClientSession() as client:
+        async with client.get(f"{base_url}/__stats") as response:
+            return await response.json()
+
+
+def stats_delta(before: Dict[str, Dict[str, int]], after: Dict[str, Dict[str, int]]) -> Dict[str, Dict[str, int]]:
+    return {
+        key: {vendor: count - before[key].get(vendor, 0) for vendor, count in after[key].items() if count != before[key].get(vendor, 0)}
+        for key in after
+    }
+
+
+@dataclasses.dataclass
+class ScenarioRecorder:
+    """Per-query outcomes of one scenario"""
+    latencies: List[float] = dataclasses.field(default_factory=list)
+    vendor_statuses: Dict[str, Counter] = dataclasses.field(default_factory=dict)
+    results_found: int = 0
+    errors: Counter = dataclasses.field(default_factory=Counter)
+
+    def record(self, latency: float, found: int = 0, statuses: Optional[Dict[str, str]] = None, error: Optional[str] = None):
+        self.latencies.append(latency)
+        self.results_found += found
+        for vendor, status in (statuses or {}).items():
+            self.vendor_statuses.setdefault(vendor, Counter())[status] += 1
+        if error:
+            self.errors[error[:200]] += 1
+
+    def summary(self, elapsed: float, concurrency: int) -> dict:
+        return {
+            "queries": len(self.latencies),
+            "concurrency": concurrency,
+            "elapsed_s": round(elapsed, 3),
+            "throughput_qps": round(len(self.latencies) / elapsed, 3) if elapsed else None,
+            "latency_ms": latency_summary(self.latencies),
+            "results_found": self.results_found,
+            "vendor_statuses": {vendor: dict(counts) for vendor, counts in sorted(self.vendor_statuses.items())},
+            "errors": sum(self.errors.values()),
+            "error_samples": dict(self.errors.most_common(5)),
+        }
+
+
+async def run_concurrently(queries: List[str], concurrency: int, scrape_one):
+    """Call `scrape_one(query)` for every query, `concurrency` at a time"""
+    limit = asyncio.Semaphore(concurrency)
+
+    async def bounded(query):
+        async with limit:
+            await scrape_one(query)
+
+    await asyncio.gather(*(bounded(query) for query in queries))
+
+
+async def fanout_scenario(args, queries, recorder: ScenarioRecorder):
+    async def scrape_one(query):
+        statuses = {}
+        start = time.perf_counter()
+        try:
+            results = await multi_vendor_scrape.scrape_all_vendors(
+                query, deadline=args.deadline, statuses=statuses, anchored=args.anchored, prefetch_search=args.prefetch_search
+            )
+            recorder.record(time.perf_counter() - start, sum(1 for r in results if r), statuses)
+        except Exception as e:
+            recorder.record(time.perf_counter() - start, statuses=statuses, error=f"{type(e).__name__}: {e}")
+
+    await run_concurrently(queries, args.concurrency, scrape_one)
+
+
+async def multi_vendor_scenario(args, queries, recorder: ScenarioRecorder):
+    db = Database()
+    await db.connect()
+
+    async def scrape_one(query):
+        statuses = {}
+        start = time.perf_counter()
+        try:
+            saved = await multi_vendor_scrape.run_multi_vendor_scrape(
+                query, INITIATOR, db=db, deadline=args.deadline, vendor_statuses=statuses,
+                anchored=args.anchored, prefetch_search=args.prefetch_search
+            )
+            recorder.record(time.perf_counter() - start, len(saved), statuses)
+        except Exception as e:
+            recorder.record(time.perf_counter() - start, statuses=statuses, error=f"{type(e).__name__}: {e}")
+
+    try:
+        await run_concurrently(queries, args.concurrency, scrape_one)
+    finally:
+        await db.close()
+
+
+async def batch_scenario(args, queries, recorder: ScenarioRecorder):
+    # run_batch_scrape pulls each query just before starting it, so the pull time is its start time;
+    # repeats of a query are matched to their starts first in, first out
+    started: Dict[str, deque] = {}
+
+    def feed():
+        for query in queries:
+            started.setdefault(query, deque()).append(time.perf_counter())
+            yield query
+
+    async for result in run_batch_scrape(
+        feed(), INITIATOR, max_concurrency=args.concurrency * len(multi_vendor_scrape.VENDORS),
+        per_vendor_concurrency=args.concurrency, anchored=args.anchored, prefetch_search=args.prefetch_search
+    ):
+        recorder.record(time.perf_counter() - started[result.query].popleft(), len(result.results), error=result.error)
+
+
+async def api_scenario(args, queries, recorder: ScenarioRecorder):
+    import uvicorn
+    from app import main
+
+    main.SCRAPE_DEADLINE_SECONDS = args.deadline or 0
+    main.SCRAPE_ANCHORED = args.anchored
+    main.SCRAPE_PREFETCH_SEARCH = args.prefetch_search
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning", access_log=False))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        if serving.done():
+            serving.result()
+        await asyncio.sleep(0.01)
+
+    connector = aiohttp.TCPConnector(limit=args.concurrency)
+    try:
+        async with aiohttp.ClientSession(connector=connector) as client:
+            async def scrape_one(query):
+                start = time.perf_counter()
+                try:
+                    async with client.get(f"http://127.0.0.1:{port}/scrape", params={"query": query, "max_age": 0}) as response:
+                        body = await response.json()
+                    if response.status != 200:
+                        recorder.record(time.perf_counter() - start, error=f"HTTP {response.status}: {body.get('detail')}")
+                    else:
+                        recorder.record(time.perf_counter() - start, len(body["results"]), body.get("vendor_statuses"))
+                except Exception as e:
+                    recorder.record(time.perf_counter() - start, error=f"{type(e).__name__}: {e}")
+
+            await run_concurrently(queries, args.concurrency, scrape_one)
+    finally:
+        server.should_exit = True
+        await serving
+
+
+SCENARIO_RUNNERS = {
+    "fanout": fanout_scenario,
+    "multi_vendor": multi_vendor_scenario,
+    "batch": batch_scenario,
+    "api": api_scenario,
+}
+
+
+async def run_scenario(name: str, args, queries, base_url: str) -> dict:
+    # Every scenario starts cold, and with limiters that haven't backed off yet
+    search_cache.invalidate()
+    page_validators.clear()
+    rate_limiters.reset()
+
+    recorder = ScenarioRecorder()
+    before = await stub_stats(base_url)
+    start = time.perf_counter()
+    try:
+        await SCENARIO_RUNNERS[name](args, queries, recorder)
+        result = recorder.summary(time.perf_counter() - start, args.concurrency)
+    except Exception as e:
+        result = {"failed": f"{type(e).__name__}: {e}"}
+    upstream = stats_delta(before, await stub_stats(base_url))
+    result["upstream_requests"] = upstream["requests"]
+    result["upstream_errors"] = upstream["errors"]
+    return result
+
+
+async def run(args, stub_url: str) -> Dict[str, dict]:
+    multi_vendor_scrape.VENDORS[:] = stub_vendor_configs(stub_url, args.vendors, search_cache_ttl=args.search_cache_ttl)
+    queries = list(read_queries(args.file)) * args.repeat
+
+    results = {}
+    try:
+        for name in SCENARIOS:
+            if name in args.scenarios:
+                print(f"Running {name}...", file=sys.stderr)
+                results[name] = await run_scenario(name, args, queries, stub_url)
+    finally:
+        await close_shared_session()
+    return results
+
+
+def print_summary(results: Dict[str, dict]):
+    print(f"\n{'scenario':<14}{'queries':>8}{'q/s':>9}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'found':>7}{'errors':>8}",
+          file=sys.stderr)
+    for name, result in results.items():
+        if "failed" in result:
+            print(f"{name:<14}failed: {result['failed']}", file=sys.stderr)
+            continue
+        latency = result["latency_ms"]
+        print(f"{name:<14}{result['queries']:>8}{result['throughput_qps']:>9.2f}{latency.get('p50', 0):>10.1f}"
+              f"{latency.get('p90', 0):>10.1f}{latency.get('p99', 0):>10.1f}{result['results_found']:>7}{result['errors']:>8}",
+              file=sys.stderr)
+
+
+def print_comparison(baseline: dict, current: dict):
+    """Relative change of throughput and latency percentiles per scenario"""
+    print(f"\nvs {baseline['meta'].get('git_commit') or 'baseline'} ({baseline['meta'].get('timestamp')})", file=sys.stderr)
+    for name, result in current["scenarios"].items():
+        old = baseline["scenarios"].get(name)
+        if not old or "failed" in old or "failed" in result:
+            continue
+        changes = [("q/s", old["throughput_qps"], result["throughput_qps"])]
+        changes += [(key, old["latency_ms"].get(key), result["latency_ms"].get(key)) for key in ("p50", "p90", "p99")]
+        print(f"  {name:<14}" + "  ".join(
+            f"{label} {new:.1f} ({(new - prev) / prev:+.1%})" if prev else f"{label} {new}"
+            for label, prev, new in changes
+        ), file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-f", "--file", default=str(QUERY_LOG), help="Query log, one query per line")
+    parser.add_argument("--repeat", type=int, default=1, help="Replay the query log this many times per scenario")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"Comma-separated subset of {', '.join(SCENARIOS)}")
+    parser.add_argument("--vendors", default=None,
+                        help="Comma-separated vendors to scrape, or 'all' (default: the ones registered in multi_vendor_scrape)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Queries in flight")
+    parser.add_argument("--deadline", type=float, default=None, help="Per-scrape deadline in seconds")
+    parser.add_argument("--anchored", action="store_true", help="Use the Traklin-anchored pipeline")
+    parser.add_argument("--prefetch-search", action="store_true")
+    parser.add_argument("--search-cache-ttl", type=float, default=0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--stub-url", help="Use an already running stub instead of starting one")
+    parser.add_argument("--output", help="Write the JSON results here instead of stdout")
+    parser.add_argument("--compare", help="Earlier --output JSON to compare against")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    args.scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+    if args.vendors == "all":
+        args.vendors = [config.name for _, config in STUB_VENDORS]
+    elif args.vendors:
+        args.vendors = [name.strip() for name in args.vendors.split(",")]
+    else:
+        args.vendors = [config.name for _, config in multi_vendor_scrape.VENDORS]
+
+    profiles = profiles_from_args(args)
+    stub = None
+    if not args.stub_url:
+        stub = StubProcess(profiles, args.seed)
+        stub.start()
+    try:
+        scenarios = asyncio.run(run(args, args.stub_url or stub.base_url))
+    finally:
+        if stub:
+            stub.stop()
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": {key: value for key, value in vars(args).items()},
+            "profiles": None if args.stub_url else {name: dataclasses.asdict(p) for name, p in profiles.items()},
+        },
+        "scenarios": scenarios,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n", encoding="utf-8")
+    else:
+        print(output)
+
+    print_summary(scenarios)
+    if args.compare:
+        print_comparison(json.loads(Path(args.compare).read_text(encoding="utf-8")), report)
+
+
+if __name__ == "__main__":
+    # multi_vendor_scrape already configured logging at INFO on import
+    logging.getLogger().setLevel(logging.CRITICAL)
+    main()
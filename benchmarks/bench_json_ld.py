@@ -0,0 +1,83 @@
+"""
+Per-page cost of pulling the Product object out of a vendor product page:
+full Lexbor parse + stdlib json (the old path) versus the raw ld+json scan
+with orjson (backend.json_ld).
+
+Runs over the saved pages in benchmarks/fixtures/. Allocation figures come
+from tracemalloc and only cover the Python heap; Lexbor's own C-side tree
+is not included, so the DOM path's real footprint is larger than shown.
+
+    python -m benchmarks.bench_json_ld --iterations 200
+"""
+import argparse
+import json
+import statistics
+import time
+import tracemalloc
+from pathlib import Path
+
+from selectolax.lexbor import LexborHTMLParser
+
+from backend.json_ld import find_product_json_ld, loads
+
+FIXTURES = Path(__file__).parent / "fixtures"
+PAGES = ["neto_product.html", "bigelectric_product.html"]
+
+
+def dom_extract(page: str):
+    html = LexborHTMLParser(page)
+    for node in html.css('script[type="application/ld+json"]'):
+        prod_obj = json.loads(node.text())
+        if prod_obj.get("@type") == "ItemPage" and "mainEntity" in prod_obj:
+            prod_obj = prod_obj["mainEntity"]
+        if prod_obj.get("@type") == "Product":
+            return prod_obj
+    return None
+
+
+def time_per_page(extract, page, iterations: int) -> dict:
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        extract(page)
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return {
+        "p50_ms": round(statistics.median(samples) * 1000, 3),
+        "p95_ms": round(samples[int(len(samples) * 0.95) - 1] * 1000, 3),
+    }
+
+
+def allocations(extract, page) -> dict:
+    tracemalloc.start()
+    extract(page)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"peak_kb": round(peak / 1024, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"JSON decoder for the fast path: {loads.__module__}")
+    for name in PAGES:
+        page = (FIXTURES / name).read_text(encoding="utf-8")
+        raw = page.encode("utf-8")
+        assert dom_extract(page) == find_product_json_ld(page) == find_product_json_ld(raw), f"{name}: paths disagree"
+
+        print(f"\n{name} ({len(raw) / 1024:.0f} KB)")
+        for label, extract, payload in (
+            ("lexbor + json", dom_extract, page),
+            ("scan + fast json (str)", find_product_json_ld, page),
+            ("scan + fast json (bytes)", find_product_json_ld, raw),
+        ):
+            timing = time_per_page(extract, payload, args.iterations)
+            allocs = allocations(extract, payload)
+            print(f"  {label:<26} p50 {timing['p50_ms']:>8} ms  p95 {timing['p95_ms']:>8} ms  "
+                  f"peak alloc {allocs['peak_kb']:>7} KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Cost of the hot-path metrics (backend.metrics): per-call cost of each
+recording primitive with metrics on and off, the same for a full
+TraklinScraper.run against the in-process stub, and how long one /metrics
+render takes with a production-sized set of series.
+
+On/off scraper rounds are interleaved so drift in the shared event loop
+affects both equally.
+
+    python -m benchmarks.bench_metrics_overhead --queries 300 --rounds 5
+"""
+import argparse
+import asyncio
+import dataclasses
+import logging
+import statistics
+import time
+import timeit
+
+from backend import metrics
+from backend.http_session import close_shared_session
+from backend.vendor_models import RateLimitPolicy
+from backend.vendor_registeration import TraklinScraper, TraklinConfig
+from benchmarks.stub_server import VendorStub
+
+STAGES = ("search", "select", "product", "fetch", "parse_search", "parse_product")
+
+
+def recordings() -> int:
+    """Histogram observations plus status counter increments recorded so far"""
+    total = sum(metrics.http_responses._values.values())
+    for metric in (metrics.stage_seconds, metrics.limiter_wait_seconds):
+        total += sum(sum(counts) for counts, _ in metric._series.values())
+    return total
+
+
+def per_call_ns(stmt, number: int) -> float:
+    return min(timeit.repeat(stmt, number=number, repeat=5)) / number * 1e9
+
+
+def micro(number: int) -> float:
+    histogram = metrics.stage_seconds
+    counter = metrics.http_responses
+
+    def timer():
+        with histogram.time("Bench", "fetch"):
+            pass
+
+    cases = {
+        "histogram.observe": lambda: histogram.observe(0.0123, "Bench", "fetch"),
+        "counter.inc": lambda: counter.inc("Bench", 200),
+        "with histogram.time()": timer,
+    }
+    print(f"{'primitive':<24}{'on ns':>10}{'off ns':>10}")
+    for name, stmt in cases.items():
+        metrics.registry.enabled = True
+        on = per_call_ns(stmt, number)
+        metrics.registry.enabled = False
+        off = per_call_ns(stmt, number)
+        print(f"{name:<24}{on:>10.0f}{off:>10.0f}")
+    metrics.registry.enabled = True
+    return on
+
+
+async def scrape_round(scraper, queries) -> float:
+    start = time.perf_counter()
+    for query in queries:
+        await scraper.run(None, query)
+    return (time.perf_counter() - start) / len(queries) * 1000
+
+
+async def end_to_end(args, timer_ns: float):
+    stub = VendorStub(etags=False)
+    runner = await stub.start()
+    config = dataclasses.replace(
+        TraklinConfig,
+        autocomplete_endpoint=f"{stub.base_url}/ajax/content_auto_suggest.ashx",
+        rate_limit=RateLimitPolicy(requests_per_second=1e6, burst=10**6, max_concurrent=10**6),
+        search_cache_ttl=0,
+    )
+    scraper = TraklinScraper(vendor_name="Traklin", config=config)
+    queries = [f"query {i}" for i in range(args.queries)]
+    try:
+        await scrape_round(scraper, queries[:20])  # warm up the connection pool
+        samples = {True: [], False: []}
+        recorded = 0
+        for _ in range(args.rounds):
+            for enabled in (False, True):
+                metrics.registry.enabled = enabled
+                before = recordings()
+                samples[enabled].append(await scrape_round(scraper, queries))
+                recorded += recordings() - before
+    finally:
+        metrics.registry.enabled = True
+        await close_shared_session()
+        await runner.cleanup()
+
+    on, off = statistics.median(samples[True]), statistics.median(samples[False])
+    print(f"\nscraper.run against the stub, median of {args.rounds} rounds x {args.queries} queries")
+    print(f"  metrics off  {off:.3f} ms/query")
+    print(f"  metrics on   {on:.3f} ms/query  ({(on - off) / off:+.1%}, run-to-run spread "
+          f"{(max(samples[False]) - min(samples[False])) / off:.1%})")
+    # Every recording costed as a full timed block, the most expensive primitive
+    per_scrape = recorded / (args.rounds * len(queries))
+    print(f"  {per_scrape:.0f} recordings per scrape, at most ~{per_scrape * timer_ns / 1000:.0f} us of metrics per scrape")
+
+
+def render_cost(vendors: int):
+    metrics.registry.reset()
+    for v in range(vendors):
+        vendor = f"Vendor{v}"
+        for stage in STAGES:
+            metrics.stage_seconds.observe(0.01, vendor, stage)
+        for status in (200, 304, 404, 429, "timeout"):
+            metrics.http_responses.inc(vendor, status)
+        metrics.response_bytes.inc(vendor, amount=1000)
+        metrics.limiter_wait_seconds.observe(0.001, vendor)
+    text = metrics.registry.render()
+    ms = min(timeit.repeat(metrics.registry.render, number=100, repeat=5)) / 100 * 1000
+    print(f"\n/metrics render with {vendors} vendors: {len(text.splitlines())} lines, {ms:.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=200_000, help="Calls per primitive timing")
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--vendors", type=int, default=7)
+    args = parser.parse_args()
+
+    timer_ns = micro(args.number)
+    asyncio.run(end_to_end(args, timer_ns))
+    render_cost(args.vendors)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger().setLevel(logging.WARNING)
+    main()
@@ -0,0 +1,107 @@
+"""
+Bytes per instance and serialization cost of the scrape result models:
+the previous plain dataclasses (per-instance __dict__, an eagerly allocated
+additional_info dict, asdict-based to_dict, list-building __bool__) versus
+the slotted ones in backend.vendor_models.
+
+    python -m benchmarks.bench_models_memory --count 200000
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional
+
+from backend.vendor_models import ProductSchema, SearchResultProduct
+
+
+@dataclass
+class LegacySearchResultProduct:
+    name: str = None
+    description: Optional[str] = None
+    SKU: Optional[str] = None
+    url: str = None
+    img_src: Optional[str] = None
+    orig_price: Optional[int] = None
+    disc_price: Optional[int] = None
+    additional_info: Dict[str, Any] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    def __bool__(self):
+        return any([self.name, self.description, self.SKU, self.url, self.img_src, self.orig_price, self.disc_price])
+
+
+@dataclass
+class LegacyProductSchema:
+    SKU: str
+    name: str
+    offers__price: int
+    orig_price: int
+    disc_price: int
+    currency: str
+    url: str
+    images: List[str] = field(default_factory=list)
+    description: Optional[str] = None
+    availability: Optional[str] = None
+    item_condition: Optional[str] = None
+    brand: Optional[str] = None
+    metadata: Optional[Dict[str, Any]] = None
+    additional_info: Dict[str, Any] = field(default_factory=dict)
+    unchanged: bool = False
+
+
+# Field values are shared across instances so only the objects themselves are measured
+NAME, URL, IMG = "מקרר 4 דלתות GR-730BINS", "https://www.netoneto.co.il/gr-730bins.html", "https://example.invalid/1.jpg"
+
+
+def make_search_result(cls, i):
+    return cls(name=NAME, SKU="1000", url=URL, img_src=IMG, orig_price=i, disc_price=None)
+
+
+def make_product(cls, i):
+    return cls(SKU="1000", name=NAME, offers__price=i, orig_price=None, disc_price=None,
+               currency="ILS", url=URL, images=[IMG], description=NAME, brand="LG")
+
+
+def bytes_per_instance(factory, cls, count: int) -> float:
+    gc.collect()
+    tracemalloc.start()
+    items = [factory(cls, i) for i in range(count)]
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # The list holding them costs 8 bytes per slot either way
+    per_instance = (current - 8 * count) / count
+    del items
+    return per_instance
+
+
+def ns_per_call(fn, items) -> float:
+    start = time.perf_counter()
+    for item in items:
+        fn(item)
+    return (time.perf_counter() - start) / len(items) * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=200_000)
+    args = parser.parse_args()
+
+    print(f"{'model':<22}{'variant':<10}{'bytes/obj':>10}{'to_dict ns':>12}{'bool ns':>10}")
+    for label, factory, legacy, current in (
+        ("SearchResultProduct", make_search_result, LegacySearchResultProduct, SearchResultProduct),
+        ("ProductSchema", make_product, LegacyProductSchema, ProductSchema),
+    ):
+        for variant, cls in (("before", legacy), ("after", current)):
+            size = bytes_per_instance(factory, cls, args.count)
+            sample = [factory(cls, i) for i in range(min(args.count, 50_000))]
+            to_dict_ns = ns_per_call(lambda obj: obj.to_dict() if hasattr(obj, "to_dict") else asdict(obj), sample)
+            bool_ns = ns_per_call(bool, sample) if hasattr(cls, "__bool__") else float("nan")
+            print(f"{label:<22}{variant:<10}{size:>10.0f}{to_dict_ns:>12.0f}{bool_ns:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Neto autocomplete parsing: checks neto_selector against the golden output
+recorded from the previous BeautifulSoup implementation, then times it.
+
+If beautifulsoup4 is installed, that previous implementation is timed too.
+It is kept here as the reference.
+
+    python -m benchmarks.bench_neto_selector --iterations 500
+
+The parity check runs first and exits non-zero on any difference, so the
+script can double as a regression gate after selector changes.
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from backend.vendor_selectors import neto_selector
+
+FIXTURES = Path(__file__).parent / "fixtures"
+RESPONSE = FIXTURES / "neto_autocomplete.json"
+GOLDEN = FIXTURES / "neto_autocomplete.golden.json"
+
+
+def bs4_neto_selector(results):
+    """The BeautifulSoup neto_selector this benchmark was recorded against"""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(results['10']['html'], "html.parser")
+    parsed_results = []
+    for li in soup.select("ul.amsearch-product-list li.amsearch-item.product-item"):
+        url = li.get("data-click-url")
+        if not url:
+            link_el = li.select_one("a.amsearch-link")
+            url = link_el["href"] if link_el and link_el.has_attr("href") else None
+
+        name_el = li.select_one("a.amsearch-link")
+        name = name_el.get_text(strip=True) if name_el else None
+
+        img_el = li.select_one("img.product-image-photo")
+        img_src = img_el["src"] if img_el and img_el.has_attr("src") else None
+
+        price_el = li.select_one("[data-price-type='basePrice']")
+        disc_price = None
+        if price_el and price_el.has_attr("data-price-amount"):
+            try:
+                disc_price = int(float(price_el["data-price-amount"]))
+            except ValueError:
+                pass
+
+        price_box = li.select_one(".price-box")
+        sku = (
+            price_box["data-product-id"]
+            if price_box and price_box.has_attr("data-product-id")
+            else "MISSING"
+        )
+        parsed_results.append({
+            "name": name, "description": None, "SKU": sku, "url": url, "img_src": img_src,
+            "orig_price": disc_price, "disc_price": None, "additional_info": {},
+        })
+    return parsed_results
+
+
+def check_parity(response) -> bool:
+    golden = json.loads(GOLDEN.read_text(encoding="utf-8"))
+    actual = [product.to_dict() for product in neto_selector(response)]
+    if actual == golden:
+        print(f"parity: OK ({len(golden)} products match {GOLDEN.name})")
+        return True
+
+    print(f"parity: FAILED against {GOLDEN.name}")
+    if len(actual) != len(golden):
+        print(f"  expected {len(golden)} products, got {len(actual)}")
+    for i, (want, got) in enumerate(zip(golden, actual)):
+        for key in want:
+            if want[key] != got.get(key):
+                print(f"  product {i} {key}: expected {want[key]!r}, got {got.get(key)!r}")
+    return False
+
+
+def time_selector(selector, response, iterations: int) -> float:
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        selector(response)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=500)
+    args = parser.parse_args()
+
+    response = json.loads(RESPONSE.read_text(encoding="utf-8"))
+    if not check_parity(response):
+        sys.exit(1)
+
+    selectolax_ms = time_selector(neto_selector, response, args.iterations)
+    print(f"selectolax     p50 {selectolax_ms:.3f} ms/response")
+
+    try:
+        import bs4  # noqa: F401
+    except ImportError:
+        print("beautifulsoup4 not installed, skipping the reference timing")
+        return
+    bs4_ms = time_selector(bs4_neto_selector, response, max(1, args.iterations // 10))
+    print(f"beautifulsoup  p50 {bs4_ms:.3f} ms/response ({bs4_ms / selectolax_ms:.1f}x slower)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Event-loop lag and throughput of a many-query Traklin batch against the local
+stub, with product pages parsed on the event loop versus in the parse
+executor (thread and process pools).
+
+The stub runs in a separate process so its own page rendering doesn't count
+against the scraper's event loop. Loop lag is sampled by a ticker that asks to
+wake every --tick ms and records how late it actually woke up.
+
+    python -m benchmarks.bench_parse_executor --queries 300 --page-kb 600
+"""
+import argparse
+import asyncio
+import dataclasses
+import logging
+import socket
+import subprocess
+import sys
+import time
+
+from backend.http_session import close_shared_session
+from backend.parse_executor import ParseExecutorConfig, parse_executor
+from backend.vendor_models import RateLimitPolicy
+from backend.vendor_registeration import TraklinScraper, TraklinConfig
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_stub(port: int, page_kb: int, latency: float) -> subprocess.Popen:
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.stub_server", "--port", str(port),
+         "--page-kb", str(page_kb), "--latency", str(latency)],
+        stdout=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return proc
+        except OSError:
+            time.sleep(0.05)
+    proc.kill()
+    raise RuntimeError("stub server did not start")
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def measure(scraper, queries, concurrency: int, tick: float) -> dict:
+    lags = []
+    done = asyncio.Event()
+
+    async def ticker():
+        loop = asyncio.get_running_loop()
+        while not done.is_set():
+            expected = loop.time() + tick
+            await asyncio.sleep(tick)
+            lags.append(max(0.0, loop.time() - expected) * 1000)
+
+    slots = asyncio.Semaphore(concurrency)
+
+    async def one(query):
+        async with slots:
+            await scraper.run(None, query)
+
+    ticker_task = asyncio.create_task(ticker())
+    start = time.perf_counter()
+    await asyncio.gather(*(one(q) for q in queries))
+    elapsed = time.perf_counter() - start
+    done.set()
+    await ticker_task
+
+    return {
+        "queries_per_sec": len(queries) / elapsed,
+        "lag_p50_ms": percentile(lags, 50),
+        "lag_p99_ms": percentile(lags, 99),
+        "lag_max_ms": max(lags),
+    }
+
+
+async def run_mode(base_url: str, kind: str, args) -> dict:
+    parse_executor.configure(ParseExecutorConfig(kind=kind, max_workers=args.workers, min_bytes=args.min_kb * 1024))
+    config = dataclasses.replace(
+        TraklinConfig,
+        autocomplete_endpoint=f"{base_url}/ajax/content_auto_suggest.ashx",
+        rate_limit=RateLimitPolicy(requests_per_second=1e6, burst=10**6, max_concurrent=10**6),
+        search_cache_ttl=0,
+    )
+    scraper = TraklinScraper(vendor_name="Traklin", config=config)
+    queries = [f"{kind}-{i}" for i in range(args.queries)]
+    try:
+        # Warm up the pool (process start-up, connection pool) outside the measurement
+        await scraper.run(None, f"{kind}-warmup")
+        return await measure(scraper, queries, args.concurrency, args.tick / 1000)
+    finally:
+        await close_shared_session()
+        parse_executor.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--page-kb", type=int, default=600, help="Product page size served by the stub")
+    parser.add_argument("--latency", type=float, default=0.01, help="Stub response latency in seconds")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--min-kb", type=int, default=64, help="Offload threshold")
+    parser.add_argument("--tick", type=float, default=5, help="Ticker interval in ms")
+    args = parser.parse_args()
+
+    port = free_port()
+    stub = start_stub(port, args.page_kb, args.latency)
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        print(f"{'executor':<10}{'q/s':>10}{'lag p50':>10}{'lag p99':>10}{'lag max':>10}   (ms)")
+        for kind in ("none", "thread", "process"):
+            result = asyncio.run(run_mode(base_url, kind, args))
+            print(f"{kind:<10}{result['queries_per_sec']:>10.1f}{result['lag_p50_ms']:>10.2f}"
+                  f"{result['lag_p99_ms']:>10.2f}{result['lag_max_ms']:>10.2f}")
+    finally:
+        stub.terminate()
+        stub.wait()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    main()
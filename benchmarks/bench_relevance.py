@@ -0,0 +1,67 @@
+"""
+Accuracy and cost of search-result ranking (backend.relevance) over the
+labeled cases in benchmarks/fixtures/relevance_cases.json, against the old
+"take the first result" behaviour.
+
+Each case lists a query, the Traklin anchor price (or null), the vendor's
+search results in the order the vendor returned them, and the index of the
+right product (null when none of them is a match).
+
+    python -m benchmarks.bench_relevance --iterations 2000
+"""
+import argparse
+import json
+import time
+from pathlib import Path
+
+from backend.relevance import default_ranker, profile_query
+from backend.vendor_models import SearchResultProduct
+
+CASES = Path(__file__).parent / "fixtures" / "relevance_cases.json"
+
+
+def load_cases():
+    cases = json.loads(CASES.read_text(encoding="utf-8"))
+    for case in cases:
+        case["items"] = [SearchResultProduct(**candidate) for candidate in case["candidates"]]
+    return cases
+
+
+def expected_item(case):
+    return None if case["expected"] is None else case["items"][case["expected"]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--verbose", action="store_true", help="Print every misranked case")
+    args = parser.parse_args()
+
+    cases = load_cases()
+    ranker_correct = first_correct = 0
+    for case in cases:
+        picked = default_ranker.select(case["query"], case["items"], case["anchor_price"])
+        first = case["items"][0] if case["items"] else None
+        ranker_correct += picked is expected_item(case)
+        first_correct += first is expected_item(case)
+        if args.verbose and picked is not expected_item(case):
+            scores = [round(score, 2) for score, _ in default_ranker.rank(case["query"], case["items"], case["anchor_price"])]
+            print(f"MISS {case['note']}: picked {picked and picked.name!r}, scores {scores}")
+
+    print(f"accuracy: ranker {ranker_correct}/{len(cases)}, first result {first_correct}/{len(cases)}")
+
+    candidates = sum(len(case["items"]) for case in cases)
+    # Cold: query profiles rebuilt every time; warm: served from the profile cache
+    for label, clear in (("cold", True), ("warm", False)):
+        start = time.perf_counter()
+        for _ in range(args.iterations):
+            if clear:
+                profile_query.cache_clear()
+            for case in cases:
+                default_ranker.select(case["query"], case["items"], case["anchor_price"])
+        elapsed = time.perf_counter() - start
+        print(f"{label}: {elapsed / (args.iterations * candidates) * 1e6:.2f} us per candidate")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+"""
+Per-item cost of the search-result selectors (backend/vendor_selectors.py)
+and of product-page parsing (BaseVendorScraper._parse_html_json_ld, and the
+full-DOM fallback it uses when the fast scan fails), with a regression gate
+against a stored baseline.
+
+Payloads: the Neto autocomplete response and the Neto and BigElectric product
+pages in benchmarks/fixtures, plus stub-generated responses of 1 to 200 items
+in every vendor's API shape (benchmarks/stub_server.py) and generated product
+pages up to 500 KB with the JSON-LD after the filler. The fixtures are
+synthetic, written in those sites' layout; they are not captures of the live
+sites, so the gate says nothing about real pages it has not seen. Selectors
+get the decoded JSON, as they do in the scraper.
+
+Reported per case:
+    ns/item     best of --repeat timed rounds, divided by the items in the payload
+    rel         median over the rounds of ns/item divided by the ns/item of a
+                fixed JSON-decode-and-build-dicts workload timed right before;
+                this is what the gate compares
+    B/item      Python heap still held by the selector's result, per item
+    blocks/item allocated blocks still held by the result, per item
+    peak KB     tracemalloc peak during one call (Lexbor's C-side tree not included)
+    output      hash of the parsed output; any change fails the gate
+
+    python -m benchmarks.bench_selectors                       # compare with the baseline
+    python -m benchmarks.bench_selectors --only neto --repeat 15
+    python -m benchmarks.bench_selectors --update-baseline     # after an intended change
+
+Exits non-zero when a case's rel is worse than the baseline's by more than
+--threshold (after --confirm re-timings), it holds or peaks more memory by
+more than --memory-threshold, or it parses differently. Comparing rel rather
+than raw ns keeps the gate usable on shared machines whose speed drifts by
+tens of percent; --absolute compares ns/item instead.
+"""
+import argparse
+import gc
+import hashlib
+import json
+import platform
+import statistics
+import sys
+import timeit
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from backend.vendor_registeration import NetoScraper, NetoConfig
+from backend.vendor_selectors import (
+    traklin_selector, payngo_selector, lastprice_selector, ksp_selector, neto_selector
+)
+from benchmarks.stub_server import SEARCH_PAYLOADS, render_product_page, stub_products
+
+FIXTURES = Path(__file__).parent / "fixtures"
+BASELINE = FIXTURES / "selectors.baseline.json"
+
+STUB_URL = "https://stub.invalid"
+QUERY = "LG GR-730BINS"
+SIZES = (1, 10, 50, 200)
+PAGE_KB = (0, 100, 500)
+
+SELECTORS = {
+    "Traklin": traklin_selector,
+    "Payngo": payngo_selector,
+    "LastPrice": lastprice_selector,
+    "KSP": ksp_selector,
+    "Neto": neto_selector,
+}
+
+# Differences below these are noise however large the ratio
+MIN_TIME_DELTA_NS = 50
+MIN_ALLOC_DELTA_BYTES = 16
+MIN_PEAK_DELTA_KB = 4
+
+
+@dataclass
+class Case:
+    name: str
+    parse: Callable[[Any], Any]
+    payload: Any
+    items: int
+
+
+def build_cases() -> List[Case]:
+    cases = []
+    for vendor, selector in SELECTORS.items():
+        for size in SIZES:
+            payload = SEARCH_PAYLOADS[vendor](stub_products(vendor, QUERY, size, STUB_URL))
+            cases.append(Case(f"{selector.__name__}/{size}", selector, payload, size))
+
+    fixture = json.loads((FIXTURES / "neto_autocomplete.json").read_text(encoding="utf-8"))
+    cases.append(Case("neto_selector/fixture", neto_selector, fixture, len(neto_selector(fixture))))
+
+    scraper = NetoScraper(vendor_name="Neto", config=NetoConfig)
+    search_result = neto_selector(SEARCH_PAYLOADS["Neto"](stub_products("Neto", QUERY, 1, STUB_URL)))[0]
+
+    def parse_page(page: bytes):
+        return scraper._parse_html_json_ld(page, search_result)
+
+    for name in ("neto_product.html", "bigelectric_product.html"):
+        page = (FIXTURES / name).read_bytes()
+        cases.append(Case(f"parse_html_json_ld/{name.split('_')[0]}_fixture", parse_page, page, 1))
+    for kb in PAGE_KB:
+        page = render_product_page("Traklin", "123456", f"Product {QUERY}", STUB_URL, kb).encode("utf-8")
+        cases.append(Case(f"parse_html_json_ld/generated_{kb}kb", parse_page, page, 1))
+        cases.append(Case(f"find_product_json_ld_dom/generated_{kb}kb", scraper._find_product_json_ld_dom, page, 1))
+    return cases
+
+
+def fingerprint(output) -> str:
+    if isinstance(output, list):
+        output = [item.to_dict() for item in output]
+    elif hasattr(output, "to_dict"):
+        output = output.to_dict()
+    return hashlib.sha1(json.dumps(output, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+
+
+def memory(case: Case) -> Dict[str, float]:
+    gc.collect()
+    tracemalloc.start()
+    blocks_before = sys.getallocatedblocks()
+    traced_before, _ = tracemalloc.get_traced_memory()
+    output = case.parse(case.payload)
+    traced_after, peak = tracemalloc.get_traced_memory()
+    blocks = sys.getallocatedblocks() - blocks_before
+    tracemalloc.stop()
+    del output
+    return {
+        "alloc_bytes_per_item": round((traced_after - traced_before) / case.items, 1),
+        "alloc_blocks_per_item": round(blocks / case.items, 1),
+        "peak_kb": round((peak - traced_before) / 1024, 1),
+    }
+
+
+CALIBRATION_DOC = json.dumps([{"name": f" item {i} ", "sku": str(i), "price": i * 1.5} for i in range(200)])
+
+
+def calibration_workload():
+    return [{"name": item["name"].strip(), "SKU": item["sku"]} for item in json.loads(CALIBRATION_DOC)]
+
+
+def timings(case: Case, repeat: int) -> Dict[str, float]:
+    """
+    Best ns/item of the case, and the median ratio to the calibration workload
+    over `repeat` rounds, each timing the calibration right before the case so
+    both see the same machine speed
+    """
+    timer = timeit.Timer(lambda: case.parse(case.payload))
+    calibration = timeit.Timer(calibration_workload)
+    number = max(1, int(0.02 / max(timer.timeit(1), 1e-7)))
+    cal_number = max(1, int(0.02 / max(calibration.timeit(1), 1e-7)))
+
+    best, ratios = float("inf"), []
+    for _ in range(repeat):
+        cal_ns = calibration.timeit(cal_number) / cal_number / 200 * 1e9
+        ns = timer.timeit(number) / number / case.items * 1e9
+        best = min(best, ns)
+        ratios.append(ns / cal_ns)
+    return {"ns_per_item": round(best, 1), "rel": round(statistics.median(ratios), 3)}
+
+
+def measure(cases: List[Case], repeat: int) -> Dict[str, Dict[str, Any]]:
+    results = {}
+    for case in cases:
+        output = case.parse(case.payload)  # warm-up, and the output to fingerprint
+        results[case.name] = {
+            "items": case.items,
+            **timings(case, repeat),
+            **memory(case),
+            "output": fingerprint(output),
+        }
+    return results
+
+
+def slower(current: dict, base: dict, args) -> bool:
+    key = "ns_per_item" if args.absolute else "rel"
+    if current[key] <= base[key] * (1 + args.threshold):
+        return False
+    # Ignore differences too small to matter, whatever their ratio
+    return (current["ns_per_item"] - base["ns_per_item"]) * current["items"] > MIN_TIME_DELTA_NS
+
+
+def regressions(case: Case, current: dict, base: dict, args) -> List[str]:
+    problems = []
+    if current["output"] != base["output"]:
+        problems.append("output changed")
+
+    # A slow reading is often the machine, not the code: time it again before believing it
+    for _ in range(args.confirm):
+        if not slower(current, base, args):
+            break
+        retry = timings(case, args.repeat)
+        if retry["rel"] < current["rel"]:
+            current.update(retry)
+    if slower(current, base, args):
+        key = "ns_per_item" if args.absolute else "rel"
+        problems.append(f"{key} {base[key]} -> {current[key]}")
+
+    for key, floor in (("alloc_bytes_per_item", MIN_ALLOC_DELTA_BYTES), ("peak_kb", MIN_PEAK_DELTA_KB)):
+        if current[key] > base[key] * (1 + args.memory_threshold) and current[key] - base[key] > floor:
+            problems.append(f"{key} {base[key]} -> {current[key]}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=15, help="Timed rounds per case")
+    parser.add_argument("--only", help="Run only cases whose name contains this")
+    parser.add_argument("--baseline", default=str(BASELINE))
+    parser.add_argument("--update-baseline", action="store_true", help="Store this run as the baseline instead of comparing")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed ns/item slowdown, as a fraction")
+    parser.add_argument("--memory-threshold", type=float, default=0.10, help="Allowed memory growth, as a fraction")
+    parser.add_argument("--confirm", type=int, default=3, help="Re-timings of a seemingly slower case before it fails")
+    parser.add_argument("--absolute", action="store_true", help="Gate on raw ns/item instead of rel")
+    parser.add_argument("--json", help="Also write this run's results here")
+    args = parser.parse_args()
+
+    cases = [case for case in build_cases() if not args.only or args.only in case.name]
+    if not cases:
+        parser.error(f"No case matches '{args.only}'")
+
+    run = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "cases": measure(cases, args.repeat),
+    }
+    if args.json:
+        Path(args.json).write_text(json.dumps(run, indent=2) + "\n", encoding="utf-8")
+
+    baseline_path = Path(args.baseline)
+    baseline: Optional[dict] = None
+    if baseline_path.exists():
+        baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+
+    if args.update_baseline:
+        if baseline and args.only:
+            # Partial run: keep the other cases' baselines
+            run["cases"] = {**baseline["cases"], **run["cases"]}
+        baseline_path.write_text(json.dumps(run, indent=2) + "\n", encoding="utf-8")
+        print(f"Baseline written to {baseline_path} ({len(run['cases'])} cases)")
+        return
+
+    failed = 0
+    if baseline and baseline["meta"]["python"] != run["meta"]["python"]:
+        print(f"Note: baseline recorded on Python {baseline['meta']['python']}, allocation figures may not compare")
+
+    key = "ns_per_item" if args.absolute else "rel"
+    print(f"{'case':<40}{'items':>6}{'ns/item':>12}{'rel':>10}{'vs base':>9}{'B/item':>9}{'blocks':>8}{'peak KB':>9}  status")
+    for case in cases:
+        name, current = case.name, run["cases"][case.name]
+        base = baseline["cases"].get(name) if baseline else None
+        if base is None:
+            change, status = "", "new"
+        else:
+            problems = regressions(case, current, base, args)
+            change = f"{current[key] / base[key] - 1:+.0%}"
+            status = "REGRESSED: " + "; ".join(problems) if problems else "ok"
+            failed += bool(problems)
+        print(f"{name:<40}{current['items']:>6}{current['ns_per_item']:>12.0f}{current['rel']:>10.2f}{change:>9}"
+              f"{current['alloc_bytes_per_item']:>9.0f}{current['alloc_blocks_per_item']:>8.1f}{current['peak_kb']:>9.1f}  {status}")
+
+    if baseline is None:
+        print(f"\nNo baseline at {baseline_path}; run with --update-baseline to record one")
+    elif failed:
+        print(f"\n{failed} case(s) regressed against {baseline_path.name} ({baseline['meta']['timestamp']})")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,474 @@
+"""
+Local stand-in for every vendor endpoint so scraper performance can be measured
+without hitting the live sites.
+
+One server impersonates all registered vendors, each under the path its real
+endpoint uses (see stub_vendor_configs): Traklin autosuggest, Payngo/Shekem
+InstantSearch, LastPrice searchbox, KSP category search + item API, Neto
+(Amasty) autocomplete, BigElectric suggest, and JSON-LD product pages.
+Neto and BigElectric product pages are the synthetic fixture pages in
+benchmarks/fixtures (generated markup in those sites' layout, not captures of
+the live pages) with the stub's product spliced in, and Neto's autocomplete
+uses the fixture response envelope. The other vendors' payloads follow the
+shapes their selectors read.
+
+Each vendor behaves according to a StubProfile: latency distribution, error
+rate, miss rate, results per search and product page size.
+
+    python -m benchmarks.stub_server --port 8081
+    python -m benchmarks.stub_server --latency 0.15 --distribution lognormal --spread 0.5 --error-rate 0.02
+    python -m benchmarks.stub_server --profiles profiles.json
+
+A profiles file maps vendor names (or "default") to StubProfile fields:
+{"default": {"latency": 0.1}, "KSP": {"latency": 0.4, "error_rate": 0.1}}.
+GET /__stats returns the requests served per vendor.
+"""
+import argparse
+import asyncio
+import dataclasses
+import json
+import math
+import random
+import re
+import zlib
+from collections import Counter
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, quote
+
+from aiohttp import web
+
+from backend.vendor_models import RateLimitPolicy
+from backend.vendor_registeration import (
+    TraklinScraper, TraklinConfig,
+    KSPScraper, KSPConfig,
+    PayngoScraper, PayngoConfig,
+    ShekemScraper, ShekemConfig,
+    LastPriceScraper, LastPriceConfig,
+    NetoScraper, NetoConfig,
+    BigElectricScraper, BigElectricConfig
+)
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+# Every vendor the stub can impersonate, keyed by VendorConfig.name
+STUB_VENDORS = [
+    (TraklinScraper, TraklinConfig),
+    (KSPScraper, KSPConfig),
+    (PayngoScraper, PayngoConfig),
+    (ShekemScraper, ShekemConfig),
+    (LastPriceScraper, LastPriceConfig),
+    (NetoScraper, NetoConfig),
+    (BigElectricScraper, BigElectricConfig),
+]
+
+# Product pages served from a fixture page rather than the generated template
+FIXTURE_PAGES = {"Neto": "neto_product.html", "BigElectric": "bigelectric_product.html"}
+
+LATENCY_DISTRIBUTIONS = ("constant", "uniform", "lognormal")
+
+# Names of the extra, wrong search results; the ranker should pass over them
+DISTRACTORS = ("cover", "filter", "stand", "adapter", "remote")
+
+PRODUCT_PAGE = """<!DOCTYPE html>
+<html><head><title>{name}</title>
+</head><body><h1>{name}</h1><p>{description}</p>{padding}
+<script type="application/ld+json">{ld_json}</script>
+</body></html>
+"""
+
+NETO_ITEM = """<li class="amsearch-item product-item" data-click-url="{url}">
+  <div class="amsearch-image"><a href="{url}" class="product-item-photo" title="{name}">
+    <span class="product-image-container"><img class="product-image-photo" src="{img}" alt="{name}" loading="lazy"/></span>
+  </a></div>
+  <section class="amsearch-description product details product-item-details">
+    <a class="product-item-link amsearch-link item-name" href="{url}" title="{name}">{name}</a>
+    <div class="price-box price-final_price" data-role="priceBox" data-product-id="{sku}" data-price-box="product-id-{sku}">
+      <span class="price-container price-final_price tax weee">
+        <span data-price-amount="{price}.00" data-price-type="basePrice" class="price-wrapper "><span class="price">&#8362;{price}</span></span>
+      </span>
+    </div>
+  </section>
+</li>"""
+
+
+@dataclass
+class StubProfile:
+    """How one impersonated vendor behaves"""
+    latency: float = 0.0            # seconds: constant value, uniform centre or lognormal median
+    distribution: str = "uniform"   # constant, uniform (latency +/- spread) or lognormal (sigma = spread)
+    spread: float = 0.0
+    error_rate: float = 0.0         # share of responses answered with error_status
+    error_status: int = 503
+    miss_rate: float = 0.0          # share of queries that find nothing, picked deterministically per query
+    results: int = 1                # search results per query; the first is the right one
+    page_kb: int = 0                # filler appended to generated product pages
+
+    def __post_init__(self):
+        if self.distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution '{self.distribution}', expected one of {LATENCY_DISTRIBUTIONS}")
+
+    def delay(self, rng: random.Random) -> float:
+        if self.distribution == "lognormal" and self.latency > 0:
+            return rng.lognormvariate(math.log(self.latency), self.spread)
+        if self.distribution == "uniform" and self.spread:
+            return max(0.0, self.latency + rng.uniform(-self.spread, self.spread))
+        return self.latency
+
+
+def load_profiles(path: str) -> Dict[str, StubProfile]:
+    """{vendor or "default": StubProfile} from a JSON profiles file"""
+    raw = json.loads(Path(path).read_text(encoding="utf-8"))
+    return {name: StubProfile(**fields) for name, fields in raw.items()}
+
+
+def stub_products(vendor: str, query: str, count: int, base_url: str) -> List[dict]:
+    """The `count` search results `vendor` returns for `query`: the product first, then distractors"""
+    products = []
+    for i in range(count):
+        name = f"Product {query}" if i == 0 else f"{DISTRACTORS[(i - 1) % len(DISTRACTORS)]} for {query} {i}"
+        sku = str(zlib.crc32(f"{vendor}:{query}:{i}".encode("utf-8")) % 10**6)
+        products.append({
+            "name": name,
+            "sku": sku,
+            "price": 500 + int(sku) % 9500 if i == 0 else 20 + int(sku) % 200,
+            "url": f"{base_url}/p/{vendor}/{sku}?name={quote(name)}",
+            "img": f"{base_url}/img/{sku}.jpg",
+        })
+    return products
+
+
+# Search response bodies in each vendor's API shape, built from stub_products()
+
+def traklin_payload(products: List[dict]) -> list:
+    return [{
+        "name": p["name"], "description": f"Stub description for {p['name']}", "catalog_number": p["sku"],
+        "href": p["url"], "img_src": p["img"], "value": p["sku"],
+    } for p in products]
+
+
+def instantsearch_payload(products: List[dict]) -> dict:
+    return {"items": [{
+        "l": p["name"], "d": f"Stub description for {p['name']}", "sku": p["sku"], "u": p["url"],
+        "t2": p["img"], "p_c": p["price"], "p": p["price"],
+    } for p in products]}
+
+
+def lastprice_payload(products: List[dict]) -> dict:
+    return {"products": [{
+        "title": p["name"], "subtitle": "Stub", "productId": p["sku"], "url": p["url"], "image": p["img"],
+    } for p in products]}
+
+
+def ksp_payload(products: List[dict]) -> dict:
+    return {"result": {"items": [{
+        "name": p["name"], "description": f"Stub description for {p['name']}", "uin": p["sku"],
+        "img": p["img"], "price": p["price"], "min_price": p["price"],
+    } for p in products]}}
+
+
+@lru_cache(maxsize=None)
+def _fixture(name: str) -> str:
+    return (FIXTURES / name).read_text(encoding="utf-8")
+
+
+@lru_cache(maxsize=None)
+def _neto_envelope() -> dict:
+    return json.loads(_fixture("neto_autocomplete.json"))
+
+
+def neto_payload(products: List[dict]) -> dict:
+    """The fixture Neto response with its product list HTML replaced"""
+    envelope = _neto_envelope()
+    items = "".join(NETO_ITEM.format(**p) for p in products)
+    html = (
+        '<div class="amsearch-products-section -grid"><ul class="amsearch-product-list">' + items + "</ul></div>"
+        if items else ""
+    )
+    return {**envelope, "10": {**envelope["10"], "html": html}}
+
+
+def bigelectric_payload(products: List[dict]) -> dict:
+    return {"indexes": [{"identifier": "magento_catalog_product", "items": [{
+        "name": p["name"], "sku": p["sku"], "url": p["url"], "imageUrl": p["img"], "price": f"{p['price']:,}.00",
+    } for p in products]}]}
+
+
+SEARCH_PAYLOADS = {
+    "Traklin": traklin_payload,
+    "KSP": ksp_payload,
+    "Payngo": instantsearch_payload,
+    "Shekem": instantsearch_payload,
+    "LastPrice": lastprice_payload,
+    "Neto": neto_payload,
+    "BigElectric": bigelectric_payload,
+}
+
+
+def ksp_item_payload(uin: str, base_url: str) -> dict:
+    return {
+        "result": {
+            "data": {
+                "uin": uin, "name": f"Product {uin}", "price": 500 + int(uin) % 9500, "smalldesc": "Stub product",
+                "brandName": "Stub", "cheaperPriceViaPhone": False,
+            },
+            "images": [{"sizes": {"b": {"src": f"{base_url}/img/{uin}.jpg"}}}],
+            "tags": [],
+            "redMsg": "",
+        },
+        "seo": {"myUrl": f"{base_url}/ksp/web/item/{uin}"},
+    }
+
+
+@lru_cache(maxsize=None)
+def padding(kb: int) -> str:
+    """Filler markup, to mimic real multi-hundred-KB pages"""
+    return "".join(
+        f'<div class="product-item"><a href="/p/{i}">Related product {i}</a><span class="price">{i}</span></div>'
+        for i in range(kb * 1024 // 90)
+    )
+
+
+def render_product_page(vendor: str, sku: str, name: str, base_url: str, page_kb: int = 0) -> str:
+    """
+    A product page carrying the product as JSON-LD: the vendor's fixture page
+    when there is one (FIXTURE_PAGES), else a minimal page padded to `page_kb`
+    with the JSON-LD after the padding, so finding it means reading the whole page
+    """
+    ld_json = json.dumps({
+        "@context": "https://schema.org",
+        "@type": "Product",
+        "name": name,
+        "description": "Stub product",
+        "image": f"{base_url}/img/{sku}.jpg",
+        "brand": {"@type": "Brand", "name": "Stub"},
+        "offers": {"@type": "Offer", "sku": sku, "price": 500 + int(sku) % 9500 if sku.isdigit() else 1990,
+                   "priceCurrency": "ILS", "availability": "https://schema.org/InStock"},
+    }, ensure_ascii=False)
+
+    fixture = FIXTURE_PAGES.get(vendor)
+    if fixture:
+        # Ours goes first in <head>, so it is the Product the scraper finds
+        script = f'<script type="application/ld+json">{ld_json}</script>'
+        return re.sub(r"<head[^>]*>", lambda m: m.group(0) + script, _fixture(fixture), count=1)
+
+    return PRODUCT_PAGE.format(name=name, description="Stub product", ld_json=ld_json, padding=padding(page_kb))
+
+
+class VendorStub:
+    """
+    Serves every vendor's search endpoint and product pages. Vendors without
+    an entry in `profiles` use the default profile built from the keyword
+    arguments, which keeps the original single-vendor (Traklin) stub usable
+    as before.
+    """
+
+    def __init__(
+        self, latency: float = 0.0, jitter: float = 0.0, etags: bool = True, page_padding_kb: int = 0, miss_rate: float = 0.0,
+        seed: int = 0, profiles: Optional[Dict[str, StubProfile]] = None
+    ):
+        profiles = dict(profiles or {})
+        self.default_profile = profiles.pop("default", None) or StubProfile(
+            latency=latency, spread=jitter, page_kb=page_padding_kb, miss_rate=miss_rate
+        )
+        self.profiles = profiles
+        self.etags = etags
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.base_url = None
+        self.requests_served = 0
+        self.requests_by_vendor: Counter = Counter()
+        self.errors_served: Counter = Counter()
+
+    def profile(self, vendor: str) -> StubProfile:
+        return self.profiles.get(vendor, self.default_profile)
+
+    def misses(self, query: str, vendor: str = "Traklin") -> bool:
+        key = zlib.crc32(vendor.encode("utf-8"), self.seed)
+        return zlib.crc32(query.encode("utf-8"), key) % 1000 < self.profile(vendor).miss_rate * 1000
+
+    async def _serve(self, vendor: str) -> Optional[web.Response]:
+        """Delay, count and maybe fail a request; returns the error response to send, if any"""
+        profile = self.profile(vendor)
+        delay = profile.delay(self.rng)
+        if delay:
+            await asyncio.sleep(delay)
+        self.requests_served += 1
+        self.requests_by_vendor[vendor] += 1
+        if profile.error_rate and self.rng.random() < profile.error_rate:
+            self.errors_served[vendor] += 1
+            return web.Response(status=profile.error_status, text="stub error")
+        return None
+
+    def _products(self, vendor: str, query: str) -> List[dict]:
+        if self.misses(query, vendor):
+            return []
+        return stub_products(vendor, query, self.profile(vendor).results, self.base_url)
+
+    # Search endpoints, one per vendor API shape
+
+    async def traklin_autosuggest(self, request: web.Request) -> web.Response:
+        error = await self._serve("Traklin")
+        if error:
+            return error
+        return web.json_response(traklin_payload(self._products("Traklin", request.query.get("prefix", ""))))
+
+    async def instantsearch(self, request: web.Request) -> web.Response:
+        vendor = "Shekem" if request.query.get("store_id") == "2" else "Payngo"
+        error = await self._serve(vendor)
+        if error:
+            return error
+        return web.json_response(instantsearch_payload(self._products(vendor, request.query.get("q", ""))))
+
+    async def lastprice_searchbox(self, request: web.Request) -> web.Response:
+        error = await self._serve("LastPrice")
+        if error:
+            return error
+        # LastPrice takes its query form-encoded in the body of a GET
+        form = parse_qs(await request.text())
+        query = form.get("query", [""])[0]
+        return web.json_response(lastprice_payload(self._products("LastPrice", query)))
+
+    async def ksp_category(self, request: web.Request) -> web.Response:
+        error = await self._serve("KSP")
+        if error:
+            return error
+        return web.json_response(ksp_payload(self._products("KSP", request.query.get("search", ""))))
+
+    async def ksp_item(self, request: web.Request) -> web.Response:
+        error = await self._serve("KSP")
+        if error:
+            return error
+        return web.json_response(ksp_item_payload(request.match_info["uin"], self.base_url))
+
+    async def neto_autocomplete(self, request: web.Request) -> web.Response:
+        error = await self._serve("Neto")
+        if error:
+            return error
+        return web.json_response(neto_payload(self._products("Neto", request.query.get("q", ""))))
+
+    async def bigelectric_suggest(self, request: web.Request) -> web.Response:
+        error = await self._serve("BigElectric")
+        if error:
+            return error
+        return web.json_response(bigelectric_payload(self._products("BigElectric", request.query.get("q", ""))))
+
+    # Product pages
+
+    async def product_page(self, request: web.Request) -> web.Response:
+        vendor = request.match_info.get("vendor", "Traklin")
+        error = await self._serve(vendor)
+        if error:
+            return error
+        sku = request.match_info["sku"]
+        etag = f'"{vendor}-{sku}"'
+        if self.etags and request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304, headers={"ETag": etag})
+        return web.Response(
+            text=render_product_page(
+                vendor, sku, request.query.get("name", f"Product {sku}"), self.base_url, self.profile(vendor).page_kb
+            ),
+            content_type="text/html",
+            headers={"ETag": etag} if self.etags else None,
+        )
+
+    async def stats(self, request: web.Request) -> web.Response:
+        return web.json_response({
+            "requests": dict(self.requests_by_vendor),
+            "errors": dict(self.errors_served),
+        })
+
+    def build_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/ajax/content_auto_suggest.ashx", self.traklin_autosuggest)
+        app.router.add_get("/instantsearch", self.instantsearch)
+        app.router.add_get("/oapi/oapi_searchbox.asp", self.lastprice_searchbox)
+        app.router.add_get("/ksp/category", self.ksp_category)
+        app.router.add_get("/ksp/item/{uin}", self.ksp_item)
+        app.router.add_get("/amasty_xsearch/autocomplete/index/", self.neto_autocomplete)
+        app.router.add_get("/searchautocomplete/ajax/suggest/", self.bigelectric_suggest)
+        app.router.add_get("/product/{sku}", self.product_page)
+        app.router.add_get("/p/{vendor}/{sku}", self.product_page)
+        app.router.add_get("/__stats", self.stats)
+        return app
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> web.AppRunner:
+        runner = web.AppRunner(self.build_app(), access_log=None)
+        await runner.setup()
+        site = web.TCPSite(runner, host, port)
+        await site.start()
+        bound_port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://{host}:{bound_port}"
+        return runner
+
+
+def stub_vendor_configs(base_url: str, vendors: Optional[List[str]] = None, search_cache_ttl: float = 0, unlimited: bool = True):
+    """
+    (scraper class, VendorConfig) pairs for `vendors` (default: all of
+    STUB_VENDORS), pointed at the stub at `base_url`. `unlimited` lifts the
+    vendors' rate limits so the scraper rather than the limiter is measured.
+    """
+    endpoints = {
+        "Traklin": {"autocomplete_endpoint": f"{base_url}/ajax/content_auto_suggest.ashx"},
+        "KSP": {"autocomplete_endpoint": f"{base_url}/ksp/category", "product_data_endpoint": f"{base_url}/ksp/item"},
+        "Payngo": {"autocomplete_endpoint": f"{base_url}/instantsearch"},
+        "Shekem": {"autocomplete_endpoint": f"{base_url}/instantsearch"},
+        "LastPrice": {"autocomplete_endpoint": f"{base_url}/oapi/oapi_searchbox.asp"},
+        "Neto": {"autocomplete_endpoint": f"{base_url}/amasty_xsearch/autocomplete/index/"},
+        "BigElectric": {"autocomplete_endpoint": f"{base_url}/searchautocomplete/ajax/suggest/"},
+    }
+    overrides = {"search_cache_ttl": search_cache_ttl}
+    if unlimited:
+        overrides["rate_limit"] = RateLimitPolicy(requests_per_second=1e6, burst=10**6, max_concurrent=10**6)
+
+    selected = []
+    for scraper_cls, config in STUB_VENDORS:
+        if vendors is None or config.name in vendors:
+            selected.append((scraper_cls, dataclasses.replace(config, **endpoints[config.name], **overrides)))
+    return selected
+
+
+def add_profile_arguments(parser: argparse.ArgumentParser):
+    """Default-profile flags shared by the stub CLI and the benchmark runners"""
+    parser.add_argument("--latency", type=float, default=0.0, help="Response latency in seconds (lognormal: median)")
+    parser.add_argument("--jitter", "--spread", dest="spread", type=float, default=0.0,
+                        help="Uniform +/- jitter in seconds, or the lognormal sigma")
+    parser.add_argument("--distribution", choices=LATENCY_DISTRIBUTIONS, default="uniform")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of responses answered with --error-status")
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--miss-rate", type=float, default=0.0, help="Share of queries that find nothing")
+    parser.add_argument("--results", type=int, default=1, help="Search results per query")
+    parser.add_argument("--page-kb", type=int, default=0, help="Pad generated product pages to roughly this many KB")
+    parser.add_argument("--profiles", help="JSON file of per-vendor StubProfile overrides")
+
+
+def profiles_from_args(args) -> Dict[str, StubProfile]:
+    profiles = load_profiles(args.profiles) if args.profiles else {}
+    profiles.setdefault("default", StubProfile(
+        latency=args.latency, distribution=args.distribution, spread=args.spread, error_rate=args.error_rate,
+        error_status=args.error_status, miss_rate=args.miss_rate, results=args.results, page_kb=args.page_kb,
+    ))
+    return profiles
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-etags", action="store_true", help="Don't send ETags (no 304s on refetch)")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    async def main():
+        stub = VendorStub(etags=not args.no_etags, seed=args.seed, profiles=profiles_from_args(args))
+        runner = await stub.start(args.host, args.port)
+        print(f"Vendor stub listening on {stub.base_url}", flush=True)
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await runner.cleanup()
+
+    asyncio.run(main())
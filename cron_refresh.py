@@ -0,0 +1,177 @@
+import argparse
+import asyncio
+import logging
+import math
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from backend.db_utils import Database
+from backend.http_session import close_shared_session
+from backend.page_cache import page_validators
+from backend.rate_limiter import rate_limiters
+from multi_vendor_scrape import run_multi_vendor_scrape
+
+logger = logging.getLogger(__name__)
+
+# app.models.ScrapeInitiator.CRON
+CRON_INITIATOR = "CRON"
+
+
+@dataclass
+class RefreshCandidate:
+    traklin_sku: int
+    query: str
+    last_refreshed: Optional[datetime]
+    staleness: Optional[float]  # seconds since last_refreshed, by the database clock
+    popularity: int
+    priority: float = 0.0
+
+
+def prioritize(rows: List[Dict], popularity_weight: float = 1.0) -> List[RefreshCandidate]:
+    """
+    Order products most-urgent first. Priority is staleness in seconds scaled by
+    log-popularity, so a hot product refreshed an hour ago can outrank a cold
+    one refreshed yesterday, but nothing is starved forever.
+    Products never found by a stored query fall back to searching their SKU.
+    Staleness comes from the database (staleness_seconds), which wrote
+    last_refreshed, so the local clock and time zone don't enter into it.
+    """
+    candidates = []
+    for row in rows:
+        staleness = row["staleness_seconds"]
+        age = staleness if staleness is not None else float("inf")
+        candidates.append(RefreshCandidate(
+            traklin_sku=row["traklin_sku"],
+            query=row["query"] or str(row["traklin_sku"]),
+            last_refreshed=row["last_refreshed"],
+            staleness=staleness,
+            popularity=row["popularity"],
+            priority=age * (1 + popularity_weight * math.log1p(row["popularity"])),
+        ))
+    return sorted(candidates, key=lambda c: c.priority, reverse=True)
+
+
+def percentile(samples: List[float], pct: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, int(len(ordered) * pct / 100))
+    return ordered[idx]
+
+
+async def run_refresh_cycle(
+    db: Database,
+    window: float = 3600,
+    max_refreshes: Optional[int] = None,
+    max_concurrency: int = 4,
+    popularity_days: int = 30,
+    popularity_weight: float = 1.0,
+    direct: bool = True,
+) -> Dict[str, Optional[float]]:
+    """
+    Refresh tracked products once, spreading the scrapes evenly over `window`
+    seconds so vendors see a steady trickle instead of a burst. Every scrape
+    goes through the shared HTTP session and per-vendor rate limiters and is
+    recorded with initiator CRON. With `direct`, vendors that already matched
+    the product are re-fetched from their stored URL instead of searched.
+    Pages unchanged since the previous cycle get no new snapshot; the page
+    validators that tell are kept in memory, so this only happens from the
+    second cycle of a `--loop` process on (a one-shot run stores every page).
+    Returns refresh lag percentiles in seconds.
+    """
+    fetched = time.monotonic()
+    candidates = prioritize(await db.get_refresh_candidates(popularity_days), popularity_weight)
+    if max_refreshes is not None:
+        candidates = candidates[:max_refreshes]
+    if not candidates:
+        logger.info("No tracked products to refresh")
+        return {}
+
+    before = await db.get_freshness_percentiles()
+    interval = window / len(candidates)
+    logger.info(f"Refreshing {len(candidates)} products over {window:.0f}s (one every {interval:.2f}s)")
+
+    slots = asyncio.Semaphore(max_concurrency)
+    lags: List[float] = []
+    failures = 0
+
+    async def refresh(candidate: RefreshCandidate):
+        nonlocal failures
+        async with slots:
+            if candidate.staleness is not None:
+                lags.append(candidate.staleness + time.monotonic() - fetched)
+            try:
+                matches = await db.get_stored_matches(candidate.traklin_sku) if direct else None
+                await run_multi_vendor_scrape(
+                    candidate.query, initiator=CRON_INITIATOR, db=db, matches=matches, skip_unchanged=True
+                )
+            except Exception as e:
+                failures += 1
+                logger.error(f"Refresh of {candidate.traklin_sku} ('{candidate.query}') failed: {e}")
+
+    started = time.monotonic()
+    tasks = []
+    for i, candidate in enumerate(candidates):
+        delay = started + i * interval - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(refresh(candidate)))
+    await asyncio.gather(*tasks)
+
+    report = {
+        "refreshed": len(candidates) - failures,
+        "failed": failures,
+        "elapsed_seconds": round(time.monotonic() - started, 1),
+        "lag_p50_seconds": percentile(lags, 50),
+        "lag_p90_seconds": percentile(lags, 90),
+        "lag_p99_seconds": percentile(lags, 99),
+        "freshness_p50_before": before.get(0.5),
+        "freshness_p99_before": before.get(0.99),
+    }
+    logger.info(f"Refresh cycle finished: {report}")
+    logger.info(f"Page validators: {page_validators.stats()}")
+    for vendor, vendor_stats in rate_limiters.stats().items():
+        logger.info(f"[{vendor}] rate limiter: {vendor_stats}")
+    return report
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    parser = argparse.ArgumentParser(description="Re-scrape tracked products on a schedule (initiator CRON)")
+    parser.add_argument("--window", type=float, default=3600, help="Seconds to spread one refresh cycle over")
+    parser.add_argument("--max-refreshes", type=int, default=None, help="Refresh at most this many products per cycle")
+    parser.add_argument("--concurrency", type=int, default=4, help="Max scrapes running at once")
+    parser.add_argument("--popularity-days", type=int, default=30, help="Look-back for counting user scrapes")
+    parser.add_argument("--search-only", action="store_true", help="Always search instead of re-fetching stored product URLs")
+    parser.add_argument("--loop", action="store_true", help="Start a new cycle as soon as one finishes (needed to skip unchanged pages, whose validators are kept in memory)")
+    args = parser.parse_args()
+
+    async def main():
+        db = Database()
+        await db.connect()
+        try:
+            while True:
+                cycle_started = time.monotonic()
+                await run_refresh_cycle(
+                    db,
+                    window=args.window,
+                    max_refreshes=args.max_refreshes,
+                    max_concurrency=args.concurrency,
+                    popularity_days=args.popularity_days,
+                    direct=not args.search_only,
+                )
+                if not args.loop:
+                    break
+                # Never start cycles more often than once per window
+                await asyncio.sleep(max(0.0, args.window - (time.monotonic() - cycle_started)))
+        finally:
+            await db.close()
+            await close_shared_session()
+
+    asyncio.run(main())
@@ -19,6 +19,12 @@ CREATE TABLE IF NOT EXISTS products (
     FOREIGN KEY (vendor_id) REFERENCES vendors(id)
 );
 
+-- Keyset pagination of GET /products, newest first (optionally per vendor)
+CREATE INDEX IF NOT EXISTS idx_products_updated_at_key
+    ON products (updated_at DESC, traklin_sku DESC, vendor_sku DESC);
+CREATE INDEX IF NOT EXISTS idx_products_vendor_updated_at_key
+    ON products (vendor_id, updated_at DESC, traklin_sku DESC, vendor_sku DESC);
+
 -- Create Scraping Sessions Table
 CREATE TABLE IF NOT EXISTS scraping_sessions (
     scrape_id SERIAL PRIMARY KEY,
@@ -26,16 +32,21 @@ CREATE TABLE IF NOT EXISTS scraping_sessions (
     query TEXT,
     initiator VARCHAR(50),
     status VARCHAR(50),
-    total_vendors INTEGER DEFAULT 0,
-    successful_vendors INTEGER DEFAULT 0
+    vendors_called INTEGER DEFAULT 0,
+    valid_results INTEGER DEFAULT 0,
+    vendor_statuses JSONB, -- vendor -> ok/no_result/error/timeout; see migrations/003
+    query_key TEXT, -- normalized query, see migrations/004
+    error TEXT -- why a failed/cancelled scrape ended, see migrations/005
 );
 
 -- Create Product Snapshots Table
+-- Range-partitioned by month on scraped_at; see migrations/001_partition_product_snapshots.sql
 CREATE TABLE IF NOT EXISTS product_snapshots (
-    id SERIAL PRIMARY KEY,
+    id BIGSERIAL,
     traklin_sku INTEGER NOT NULL,
     vendor_sku VARCHAR(255) NOT NULL,
     scrape_id INTEGER,
+    scraped_at TIMESTAMP NOT NULL DEFAULT NOW(),
     
     -- Core product data
     name VARCHAR(500) NOT NULL,
@@ -55,9 +66,77 @@ CREATE TABLE IF NOT EXISTS product_snapshots (
     brand VARCHAR(255),
     metadata JSONB,
     
+    PRIMARY KEY (id, scraped_at),
     FOREIGN KEY (traklin_sku, vendor_sku) REFERENCES products(traklin_sku, vendor_sku) ON DELETE CASCADE,
     FOREIGN KEY (scrape_id) REFERENCES scraping_sessions(scrape_id) ON DELETE SET NULL
-);
+) PARTITION BY RANGE (scraped_at);
+
+CREATE TABLE IF NOT EXISTS product_snapshots_default PARTITION OF product_snapshots DEFAULT;
+
+CREATE OR REPLACE FUNCTION ensure_snapshot_partition(month_start DATE) RETURNS void AS $$
+DECLARE
+    start_date DATE := date_trunc('month', month_start)::date;
+    end_date DATE := (date_trunc('month', month_start) + INTERVAL '1 month')::date;
+    part_name TEXT := 'product_snapshots_p' || to_char(month_start, 'YYYY_MM');
+    moved BIGINT;
+BEGIN
+    IF to_regclass(part_name) IS NOT NULL THEN
+        RETURN;
+    END IF;
+
+    -- No new rows may reach the default partition between the move and the attach
+    LOCK TABLE product_snapshots_default IN SHARE ROW EXCLUSIVE MODE;
+    EXECUTE format('CREATE TABLE %I (LIKE product_snapshots INCLUDING DEFAULTS INCLUDING CONSTRAINTS)', part_name);
+    EXECUTE format(
+        'WITH moved AS (
+             DELETE FROM product_snapshots_default WHERE scraped_at >= %L AND scraped_at < %L RETURNING *
+         )
+         INSERT INTO %I SELECT * FROM moved',
+        start_date, end_date, part_name
+    );
+    GET DIAGNOSTICS moved = ROW_COUNT;
+    IF moved > 0 THEN
+        RAISE NOTICE 'Moved % rows from product_snapshots_default into %', moved, part_name;
+    END IF;
+    EXECUTE format(
+        'ALTER TABLE product_snapshots ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+        part_name, start_date, end_date
+    );
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION ensure_snapshot_partitions(months_ahead INTEGER DEFAULT 3) RETURNS TEXT[] AS $$
+DECLARE
+    month DATE;
+    failures TEXT[] := '{}';
+BEGIN
+    FOR i IN 0..months_ahead LOOP
+        month := (date_trunc('month', NOW()) + make_interval(months => i))::date;
+        BEGIN
+            PERFORM ensure_snapshot_partition(month);
+        EXCEPTION WHEN OTHERS THEN
+            failures := failures || (to_char(month, 'YYYY-MM') || ': ' || SQLERRM);
+        END;
+    END LOOP;
+    RETURN failures;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Current month plus the next three
+SELECT ensure_snapshot_partitions(3);
+
+-- Price history for a SKU, newest first
+CREATE INDEX IF NOT EXISTS idx_product_snapshots_sku_time
+    ON product_snapshots (traklin_sku, vendor_sku, scraped_at DESC);
+-- Snapshots of one scrape (/scrape freshness window, session reports)
+CREATE INDEX IF NOT EXISTS idx_product_snapshots_scrape_id
+    ON product_snapshots (scrape_id);
+-- Cheap time-range scans inside a partition
+CREATE INDEX IF NOT EXISTS idx_product_snapshots_scraped_at_brin
+    ON product_snapshots USING BRIN (scraped_at);
+-- Latest session for a query
+CREATE INDEX IF NOT EXISTS idx_scraping_sessions_query_key_time
+    ON scraping_sessions (query_key, scraped_at DESC);
 
 -- Insert vendors
 INSERT INTO vendors (name, website_url)
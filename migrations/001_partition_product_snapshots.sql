@@ -0,0 +1,129 @@
+-- Migration 001: monthly range partitioning and indexes for product_snapshots
+--
+-- * adds scraped_at (backfilled from scraping_sessions.scraped_at)
+-- * turns product_snapshots into a table partitioned by month on scraped_at,
+--   with a DEFAULT partition as a safety net
+-- * adds ensure_snapshot_partition(s)() so new months are created ahead of time
+--   (called by Database.connect() and snapshot_retention.py)
+-- * adds indexes for per-SKU price history, per-scrape lookups and time scans
+--
+-- Run once against an existing database created from the previous init.sql:
+--   psql "$DATABASE_URL" -f migrations/001_partition_product_snapshots.sql
+
+BEGIN;
+
+ALTER TABLE product_snapshots RENAME TO product_snapshots_legacy;
+ALTER INDEX product_snapshots_pkey RENAME TO product_snapshots_legacy_pkey;
+ALTER SEQUENCE product_snapshots_id_seq RENAME TO product_snapshots_legacy_id_seq;
+ALTER TABLE product_snapshots_legacy
+    RENAME CONSTRAINT product_snapshots_traklin_sku_vendor_sku_fkey TO product_snapshots_legacy_product_fkey;
+ALTER TABLE product_snapshots_legacy
+    RENAME CONSTRAINT product_snapshots_scrape_id_fkey TO product_snapshots_legacy_scrape_id_fkey;
+
+CREATE TABLE product_snapshots (
+    id BIGSERIAL,
+    traklin_sku INTEGER NOT NULL,
+    vendor_sku VARCHAR(255) NOT NULL,
+    scrape_id INTEGER,
+    scraped_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    
+    -- Core product data
+    name VARCHAR(500) NOT NULL,
+    url TEXT NOT NULL,
+    
+    -- Pricing
+    offers_price INTEGER,
+    orig_price INTEGER,
+    disc_price INTEGER,
+    currency VARCHAR(10) DEFAULT 'ILS',
+    
+    -- Product details
+    images JSONB DEFAULT '[]',
+    description TEXT,
+    availability VARCHAR(100),
+    item_condition VARCHAR(100),
+    brand VARCHAR(255),
+    metadata JSONB,
+    
+    PRIMARY KEY (id, scraped_at),
+    FOREIGN KEY (traklin_sku, vendor_sku) REFERENCES products(traklin_sku, vendor_sku) ON DELETE CASCADE,
+    FOREIGN KEY (scrape_id) REFERENCES scraping_sessions(scrape_id) ON DELETE SET NULL
+) PARTITION BY RANGE (scraped_at);
+
+CREATE TABLE product_snapshots_default PARTITION OF product_snapshots DEFAULT;
+
+CREATE OR REPLACE FUNCTION ensure_snapshot_partition(month_start DATE) RETURNS void AS $$
+DECLARE
+    start_date DATE := date_trunc('month', month_start)::date;
+BEGIN
+    EXECUTE format(
+        'CREATE TABLE IF NOT EXISTS %I PARTITION OF product_snapshots FOR VALUES FROM (%L) TO (%L)',
+        'product_snapshots_p' || to_char(start_date, 'YYYY_MM'),
+        start_date,
+        (start_date + INTERVAL '1 month')::date
+    );
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION ensure_snapshot_partitions(months_ahead INTEGER DEFAULT 3) RETURNS void AS $$
+BEGIN
+    FOR i IN 0..months_ahead LOOP
+        PERFORM ensure_snapshot_partition((date_trunc('month', NOW()) + make_interval(months => i))::date);
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Partitions for every month that already has data, plus the next few
+DO $$
+DECLARE
+    month DATE;
+BEGIN
+    FOR month IN
+        SELECT DISTINCT date_trunc('month', COALESCE(ss.scraped_at, NOW()))::date
+        FROM product_snapshots_legacy l
+        LEFT JOIN scraping_sessions ss ON ss.scrape_id = l.scrape_id
+    LOOP
+        PERFORM ensure_snapshot_partition(month);
+    END LOOP;
+    PERFORM ensure_snapshot_partitions(3);
+END $$;
+
+INSERT INTO product_snapshots (
+    id, traklin_sku, vendor_sku, scrape_id, scraped_at,
+    name, url,
+    offers_price, orig_price, disc_price, currency,
+    images, description, availability, item_condition, brand, metadata
+)
+SELECT
+    l.id, l.traklin_sku, l.vendor_sku, l.scrape_id, COALESCE(ss.scraped_at, NOW()),
+    l.name, l.url,
+    l.offers_price, l.orig_price, l.disc_price, l.currency,
+    l.images, l.description, l.availability, l.item_condition, l.brand, l.metadata
+FROM product_snapshots_legacy l
+LEFT JOIN scraping_sessions ss ON ss.scrape_id = l.scrape_id;
+
+DO $$
+BEGIN
+    PERFORM setval(
+        pg_get_serial_sequence('product_snapshots', 'id'),
+        (SELECT COALESCE(MAX(id), 0) + 1 FROM product_snapshots),
+        false
+    );
+END $$;
+
+DROP TABLE product_snapshots_legacy;
+
+-- Price history for a SKU, newest first
+CREATE INDEX IF NOT EXISTS idx_product_snapshots_sku_time
+    ON product_snapshots (traklin_sku, vendor_sku, scraped_at DESC);
+-- Snapshots of one scrape (/scrape freshness window, session reports)
+CREATE INDEX IF NOT EXISTS idx_product_snapshots_scrape_id
+    ON product_snapshots (scrape_id);
+-- Cheap time-range scans inside a partition
+CREATE INDEX IF NOT EXISTS idx_product_snapshots_scraped_at_brin
+    ON product_snapshots USING BRIN (scraped_at);
+-- Latest session for a query
+CREATE INDEX IF NOT EXISTS idx_scraping_sessions_query_time
+    ON scraping_sessions (query, scraped_at DESC);
+
+COMMIT;
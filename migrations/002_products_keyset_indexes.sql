@@ -0,0 +1,8 @@
+-- Migration 002: indexes backing keyset pagination of GET /products
+--
+--   psql "$DATABASE_URL" -f migrations/002_products_keyset_indexes.sql
+
+CREATE INDEX IF NOT EXISTS idx_products_updated_at_key
+    ON products (updated_at DESC, traklin_sku DESC, vendor_sku DESC);
+CREATE INDEX IF NOT EXISTS idx_products_vendor_updated_at_key
+    ON products (vendor_id, updated_at DESC, traklin_sku DESC, vendor_sku DESC);
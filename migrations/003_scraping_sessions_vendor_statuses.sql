@@ -0,0 +1,6 @@
+-- Migration 003: per-vendor outcome of each scrape (ok / no_result / error / timeout),
+-- so a partial result cut short by the scrape deadline can be told apart from a miss
+--
+--   psql "$DATABASE_URL" -f migrations/003_scraping_sessions_vendor_statuses.sql
+
+ALTER TABLE scraping_sessions ADD COLUMN IF NOT EXISTS vendor_statuses JSONB;
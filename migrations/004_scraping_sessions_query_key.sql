@@ -0,0 +1,21 @@
+-- Migration 004: normalized query key on scraping_sessions, so the /scrape
+-- freshness lookup matches every spelling its single-flight merges
+-- ("LG  gr-730" and "lg gr-730" share one key, see search_cache.normalize_query)
+--
+--   psql "$DATABASE_URL" -f migrations/004_scraping_sessions_query_key.sql
+
+BEGIN;
+
+ALTER TABLE scraping_sessions ADD COLUMN IF NOT EXISTS query_key TEXT;
+
+-- Backfill; new rows get the key from the application
+UPDATE scraping_sessions
+SET query_key = lower(regexp_replace(btrim(query), '\s+', ' ', 'g'))
+WHERE query_key IS NULL AND query IS NOT NULL;
+
+-- Latest session for a query, now looked up by key
+CREATE INDEX IF NOT EXISTS idx_scraping_sessions_query_key_time
+    ON scraping_sessions (query_key, scraped_at DESC);
+DROP INDEX IF EXISTS idx_scraping_sessions_query_time;
+
+COMMIT;
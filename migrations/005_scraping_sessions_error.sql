@@ -0,0 +1,6 @@
+-- Migration 005: why a scrape ended 'failed' or 'cancelled', so sessions whose
+-- worker raised or was stopped no longer sit at 'running' with no explanation
+--
+--   psql "$DATABASE_URL" -f migrations/005_scraping_sessions_error.sql
+
+ALTER TABLE scraping_sessions ADD COLUMN IF NOT EXISTS error TEXT;
@@ -0,0 +1,68 @@
+-- Migration 006: partition maintenance that survives a missed month
+--
+-- * ensure_snapshot_partition() moves rows that landed in product_snapshots_default
+--   (written while their month had no partition) into the new partition before
+--   attaching it; a plain CREATE ... PARTITION OF fails once the default holds them
+-- * ensure_snapshot_partitions() keeps going past a month that fails and returns
+--   the failures ('YYYY-MM: error'), which Database.ensure_snapshot_partitions raises
+--
+--   psql "$DATABASE_URL" -f migrations/006_snapshot_partition_default_rows.sql
+
+BEGIN;
+
+CREATE OR REPLACE FUNCTION ensure_snapshot_partition(month_start DATE) RETURNS void AS $$
+DECLARE
+    start_date DATE := date_trunc('month', month_start)::date;
+    end_date DATE := (date_trunc('month', month_start) + INTERVAL '1 month')::date;
+    part_name TEXT := 'product_snapshots_p' || to_char(month_start, 'YYYY_MM');
+    moved BIGINT;
+BEGIN
+    IF to_regclass(part_name) IS NOT NULL THEN
+        RETURN;
+    END IF;
+
+    -- No new rows may reach the default partition between the move and the attach
+    LOCK TABLE product_snapshots_default IN SHARE ROW EXCLUSIVE MODE;
+    EXECUTE format('CREATE TABLE %I (LIKE product_snapshots INCLUDING DEFAULTS INCLUDING CONSTRAINTS)', part_name);
+    EXECUTE format(
+        'WITH moved AS (
+             DELETE FROM product_snapshots_default WHERE scraped_at >= %L AND scraped_at < %L RETURNING *
+         )
+         INSERT INTO %I SELECT * FROM moved',
+        start_date, end_date, part_name
+    );
+    GET DIAGNOSTICS moved = ROW_COUNT;
+    IF moved > 0 THEN
+        RAISE NOTICE 'Moved % rows from product_snapshots_default into %', moved, part_name;
+    END IF;
+    EXECUTE format(
+        'ALTER TABLE product_snapshots ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+        part_name, start_date, end_date
+    );
+END;
+$$ LANGUAGE plpgsql;
+
+DROP FUNCTION IF EXISTS ensure_snapshot_partitions(INTEGER);
+
+CREATE FUNCTION ensure_snapshot_partitions(months_ahead INTEGER DEFAULT 3) RETURNS TEXT[] AS $$
+DECLARE
+    month DATE;
+    failures TEXT[] := '{}';
+BEGIN
+    FOR i IN 0..months_ahead LOOP
+        month := (date_trunc('month', NOW()) + make_interval(months => i))::date;
+        BEGIN
+            PERFORM ensure_snapshot_partition(month);
+        EXCEPTION WHEN OTHERS THEN
+            failures := failures || (to_char(month, 'YYYY-MM') || ': ' || SQLERRM);
+        END;
+    END LOOP;
+    RETURN failures;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Months whose rows already spilled into the default partition
+SELECT ensure_snapshot_partition(month)
+FROM (SELECT DISTINCT date_trunc('month', scraped_at)::date AS month FROM product_snapshots_default) spilled;
+
+COMMIT;
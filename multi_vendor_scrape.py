@@ -1,11 +1,16 @@
 import asyncio
 import logging
 import aiohttp
-from typing import List, Optional
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 from datetime import datetime
 
-from backend.db_utils import Database
-from backend.vendor_models import ProductSchema
+from backend.db_utils import Database, ScrapeWrite, scrape_status
+from backend.deadline import Deadline, deadline_after
+from backend.http_session import get_shared_session, close_shared_session
+from backend.vendor_exceptions import DeadlineExceededException
+from backend.relevance import model_number, to_price
+from backend.vendor_models import ProductSchema, SearchResultProduct
 from backend.vendor_registeration import (
     TraklinScraper, TraklinConfig,
     KSPScraper, KSPConfig,
@@ -34,96 +39,400 @@ VENDORS = [
     # (LastPriceScraper, LastPriceConfig)
 ]
 
-async def scrape_vendor(scraper_cls, config, query: str) -> Optional[ProductSchema]:
-    """Helper to instantiate and run a scraper."""
-    scraper_name = config.name
+# Per-vendor outcome of one scrape, stored in scraping_sessions.vendor_statuses
+VENDOR_OK = "ok"
+VENDOR_NO_RESULT = "no_result"
+VENDOR_ERROR = "error"
+VENDOR_TIMEOUT = "timeout"
+VENDOR_SKIPPED = "skipped"  # never scraped: no Traklin match to anchor it to (anchored mode)
+
+# The vendor whose match defines traklin_sku; every other vendor is grouped under it
+ANCHOR_VENDOR = "Traklin"
+
+
+@dataclass
+class TraklinAnchor:
+    """What the Traklin match pins down for the other vendors in anchored mode"""
+    traklin_sku: int
+    model: Optional[str]    # normalized model number, searched/ranked instead of the raw query
+    price: Optional[float]  # lets the ranker reject implausibly priced results
+
+    @classmethod
+    def from_result(cls, result, query: str) -> Optional["TraklinAnchor"]:
+        """Anchor from a Traklin (vendor_name, product) result; None when it can't anchor anything"""
+        if not result:
+            return None
+        _, product = result
+        try:
+            traklin_sku = int(product.SKU)
+        except (TypeError, ValueError):
+            return None
+        return cls(
+            traklin_sku=traklin_sku,
+            model=model_number(product.name) or model_number(query),
+            price=to_price(product.offers__price) or to_price(product.disc_price) or to_price(product.orig_price),
+        )
+
+
+async def _run_vendor(scraper_name: str, call, deadline: Optional[Deadline], statuses: Optional[Dict[str, str]], found: str):
+    """
+    Await one vendor's scrape, turning its outcome into a (vendor_name, product)
+    result or None and recording ok/no_result/error/timeout in `statuses`.
+    With a deadline the vendor is cancelled wherever it is once time runs out.
+    """
+    def record(status):
+        if statuses is not None:
+            statuses[scraper_name] = status
+
     try:
+        if deadline:
+            result = await asyncio.wait_for(call(), deadline.remaining())
+        else:
+            result = await call()
+    except (asyncio.TimeoutError, DeadlineExceededException):
+        logger.warning(f"[{scraper_name}] Timed out, scrape deadline reached")
+        record(VENDOR_TIMEOUT)
+        return None
+    except Exception as e:
+        logger.error(f"[{scraper_name}] Error: {e}")
+        record(VENDOR_ERROR)
+        return None
+
+    if result:
+        logger.info(f"[{scraper_name}] {found}: {result.name} (SKU: {result.SKU})")
+        record(VENDOR_OK)
+        return (scraper_name, result)
+    logger.info(f"[{scraper_name}] No result found.")
+    record(VENDOR_NO_RESULT)
+    return None
+
+async def scrape_vendor(
+    scraper_cls,
+    config,
+    query: str,
+    session: Optional[aiohttp.ClientSession] = None,
+    deadline: Optional[Deadline] = None,
+    statuses: Optional[Dict[str, str]] = None,
+    anchor: Optional[TraklinAnchor] = None,
+    search_results: Optional[List[SearchResultProduct]] = None
+) -> Optional[ProductSchema]:
+    """
+    Helper to instantiate and run a scraper.
+    With an `anchor` the vendor searches (and ranks) by the Traklin model
+    number and price instead of the raw query; `search_results` from a
+    speculative search are ranked instead of searching again.
+    """
+    async def call():
         scraper = scraper_cls(
-            vendor_name=scraper_name,
+            vendor_name=config.name,
             config=config,
             logger=logger
         )
-        async with aiohttp.ClientSession() as session:
-            result = await scraper.run(session, query)
-            if result:
-                logger.info(f"[{scraper_name}] Found: {result.name} (SKU: {result.SKU})")
-                return (scraper_name, result)
-            else:
-                logger.info(f"[{scraper_name}] No result found.")
-                return None
+        session_ = session or await get_shared_session()
+        if anchor is None:
+            return await scraper.run(session_, query, deadline=deadline, search_results=search_results)
+        return await scraper.run(
+            session_, anchor.model or query, anchor_price=anchor.price, deadline=deadline, search_results=search_results
+        )
+
+    return await _run_vendor(config.name, call, deadline, statuses, "Found")
+
+async def refresh_vendor(
+    scraper_cls,
+    config,
+    query: str,
+    match: Dict[str, str],
+    session: Optional[aiohttp.ClientSession] = None,
+    deadline: Optional[Deadline] = None,
+    statuses: Optional[Dict[str, str]] = None
+) -> Optional[ProductSchema]:
+    """
+    Like `scrape_vendor`, but re-fetches a stored match directly instead of searching.
+    The match's last snapshot stands in for the search result, so its prices,
+    name and extras (stored in its metadata) carry over to the new snapshot.
+    """
+    last_result = SearchResultProduct(
+        name=match.get("name") or "",
+        SKU=match["vendor_sku"],
+        url=match["url"],
+        img_src=next(iter(match.get("images") or []), None),
+        orig_price=match.get("orig_price"),
+        disc_price=match.get("disc_price"),
+        additional_info=match.get("metadata") or None,
+    )
+
+    async def call():
+        scraper = scraper_cls(
+            vendor_name=config.name,
+            config=config,
+            logger=logger
+        )
+        return await scraper.refresh(
+            session or await get_shared_session(), query, match["url"], match["vendor_sku"],
+            deadline=deadline, last_result=last_result
+        )
+
+    return await _run_vendor(config.name, call, deadline, statuses, "Refreshed")
+
+async def search_vendor(
+    scraper_cls,
+    config,
+    query: str,
+    session: Optional[aiohttp.ClientSession] = None,
+    deadline: Optional[Deadline] = None
+) -> Optional[List[SearchResultProduct]]:
+    """A vendor's search results for `query`, or None if the search failed (anchored mode's speculative search)"""
+    try:
+        scraper = scraper_cls(
+            vendor_name=config.name,
+            config=config,
+            logger=logger
+        )
+        return await scraper.search_product(session or await get_shared_session(), query, deadline)
     except Exception as e:
-        logger.error(f"[{scraper_name}] Error: {e}")
+        logger.warning(f"[{config.name}] Speculative search failed: {e}")
         return None
 
-async def run_multi_vendor_scrape(query: str, initiator: str = "user"):
-    logger.info(f"Starting multi-vendor scrape for query: '{query}'")
+async def persist_scrape_results(
+    db: Database,
+    scrape_id: int,
+    results,
+    skip_unchanged: bool = False,
+    vendor_statuses: Optional[Dict[str, str]] = None
+) -> List[Tuple[str, ProductSchema]]:
+    """
+    Store the results of a single query's scrape under its scraping session
+    and set the final session status. Returns the (vendor_name, product) pairs saved.
+    With `skip_unchanged`, products whose page didn't change since the last fetch
+    only bump products.updated_at and get no new snapshot.
+    `vendor_statuses` (vendor -> ok/no_result/error/timeout) is stored on the session.
+    """
+    # Filter valid results
+    valid_results = [r for r in results if r is not None]
+    logger.info(f"Total valid results found: {len(valid_results)}")
+
+    # Find Traklin Result
+    traklin_result = next((r[1] for r in valid_results if r[0] == ANCHOR_VENDOR), None)
+
+    if not traklin_result:
+        logger.warning("No Traklin result found. Cannot determine 'traklin_sku' for grouping. Skipping insert.")
+        await db.update_session_status(scrape_id, "failed_no_traklin_match", 0, vendor_statuses=vendor_statuses)
+        return []
     
-    db = Database()
-    await db.connect()
+    # Ensure Traklin result has a valid numeric SKU (based on selector logic it should)
+    try:
+        traklin_sku = int(traklin_result.SKU)
+    except ValueError:
+        logger.error(f"Traklin SKU '{traklin_result.SKU}' is not an integer. Cannot insert.")
+        await db.update_session_status(scrape_id, "failed_invalid_traklin_sku", 0, vendor_statuses=vendor_statuses)
+        return []
+
+    vendors_called = len(VENDORS)
+
+    # Insert Results in one transaction; fall back to row-by-row so one bad
+    # row doesn't cost the whole scrape
+    try:
+        saved_results = (await db.save_scrapes([
+            ScrapeWrite(scrape_id, traklin_sku, valid_results, vendors_called, skip_unchanged, vendor_statuses)
+        ]))[0]
+    except Exception as e:
+        logger.error(f"Bulk save failed for session {scrape_id}, retrying row by row: {e}")
+        saved_results = await _persist_row_by_row(
+            db, scrape_id, traklin_sku, valid_results, vendors_called, skip_unchanged, vendor_statuses
+        )
+
+    valid_count = len(saved_results)
+    status = scrape_status(valid_count, vendors_called)
+    logger.info(f"Scraping session {scrape_id} completed. Status: {status}. Saved: {valid_count}/{vendors_called}")
     
+    return saved_results
+
+async def _persist_row_by_row(db: Database, scrape_id: int, traklin_sku: int, valid_results, vendors_called: int, skip_unchanged: bool = False, vendor_statuses: Optional[Dict[str, str]] = None):
     saved_results = []
+    for vendor_name, product in valid_results:
+        try:
+            # Upsert Product
+            await db.upsert_product(traklin_sku, product, vendor_name)
+            
+            # Insert Snapshot
+            if not (skip_unchanged and product.unchanged):
+                await db.insert_snapshot(scrape_id, traklin_sku, product)
+            saved_results.append((vendor_name, product))
+        except Exception as e:
+            logger.error(f"Failed to save result for {vendor_name}: {e}")
+
+    valid_count = len(saved_results)
+    await db.update_session_status(scrape_id, scrape_status(valid_count, vendors_called), vendors_called, valid_count, vendor_statuses)
+    return saved_results
+
+async def scrape_all_vendors(
+    query: str,
+    vendor_runner=None,
+    matches: Optional[Dict[str, Dict[str, Any]]] = None,
+    deadline: Optional[float] = None,
+    statuses: Optional[Dict[str, str]] = None,
+    anchored: bool = False,
+    prefetch_search: bool = False,
+    search_runner=None
+) -> List[Optional[Tuple[str, ProductSchema]]]:
+    """
+    Scrape every registered vendor for `query` and return one result per vendor
+    (None where nothing was found), without persisting anything.
+
+    By default all vendors run concurrently. With `anchored`, Traklin runs
+    first: its match fixes traklin_sku, model number and price, and only then
+    do the other vendors search (by that model number) and fetch their product
+    page. Without a Traklin match nothing could be stored anyway, so the other
+    vendors are never called and are marked "skipped".
+    `prefetch_search` trades some of those savings for latency: the other
+    vendors' searches for the raw query run alongside Traklin (and are
+    cancelled if it finds nothing), only their product pages wait for it.
+    `search_runner` replaces `search_vendor` for those speculative searches,
+    as `vendor_runner` replaces `scrape_vendor`.
+    """
+    vendor_runner = vendor_runner or scrape_vendor
+    search_runner = search_runner or search_vendor
+    budget = deadline_after(deadline)
+    statuses = {} if statuses is None else statuses
+    matches = matches or {}
+
+    def start(cls, cfg, **kwargs):
+        if cfg.name in matches:
+            return refresh_vendor(cls, cfg, query, matches[cfg.name], deadline=budget, statuses=statuses)
+        return vendor_runner(cls, cfg, query, deadline=budget, statuses=statuses, **kwargs)
+
+    if not anchored:
+        return list(await asyncio.gather(*(start(cls, cfg) for cls, cfg in VENDORS)))
+
+    anchor_vendor = next((cls, cfg) for cls, cfg in VENDORS if cfg.name == ANCHOR_VENDOR)
+    others = [(cls, cfg) for cls, cfg in VENDORS if cfg.name != ANCHOR_VENDOR]
+    prefetches = {}
+    if prefetch_search:
+        prefetches = {
+            cfg.name: asyncio.ensure_future(search_runner(cls, cfg, query, deadline=budget))
+            for cls, cfg in others if cfg.name not in matches
+        }
+
+    try:
+        anchor_result = await start(*anchor_vendor)
+        anchor = TraklinAnchor.from_result(anchor_result, query)
+        if anchor is None:
+            logger.info(f"No Traklin anchor for '{query}', skipping {len(others)} other vendors")
+            for _, cfg in others:
+                statuses[cfg.name] = VENDOR_SKIPPED
+            return [anchor_result] + [None] * len(others)
+
+        logger.info(f"Anchored '{query}' to Traklin SKU {anchor.traklin_sku} (model {anchor.model}, price {anchor.price})")
+
+        async def follow(cls, cfg):
+            search_results = await prefetches[cfg.name] if cfg.name in prefetches else None
+            return await start(cls, cfg, anchor=anchor, search_results=search_results)
+
+        return [anchor_result] + list(await asyncio.gather(*(follow(cls, cfg) for cls, cfg in others)))
+    finally:
+        # Speculative searches still in flight are wasted once Traklin has failed
+        for task in prefetches.values():
+            task.cancel()
+
+async def end_failed_session(db: Database, scrape_id: Optional[int], status: str, error: str, vendor_statuses: Dict[str, str]):
+    """Move a session that raised out of 'running'; a failure here must not hide the original error"""
+    if scrape_id is None:
+        return
+    try:
+        await db.update_session_status(scrape_id, status, vendor_statuses=vendor_statuses or None, error=error)
+    except Exception as e:
+        logger.error(f"Could not mark scraping session {scrape_id} {status}: {e}")
+
+async def run_multi_vendor_scrape(
+    query: str,
+    initiator: str = "user",
+    db: Optional[Database] = None,
+    vendor_runner=None,
+    scrape_id: Optional[int] = None,
+    matches: Optional[Dict[str, Dict[str, Any]]] = None,
+    skip_unchanged: bool = False,
+    deadline: Optional[float] = None,
+    vendor_statuses: Optional[Dict[str, str]] = None,
+    anchored: bool = False,
+    prefetch_search: bool = False,
+    search_runner=None
+):
+    """
+    Scrape every registered vendor for `query` and persist the results.
+    `db` lets a caller share one connection pool across many scrapes; when omitted
+    a pool is opened and closed for this call. `vendor_runner` replaces
+    `scrape_vendor` (the batch engine uses it to apply its concurrency budgets).
+    `scrape_id` reuses a scraping session created earlier (e.g. by the job queue).
+    `matches` ({vendor: {"vendor_sku", "url", ...}}, see `Database.get_stored_matches`)
+    sends those vendors straight to their stored product page, skipping search.
+    `skip_unchanged` stores no snapshot for pages unchanged since the last fetch
+    (see `persist_scrape_results`).
+    `deadline` (seconds) bounds the whole scrape: vendors still running when it
+    passes are cancelled and whatever finished is persisted. Each vendor's
+    outcome is written into `vendor_statuses` when given, and stored on the session.
+    `anchored` / `prefetch_search` select the Traklin-anchored pipeline, see
+    `scrape_all_vendors`; `search_runner` replaces `search_vendor` there.
+    If the scrape raises or is cancelled, its session is marked 'failed' or
+    'cancelled' with the error before the exception propagates.
+    """
+    logger.info(f"Starting multi-vendor scrape for query: '{query}'")
     
+    owns_db = db is None
+    if owns_db:
+        db = Database()
+        await db.connect()
+    
+    vendor_statuses = {} if vendor_statuses is None else vendor_statuses
     try:
         # Create Session
-        scrape_id = await db.create_scraping_session(query, initiator)
-        logger.info(f"Created scraping session ID: {scrape_id}")
+        if scrape_id is None:
+            scrape_id = await db.create_scraping_session(query, initiator)
+            logger.info(f"Created scraping session ID: {scrape_id}")
+        else:
+            await db.update_session_status(scrape_id, "running")
 
-        # Run Scrapers concurrently
-        tasks = [scrape_vendor(cls, cfg, query) for cls, cfg in VENDORS]
-        results = await asyncio.gather(*tasks)
+        results = await scrape_all_vendors(
+            query, vendor_runner, matches, deadline, vendor_statuses, anchored, prefetch_search, search_runner
+        )
         
-        # Filter valid results
-        valid_results = [r for r in results if r is not None]
-        logger.info(f"Total valid results found: {len(valid_results)}")
+        return await persist_scrape_results(db, scrape_id, results, skip_unchanged, vendor_statuses)
 
-        # Find Traklin Result
-        traklin_result = next((r[1] for r in valid_results if r[0] == "Traklin"), None)
+    except asyncio.CancelledError:
+        await end_failed_session(db, scrape_id, "cancelled", "cancelled", vendor_statuses)
+        raise
+    except Exception as e:
+        await end_failed_session(db, scrape_id, "failed", str(e) or type(e).__name__, vendor_statuses)
+        raise
+    finally:
+        if owns_db:
+            await db.close()
 
-        if not traklin_result:
-            logger.warning("No Traklin result found. Cannot determine 'traklin_sku' for grouping. Skipping insert.")
-            await db.update_session_status(scrape_id, "failed_no_traklin_match", 0)
-            return []
-        
-        # Ensure Traklin result has a valid numeric SKU (based on selector logic it should)
-        try:
-            traklin_sku = int(traklin_result.SKU)
-        except ValueError:
-            logger.error(f"Traklin SKU '{traklin_result.SKU}' is not an integer. Cannot insert.")
-            await db.update_session_status(scrape_id, "failed_invalid_traklin_sku", 0)
-            return []
-
-        # Insert Results
-        count = 0
-        for vendor_name, product in valid_results:
-            try:
-                # Upsert Product
-                await db.upsert_product(traklin_sku, product, vendor_name)
-                
-                # Insert Snapshot
-                await db.insert_snapshot(scrape_id, traklin_sku, product)
-                count += 1
-                saved_results.append((vendor_name, product))
-            except Exception as e:
-                logger.error(f"Failed to save result for {vendor_name}: {e}")
-
-        # Update Session Status
-        # Determine overall status
-        vendors_called = len(VENDORS)
-        valid_count = count
-        
-        status = "failure"
-        if valid_count == vendors_called:
-            status = "success"
-        elif valid_count > 0:
-            status = "partial_success"
-            
-        await db.update_session_status(scrape_id, status, vendors_called, valid_count)
-        logger.info(f"Scraping session {scrape_id} completed. Status: {status}. Saved: {valid_count}/{vendors_called}")
-        
-        return saved_results
+async def iter_vendor_results(
+    query: str,
+    vendor_runner=None,
+    deadline: Optional[float] = None,
+    statuses: Optional[Dict[str, str]] = None
+) -> AsyncIterator[Tuple[str, Optional[Tuple[str, ProductSchema]]]]:
+    """
+    Run every registered vendor for `query` concurrently and yield
+    (vendor_name, result) as each one finishes, where result is what
+    `scrape_vendor` returned (None on no match, error or timeout; see `statuses`).
+    Vendors still running are cancelled if the consumer stops early or
+    `deadline` seconds pass.
+    """
+    vendor_runner = vendor_runner or scrape_vendor
+    budget = deadline_after(deadline)
 
+    async def run(cls, cfg):
+        return cfg.name, await vendor_runner(cls, cfg, query, deadline=budget, statuses=statuses)
+
+    tasks = [asyncio.ensure_future(run(cls, cfg)) for cls, cfg in VENDORS]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
     finally:
-        await db.close()
+        for task in tasks:
+            task.cancel()
 
 if __name__ == "__main__":
     import sys
@@ -131,4 +440,10 @@ if __name__ == "__main__":
     if len(sys.argv) > 1:
         query = sys.argv[1]
     
-    asyncio.run(run_multi_vendor_scrape(query))
+    async def main():
+        try:
+            await run_multi_vendor_scrape(query)
+        finally:
+            await close_shared_session()
+
+    asyncio.run(main())
@@ -4,7 +4,7 @@ from backend.vendor_scrapper import VendorConfig, SearchResultProduct
 from backend.vendor_selectors import *
 import asyncio
 from typing import List
-import aiohttp
+from backend.http_session import get_shared_session, close_shared_session
 
 VENDORS = {
     "Traklin": (TraklinScraper, TraklinConfig),
@@ -30,7 +30,8 @@ async def main():
     scrapers: List[BaseVendorScraper] = build()
     query = "GR-728B"
     
-    async with aiohttp.ClientSession() as session:
+    session = await get_shared_session()
+    try:
         # Build coroutines (no await here)
         coros = [scraper.run(session, query) for scraper in scrapers]
         # Or use search_products if that’s the actual method name
@@ -44,6 +45,8 @@ async def main():
                 print(f"{scraper.vendor_name}: ERROR -> {res}")
             else:
                 print(f"{scraper.vendor_name} - {res if res else None}")
+    finally:
+        await close_shared_session()
     
     # srchrslt = SearchResultProduct(**{'name': 'מקרר 4 דלתות מקפיא תחתון אינוורטר 665 ליטר LG GR-728B No Frost - צבע נירוסטה מושחרת', 'description': 'מקרר 4 דלתות מקפיא תחתון אינוורטר 665 ליטר LG No Frost - כולל מדחס אינוורטר שקט וחסכוני באנרגיה, בקרה נוחה ומהירה, ניתן לשלוט במקרר דרך טלפון החכם מרחוק, מדפים מודולריים מזכוכית מחוסמת בתא קירור ועוד. מאושר לשבת מהדרין באישור המכון מדעי טכנולוגי להלכה.', 'SKU': 330693, 'url': 'https://ksp.co.il/web/item/330693', 'img_src': 'https://ksp.co.il/shop/items/330693.jpg?v=5', 'orig_price': 7990, 'disc_price': 7990})
     
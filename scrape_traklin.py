@@ -1,10 +1,10 @@
 import asyncio
 import logging
-import aiohttp
 from typing import Optional
 
 from backend.vendor_registeration import TraklinScraper, TraklinConfig
 from backend.vendor_models import ProductSchema
+from backend.http_session import get_shared_session, close_shared_session
 
 # Configure logging
 logging.basicConfig(
@@ -32,15 +32,15 @@ async def search_traklin(query: str) -> Optional[ProductSchema]:
     logger.info(f"Starting search for query: '{query}'")
     
     try:
-        async with aiohttp.ClientSession() as session:
-            result = await scraper.run(session, query)
-            
-            if result:
-                logger.info(f"Successfully found product: {result.name}")
-                return result
-            else:
-                logger.warning(f"No product found for query: '{query}'")
-                return None
+        session = await get_shared_session()
+        result = await scraper.run(session, query)
+        
+        if result:
+            logger.info(f"Successfully found product: {result.name}")
+            return result
+        else:
+            logger.warning(f"No product found for query: '{query}'")
+            return None
                 
     except Exception as e:
         logger.error(f"Error occurred while scraping Traklin: {str(e)}", exc_info=True)
@@ -50,7 +50,10 @@ if __name__ == "__main__":
     # Example usage
     async def main():
         query = "AG653"  # Example query from playground.py
-        result = await search_traklin(query)
+        try:
+            result = await search_traklin(query)
+        finally:
+            await close_shared_session()
         if result:
             print("\n--- Product Found ---")
             print(result)
@@ -0,0 +1,78 @@
+import argparse
+import asyncio
+import logging
+from datetime import date
+
+from backend.db_utils import Database
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def months_between(older: date, newer: date) -> int:
+    return (newer.year - older.year) * 12 + (newer.month - older.month)
+
+
+async def run_retention(
+    db: Database,
+    retain_months: int = 24,
+    downsample_after_months: int = 3,
+    months_ahead: int = 3,
+    dry_run: bool = False
+):
+    """
+    Maintain product_snapshots partitions:
+    create the upcoming months, downsample partitions older than
+    downsample_after_months to one snapshot per listing per day, and drop
+    partitions older than retain_months.
+    A month that can't be created is reported after the rest of the work is
+    done, by re-raising the RuntimeError.
+    """
+    partition_error = None
+    if not dry_run:
+        try:
+            await db.ensure_snapshot_partitions(months_ahead)
+        except RuntimeError as e:
+            logger.error(str(e))
+            partition_error = e
+
+    today = date.today()
+    for partition in await db.list_snapshot_partitions():
+        age = months_between(partition["month"], today)
+
+        if age >= retain_months:
+            logger.info(f"Dropping {partition['name']} ({age} months old)")
+            if not dry_run:
+                await db.drop_snapshot_partition(partition["name"])
+
+        elif age >= downsample_after_months and not partition["downsampled"]:
+            logger.info(f"Downsampling {partition['name']} ({age} months old)")
+            if not dry_run:
+                removed = await db.downsample_snapshot_partition(partition["name"])
+                logger.info(f"Removed {removed} rows from {partition['name']}")
+
+    if partition_error:
+        raise partition_error
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create, downsample and drop product_snapshots partitions")
+    parser.add_argument("--retain-months", type=int, default=24, help="Drop partitions at least this many months old")
+    parser.add_argument("--downsample-after", type=int, default=3, help="Keep one snapshot per day in partitions this old")
+    parser.add_argument("--months-ahead", type=int, default=3, help="Future monthly partitions to create")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    async def main():
+        db = Database()
+        await db.connect()
+        try:
+            await run_retention(db, args.retain_months, args.downsample_after, args.months_ahead, args.dry_run)
+        finally:
+            await db.close()
+
+    asyncio.run(main())